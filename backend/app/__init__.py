@@ -1,18 +1,34 @@
+from threading import Lock
 from flask import Flask
 from .config import Config
-from .extensions import db, jwt, api, migrate
+from .extensions import db, jwt, api
 from .routes.health import health_bp
+from .routes.metrics import metrics_bp
+from .routes.media import media_bp
+from .metrics import init_metrics
+from .query_budget import init_query_budget
+from .apispec import init_apispec
+from .http_cache import init_http_cache
+from .rate_limit import init_rate_limit
+from .idempotency import init_idempotency
+from .refresh_tokens import init_refresh_tokens
+from .commands import init_commands
 from flask_cors import CORS
+from sqlalchemy import event
 
-def create_app(config_class=Config): 
-    app = Flask(__name__)
-    app.config.from_object(config_class)  
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
 
-    db.init_app(app)
-    jwt.init_app(app)
-    api.init_app(app)
-    migrate.init_app(app, db)
+def enforce_sqlite_foreign_keys(app):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection.
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _enable_foreign_keys):
+        event.listen(engine, 'connect', _enable_foreign_keys)
 
+def register_namespaces(app):
     from .routes.auth import ns as auth_ns
     from .routes.venues import ns as venues_ns
     from .routes.reservations import ns as reservations_ns
@@ -21,16 +37,77 @@ def create_app(config_class=Config):
     api.add_namespace(venues_ns, path='/venues')
     api.add_namespace(reservations_ns, path='/reservations')
 
+class LazyRoutesMiddleware:
+    def __init__(self, app, register):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.register = register
+        self.registered = False
+        self.lock = Lock()
+
+    def ensure_registered(self):
+        if not self.registered:
+            with self.lock:
+                if not self.registered:
+                    self.register(self.app)
+                    self.registered = True
+
+    def __call__(self, environ, start_response):
+        self.ensure_registered()
+        return self.wsgi_app(environ, start_response)
+
+def ensure_routes(app):
+    # Looked up in app.extensions because other middleware (ProxyFix) may wrap it.
+    middleware = app.extensions.get('lazy_routes')
+    if middleware is not None:
+        middleware.ensure_registered()
+
+def create_app(config_class=Config): 
+    app = Flask(__name__)
+    app.config.from_object(config_class)  
+
+    db.init_app(app)
+    enforce_sqlite_foreign_keys(app)
+    jwt.init_app(app)
+    api.init_app(app, add_specs=app.config.get('SWAGGER_ENABLED', True))
+    if app.config.get('MIGRATIONS_ENABLED', True):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    init_metrics(app)
+    init_query_budget(app)
+    init_apispec(app)
+    init_http_cache(app)
+    init_rate_limit(app)
+    init_idempotency(app)
+    init_refresh_tokens(app)
+    init_commands(app)
+
+    if app.config.get('LAZY_ROUTES', False):
+        app.wsgi_app = app.extensions['lazy_routes'] = LazyRoutesMiddleware(app, register_namespaces)
+    else:
+        register_namespaces(app)
+        if app.config.get('SWAGGER_ENABLED', True) and app.config.get('SWAGGER_PRECOMPILE', False):
+            app.extensions['apispec'].get()
+
+    if app.config.get('TRUSTED_PROXIES', 0):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
     app.register_blueprint(health_bp)
+    if app.config.get('METRICS_ENABLED', True):
+        app.register_blueprint(metrics_bp)
+    if app.config.get('MEDIA_SERVE', True) and app.config.get('MEDIA_STORAGE', 'local') == 'local':
+        app.register_blueprint(media_bp)
 
     CORS(app, 
          resources={r"/api/*": {
              "origins": ["http://localhost", "http://localhost:3000"],
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-             "allow_headers": ["Content-Type", "Authorization"],
+             "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Match", "Idempotency-Key"],
              "supports_credentials": True
          }},
-         expose_headers=["Content-Type", "Authorization"]
+         expose_headers=["Content-Type", "Authorization", "ETag", "Link", "Retry-After", "Idempotent-Replayed"]
     )
 
     return app
\ No newline at end of file
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import shutil
+from threading import Lock
+import click
+from flask import Response, current_app, request, render_template, url_for
+from flask_restx.apidoc import apidoc
+from .extensions import api
+
+
+class SpecCache:
+    def __init__(self, app):
+        self.app = app
+        self.lock = Lock()
+        self.body = None
+        self.etag = None
+
+    def _load(self):
+        spec_file = self.app.config.get('SWAGGER_SPEC_FILE')
+        if spec_file and os.path.exists(spec_file):
+            with open(spec_file, 'rb') as f:
+                return f.read()
+        from . import ensure_routes
+        ensure_routes(self.app)
+        with self.app.test_request_context():
+            return json.dumps(api.__schema__, sort_keys=True).encode()
+
+    def get(self):
+        if self.body is None:
+            with self.lock:
+                if self.body is None:
+                    body = self._load()
+                    self.etag = hashlib.sha1(body).hexdigest()
+                    self.body = body
+        return self.body, self.etag
+
+
+def export_docs(app, output_dir):
+    cache = app.extensions['apispec']
+    body, _ = cache.get()
+    assets_dir = os.path.join(output_dir, 'swaggerui')
+    shutil.rmtree(assets_dir, ignore_errors=True)
+    shutil.copytree(apidoc.static_folder, assets_dir, ignore=shutil.ignore_patterns('*.map'))
+
+    with app.test_request_context():
+        html = render_template('swagger-ui.html', title=api.title, specs_url=api.specs_url)
+        html = html.replace(url_for('restx_doc.static', filename=''), 'swaggerui/')
+
+    with open(os.path.join(output_dir, 'swagger.json'), 'wb') as f:
+        f.write(body)
+    with open(os.path.join(output_dir, 'index.html'), 'w') as f:
+        f.write(html)
+
+
+def init_apispec(app):
+    if not app.config.get('SWAGGER_ENABLED', True):
+        return
+
+    cache = SpecCache(app)
+    app.extensions['apispec'] = cache
+    max_age = app.config.get('SWAGGER_CACHE_MAX_AGE', 3600)
+
+    def cached_specs():
+        body, etag = cache.get()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response.make_conditional(request)
+
+    app.view_functions['specs'] = cached_specs
+
+    @app.cli.command('export-docs')
+    @click.argument('output_dir', default='../frontend/public/swagger')
+    def export_docs_command(output_dir):
+        """Write swagger.json and a static Swagger UI to OUTPUT_DIR."""
+        os.makedirs(output_dir, exist_ok=True)
+        export_docs(current_app._get_current_object(), output_dir)
+        click.echo(f'API docs written to {output_dir}')
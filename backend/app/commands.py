@@ -0,0 +1,83 @@
+import click
+from flask import current_app
+
+
+def init_commands(app):
+    @app.cli.command('archive-reservations')
+    @click.option('--older-than-days', type=int, default=None,
+                  help='Archive reservations older than this (default RESERVATION_ARCHIVE_AFTER_DAYS).')
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    def archive_reservations_command(older_than_days, batch_size):
+        """Move past reservations into reservations_archive in batches."""
+        from .facades.reservation_facade import ReservationFacade
+
+        if older_than_days is None:
+            older_than_days = current_app.config['RESERVATION_ARCHIVE_AFTER_DAYS']
+        success, archived = ReservationFacade().archive_reservations(older_than_days, batch_size)
+        click.echo(f'Archived {archived} reservations older than {older_than_days} days')
+        if not success:
+            raise click.ClickException('Archiving stopped on a database error')
+
+    @app.cli.command('purge-reservation-tombstones')
+    @click.option('--older-than-days', type=int, default=None,
+                  help='Delete tombstones older than this (default RESERVATION_TOMBSTONE_RETENTION_DAYS).')
+    def purge_reservation_tombstones_command(older_than_days):
+        """Delete change-feed tombstones that are past the retention window."""
+        from .facades.reservation_facade import ReservationFacade
+
+        if older_than_days is None:
+            older_than_days = current_app.config['RESERVATION_TOMBSTONE_RETENTION_DAYS']
+        purged = ReservationFacade().purge_tombstones(older_than_days)
+        click.echo(f'Purged {purged} reservation tombstones older than {older_than_days} days')
+
+    @app.cli.command('partition-reservations')
+    @click.option('--months-ahead', type=int, default=None,
+                  help='Create monthly partitions this far ahead (default RESERVATION_PARTITION_MONTHS_AHEAD).')
+    def partition_reservations_command(months_ahead):
+        """Create upcoming monthly partitions of the reservations table (Postgres)."""
+        from .extensions import db
+        from .partitions import ensure_reservation_partitions
+
+        if months_ahead is None:
+            months_ahead = current_app.config['RESERVATION_PARTITION_MONTHS_AHEAD']
+        created = ensure_reservation_partitions(db.session.connection(), months_ahead)
+        db.session.commit()
+        if created is None:
+            click.echo('reservations is not partitioned on this database; nothing to do')
+        else:
+            click.echo(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+
+    @app.cli.command('purge-deleted-venues')
+    def purge_deleted_venues_command():
+        """Finish purging venues whose background deletion did not complete."""
+        from .facades.venue_facade import VenueFacade
+
+        purged = VenueFacade().purge_deleted_venues(current_app.config['VENUE_PURGE_BATCH_SIZE'])
+        click.echo(f'Purged {len(purged)} deleted venues')
+
+    @app.cli.command('process-pending-images')
+    @click.option('--older-than-minutes', type=int, default=5, show_default=True,
+                  help='Only pick up images that have been pending at least this long.')
+    def process_pending_images_command(older_than_minutes):
+        """Build variants for uploads whose background processing did not complete."""
+        from .facades.venue_facade import VenueFacade
+
+        processed = VenueFacade().process_pending_images(older_than_minutes)
+        click.echo(f'Processed {len(processed)} pending venue images')
+
+    @app.cli.command('refresh-venue-ratings')
+    def refresh_venue_ratings_command():
+        """Recompute venue rating totals from comments (after bulk loads or cascaded deletes)."""
+        from .facades.venue_facade import VenueFacade
+
+        updated = VenueFacade().refresh_ratings()
+        click.echo(f'Refreshed ratings for {updated} venues')
+
+    @app.cli.command('promote-waitlist')
+    @click.option('--limit', type=int, default=1000, show_default=True)
+    def promote_waitlist_command(limit):
+        """Promote waitlisted customers into slots that have freed up."""
+        from .facades.waitlist_facade import WaitlistFacade
+
+        promoted = WaitlistFacade().promote(limit=limit)
+        click.echo(f'Promoted {len(promoted)} waitlist entries')
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -6,6 +7,8 @@ if os.environ.get('RAILWAY_ENVIRONMENT') is None:
     env_path = Path(__file__).resolve().parents[1] / '.env'
     load_dotenv(env_path)
 
+RUNNING_FROM_CLI = os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+
 class Config:
     raw_uri = os.environ.get('DATABASE_URL', 'sqlite:///:memory:')
     
@@ -17,8 +20,57 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'fallback-secret-key')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
     
     DEBUG = os.getenv('DEBUG', 'False') == 'True'
+
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'True') == 'True'
+
+    QUERY_BUDGET_ENFORCED = os.getenv('QUERY_BUDGET_ENFORCED', 'False') == 'True'
+
+    FAST_SERIALIZER = os.getenv('FAST_SERIALIZER', 'False') == 'True'
+    FAST_SERIALIZER_BACKEND = os.getenv('FAST_SERIALIZER_BACKEND', 'json')
+
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+    COMPRESSION_BROTLI = os.getenv('COMPRESSION_BROTLI', 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+    CONDITIONAL_GET_ENABLED = os.getenv('CONDITIONAL_GET_ENABLED', 'True') == 'True'
+
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+    RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL', 'memory://')
+    RATE_LIMIT_LOGIN = os.getenv('RATE_LIMIT_LOGIN', '10/minute')
+    RATE_LIMIT_REGISTER = os.getenv('RATE_LIMIT_REGISTER', '5/minute')
+    RATE_LIMIT_RESERVATIONS = os.getenv('RATE_LIMIT_RESERVATIONS', '30/minute')
+    LOAD_SHED_MAX_IN_FLIGHT = int(os.getenv('LOAD_SHED_MAX_IN_FLIGHT', 0))
+    LOAD_SHED_RETRY_AFTER = int(os.getenv('LOAD_SHED_RETRY_AFTER', 1))
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))
+    IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 60))
+    CHANGE_FEED_LAG_SECONDS = int(os.getenv('CHANGE_FEED_LAG_SECONDS', 5))
+    RESERVATION_TOMBSTONE_RETENTION_DAYS = int(os.getenv('RESERVATION_TOMBSTONE_RETENTION_DAYS', 30))
+    RESERVATION_ARCHIVE_AFTER_DAYS = int(os.getenv('RESERVATION_ARCHIVE_AFTER_DAYS', 180))
+    RESERVATION_PARTITION_MONTHS_AHEAD = int(os.getenv('RESERVATION_PARTITION_MONTHS_AHEAD', 3))
+    VENUE_PURGE_ASYNC_THRESHOLD = int(os.getenv('VENUE_PURGE_ASYNC_THRESHOLD', 5000))
+    VENUE_PURGE_BATCH_SIZE = int(os.getenv('VENUE_PURGE_BATCH_SIZE', 1000))
+    JOBS_INLINE = os.getenv('JOBS_INLINE', 'False') == 'True'
+    MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')
+    MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(Path(__file__).resolve().parents[1] / 'media'))
+    MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
+    MEDIA_SERVE = os.getenv('MEDIA_SERVE', 'True') == 'True'
+    MEDIA_MAX_UPLOAD_BYTES = int(os.getenv('MEDIA_MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+    IMAGE_VARIANT_WIDTHS = os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,1280')
+    IMAGE_DISPLAY_WIDTH = int(os.getenv('IMAGE_DISPLAY_WIDTH', 640))
+    VENUE_TIMEZONE = os.getenv('VENUE_TIMEZONE', 'UTC')
+    TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+
+    SWAGGER_ENABLED = os.getenv('SWAGGER_ENABLED', 'True') == 'True'
+    SWAGGER_PRECOMPILE = os.getenv('SWAGGER_PRECOMPILE', 'False') == 'True'
+    SWAGGER_SPEC_FILE = os.getenv('SWAGGER_SPEC_FILE')
+    SWAGGER_CACHE_MAX_AGE = int(os.getenv('SWAGGER_CACHE_MAX_AGE', 3600))
+    MIGRATIONS_ENABLED = os.getenv('MIGRATIONS_ENABLED', str(RUNNING_FROM_CLI)) == 'True'
+    LAZY_ROUTES = os.getenv('LAZY_ROUTES', str(RUNNING_FROM_CLI)) == 'True'
         
 class TestingConfig(Config):
     TESTING = True
@@ -29,4 +81,8 @@ class TestingConfig(Config):
     else:
         SQLALCHEMY_DATABASE_URI = test_uri
         
-    DEBUG = False
\ No newline at end of file
+    DEBUG = False
+    QUERY_BUDGET_ENFORCED = True
+    RATE_LIMIT_ENABLED = False
+    JOBS_INLINE = True
+    CHANGE_FEED_LAG_SECONDS = 0
\ No newline at end of file
@@ -1,11 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_restx import Api
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 
 db = SQLAlchemy()
 jwt = JWTManager()
-migrate = Migrate()
 
 api = Api(
     title='Restaurant Reservation API',
@@ -1,32 +1,147 @@
-from ..models import Reservation, Venue, User, ReservationStatus
+from ..models import Reservation, ReservationArchive, ReservationStatusEvent, ReservationTombstone, Venue, User, ReservationStatus, INACTIVE_STATUSES
 from ..extensions import db
-from datetime import datetime
-from sqlalchemy.exc import SQLAlchemyError
+from ..idempotency import stage_response
+from ..jobs import run_in_background
+from ..partitions import add_months
+from .waitlist_facade import promote_freed_slot_job, promote_waitlist_job, slot_taken_clause
+import base64
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, func, extract, cast, Integer, literal, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+CHANGE_TOKEN_FORMAT = "%Y%m%d%H%M%S%f"
+CALENDAR_ENCODINGS = ('bitmap', 'rle')
+
+# Status changes each role may make: {new status: statuses it can come from}.
+STATUS_TRANSITIONS = {
+    'owner': {
+        ReservationStatus.CONFIRMED: (ReservationStatus.PENDING,),
+        ReservationStatus.REJECTED: (ReservationStatus.PENDING,),
+        ReservationStatus.CANCELLED: (ReservationStatus.PENDING, ReservationStatus.CONFIRMED),
+    },
+    'customer': {
+        ReservationStatus.CANCELLED: (ReservationStatus.PENDING, ReservationStatus.CONFIRMED),
+    },
+}
+
+
+def _bitmap(slots, slots_per_day):
+    # Bit i (most significant first) is set when slot i of the day is booked.
+    bits = bytearray((slots_per_day + 7) // 8)
+    for slot in slots:
+        bits[slot // 8] |= 0x80 >> (slot % 8)
+    return base64.b64encode(bytes(bits)).decode()
+
+
+def _runs(slots):
+    # [first_slot, length] for every run of consecutive booked slots.
+    runs = []
+    for slot in sorted(slots):
+        if runs and runs[-1][0] + runs[-1][1] == slot:
+            runs[-1][1] += 1
+        else:
+            runs.append([slot, 1])
+    return runs
+
+
+def record_tombstones(condition, reason):
+    # Call in the same transaction, before deleting the reservations matching
+    # `condition` (which may refer to Reservation and Venue), so the change
+    # feed reports them as removed.
+    source = select(
+        Reservation.id, Reservation.venue_id, Reservation.customer_id, Venue.owner_id,
+        literal(reason), literal(datetime.utcnow())
+    ).join_from(Reservation, Venue, Reservation.venue_id == Venue.id).where(condition)
+    db.session.execute(ReservationTombstone.__table__.insert().from_select(
+        ['reservation_id', 'venue_id', 'customer_id', 'owner_id', 'reason', 'removed_at'], source
+    ))
+
 
 class ReservationFacade:
     def __init__(self):
         pass
 
-    def get_reservations_for_user(self, user):
+    def _encode_change_token(self, updated_at, reservation_id):
+        return f"{updated_at.strftime(CHANGE_TOKEN_FORMAT)}-{reservation_id}"
+
+    def _decode_change_token(self, token):
+        timestamp, reservation_id = token.split('-', 1)
+        return datetime.strptime(timestamp, CHANGE_TOKEN_FORMAT), int(reservation_id)
+
+    def _user_reservations_query(self, user):
+        query = db.session.query(Reservation, Venue.name, User.username) \
+            .join(Venue, Reservation.venue_id == Venue.id) \
+            .join(User, Reservation.customer_id == User.id)
+
+        if user.user_type.value == 'owner':
+            return query.filter(Venue.owner_id == user.id)
+        return query.filter(Reservation.customer_id == user.id)
+
+    def _reservation_rows_query(self, model):
+        return db.session.query(
+            model.id, model.venue_id, model.reservation_time, model.party_size, model.notes,
+            model.status, model.customer_id, model.version, Venue.name.label('venue_name'), User.username.label('customer_name')
+        ) \
+            .join(Venue, model.venue_id == Venue.id) \
+            .join(User, model.customer_id == User.id) \
+            .filter(model.deleted_at.is_(None), Venue.deleted_at.is_(None))
+
+    def _with_archive(self, build, include_archived):
+        # The archive is only read on request so default lists stay on the hot table.
+        query = build(Reservation)
+        if include_archived:
+            query = query.union_all(build(ReservationArchive))
+        return query
+
+    def _reservation_dict(self, row):
+        return {
+            'id': row.id,
+            'venue_id': row.venue_id,
+            'venue_name': row.venue_name,
+            'reservation_time': row.reservation_time.isoformat(),
+            'party_size': row.party_size,
+            'notes': row.notes,
+            'status': row.status.value,
+            'customer_name': row.customer_name,
+            'customer_id': row.customer_id,
+            'version': row.version
+        }
+
+    def _version_columns(self):
+        # Lists also show the venue and customer names and hide deleted venues,
+        # so those rows' changes count too.
+        return (func.count(Reservation.id), func.max(Reservation.updated_at), func.max(Reservation.id),
+                func.max(Venue.updated_at), func.max(Venue.deleted_at), func.max(User.updated_at))
+
+    def get_reservations_version(self, user_id):
+        # Owners cannot book and customers own no venues, so one query covers
+        # both roles without loading the user first.
+        return tuple(db.session.query(*self._version_columns())
+                     .join(Venue, Reservation.venue_id == Venue.id)
+                     .join(User, Reservation.customer_id == User.id)
+                     .filter(or_(Venue.owner_id == user_id, Reservation.customer_id == user_id))
+                     .one())
+
+    def get_venue_reservations_version(self, venue_id, user_id):
+        row = db.session.query(*self._version_columns()) \
+            .select_from(Venue) \
+            .outerjoin(Reservation, Reservation.venue_id == Venue.id) \
+            .outerjoin(User, Reservation.customer_id == User.id) \
+            .filter(Venue.id == venue_id, Venue.owner_id == user_id) \
+            .group_by(Venue.id) \
+            .first()
+        return tuple(row) if row else None
+
+    def get_reservations_for_user(self, user, include_archived=False):
         try:
-            if user.user_type.value == 'owner':
-                venues = Venue.query.filter_by(owner_id=user.id).all()
-                venue_ids = [venue.id for venue in venues]
-                reservations = Reservation.query.filter(Reservation.venue_id.in_(venue_ids)).all()
-            else:
-                reservations = Reservation.query.filter_by(customer_id=user.id).all()
-            
-            return [{
-                'id': reservation.id,
-                'venue_id': reservation.venue_id,
-                'venue_name': Venue.query.get(reservation.venue_id).name,
-                'reservation_time': reservation.reservation_time.isoformat(),
-                'party_size': reservation.party_size,
-                'notes': reservation.notes,
-                'status': reservation.status.value,
-                'customer_name': User.query.get(reservation.customer_id).username,
-                'customer_id': reservation.customer_id
-            } for reservation in reservations]
+            def build(model):
+                query = self._reservation_rows_query(model)
+                if user.user_type.value == 'owner':
+                    return query.filter(Venue.owner_id == user.id)
+                return query.filter(model.customer_id == user.id)
+
+            return [self._reservation_dict(row) for row in self._with_archive(build, include_archived).all()]
         except Exception as e:
             print(f"Error getting reservations: {str(e)}")
             return []
@@ -34,7 +149,7 @@ class ReservationFacade:
     def create_reservation(self, user, venue_id, data):
         try:
             venue = Venue.query.get(venue_id)
-            if not venue:
+            if not venue or venue.deleted_at is not None:
                 return False, "Venue not found", 404
 
             if user.user_type.value == 'owner':
@@ -51,12 +166,8 @@ class ReservationFacade:
             except ValueError:
                 return False, "Invalid datetime format", 400
 
-            existing_reservation = Reservation.query.filter_by(
-                venue_id=venue_id,
-                reservation_time=reservation_time
-            ).first()
-            if existing_reservation:
-                return False, "This time slot is already taken", 400
+            if db.session.query(slot_taken_clause(venue_id, reservation_time)).scalar():
+                return False, "This time slot is already taken; join the waitlist at /api/reservations/waitlist", 400
 
             reservation = Reservation(
                 venue_id=venue_id,
@@ -68,6 +179,10 @@ class ReservationFacade:
             )
 
             db.session.add(reservation)
+            db.session.flush()
+            db.session.add(ReservationStatusEvent(reservation_id=reservation.id, venue_id=venue_id,
+                                                  to_status=ReservationStatus.PENDING, actor_id=user.id))
+            stage_response({'message': 'The reservation has been created', 'id': reservation.id}, 201)
             db.session.commit()
 
             return True, {
@@ -79,6 +194,11 @@ class ReservationFacade:
                 'status': reservation.status.value,
                 'notes': reservation.notes
             }, 201
+        except IntegrityError:
+            # Someone else (a booking or a waitlist promotion) took the slot
+            # after our check; the unique index kept only one of us.
+            db.session.rollback()
+            return False, "This time slot is already taken; join the waitlist at /api/reservations/waitlist", 400
         except SQLAlchemyError as e:
             db.session.rollback()
             print(f"Database error creating reservation: {str(e)}")
@@ -87,57 +207,76 @@ class ReservationFacade:
             print(f"Error creating reservation: {str(e)}")
             return False, str(e), 500
 
-    def update_reservation(self, reservation_id, user, data):
+    def change_status(self, reservation_id, user, status, expected_version=None):
+        # One guarded UPDATE does the permission, transition and (with
+        # expected_version) optimistic concurrency checks, so the happy path
+        # never reads the reservation. The audit row is copied from the same
+        # rows first (locked), so it records the status actually left.
         try:
-            reservation = Reservation.query.get(reservation_id)
-            if not reservation:
-                return False, "Reservation not found"
-
-            is_customer = reservation.customer_id == user.id
-            venue = Venue.query.get(reservation.venue_id)
-            is_owner = venue and venue.owner_id == user.id
-
-            if not (is_customer or is_owner):
-                return False, "No permission to update this reservation"
-
-            if 'status' in data and not is_owner:
-                return False, "Only venue owner can update reservation status"
+            try:
+                target = ReservationStatus[status.upper()]
+            except (KeyError, AttributeError):
+                return False, f"Invalid status: {status}", 400
 
-            if 'start_time' in data:
-                reservation.reservation_time = datetime.fromisoformat(data['start_time'])
-            if 'party_size' in data:
-                reservation.party_size = data['party_size']
-            if 'status' in data:
-                try:
-                    reservation.status = ReservationStatus[data['status'].upper()]
-                except KeyError:
-                    return False, f"Invalid status: {data['status']}"
-            if 'notes' in data:
-                reservation.notes = data['notes']
+            role = user.user_type.value
+            sources = STATUS_TRANSITIONS[role].get(target, ())
+            if role == 'owner':
+                permitted = Reservation.venue_id.in_(
+                    select(Venue.id).where(Venue.owner_id == user.id, Venue.deleted_at.is_(None)))
+            else:
+                permitted = Reservation.customer_id == user.id
 
-            db.session.commit()
+            if sources:
+                now = datetime.utcnow()
+                guard = and_(Reservation.id == reservation_id, Reservation.deleted_at.is_(None),
+                             Reservation.status.in_(sources), permitted)
+                if expected_version is not None:
+                    guard = and_(guard, Reservation.version == expected_version)
+                status_type = ReservationStatusEvent.to_status.type
+                events = select(
+                    Reservation.id, Reservation.venue_id, Reservation.status,
+                    cast(literal(target, status_type), status_type), literal(user.id), literal(now)
+                ).where(guard).with_for_update()
+                db.session.execute(ReservationStatusEvent.__table__.insert().from_select(
+                    ['reservation_id', 'venue_id', 'from_status', 'to_status', 'actor_id', 'created_at'], events
+                ))
+                update = Reservation.__table__.update().where(guard) \
+                    .values(status=target, updated_at=now, version=Reservation.version + 1)
+                if db.session.connection().dialect.full_returning:
+                    versions = db.session.execute(update.returning(Reservation.version)).scalars().all()
+                elif db.session.execute(update).rowcount == 1:
+                    # No RETURNING (SQLite): the write lock is held until commit.
+                    versions = [db.session.query(Reservation.version).filter(Reservation.id == reservation_id).scalar()]
+                else:
+                    versions = []
+                if len(versions) == 1:
+                    db.session.commit()
+                    if target in INACTIVE_STATUSES:
+                        run_in_background(promote_freed_slot_job, reservation_id)
+                    return True, {'message': f"Reservation {target.value}", 'version': versions[0]}, 200
+                db.session.rollback()
 
-            return True, {
-                'id': reservation.id,
-                'venue_id': reservation.venue_id,
-                'customer_id': reservation.customer_id,
-                'reservation_time': reservation.reservation_time.isoformat(),
-                'party_size': reservation.party_size,
-                'status': reservation.status.value,
-                'notes': reservation.notes
-            }
+            # Work out why nothing changed; only failed requests pay for this read.
+            row = db.session.query(Reservation.status, Reservation.version, Reservation.customer_id, Venue.owner_id) \
+                .join(Venue, Reservation.venue_id == Venue.id) \
+                .filter(Reservation.id == reservation_id, Reservation.deleted_at.is_(None)) \
+                .first()
+            if not row:
+                return False, "Reservation not found", 404
+            if user.id not in (row.customer_id, row.owner_id) or not STATUS_TRANSITIONS[role].get(target):
+                return False, f"No permission to set this reservation to {target.value}", 403
+            if expected_version is not None and row.version != expected_version:
+                return False, "Reservation was modified by someone else; reload it and retry", 412
+            return False, f"Cannot change status from {row.status.value} to {target.value}", 409
         except SQLAlchemyError as e:
             db.session.rollback()
-            print(f"Database error updating reservation: {str(e)}")
-            return False, "Database error occurred"
-        except Exception as e:
-            print(f"Error updating reservation: {str(e)}")
-            return False, str(e)
+            print(f"Database error changing reservation status: {str(e)}")
+            return False, "Database error occurred", 500
 
     def delete_reservation(self, reservation_id, user):
         try:
             reservation = Reservation.query.get(reservation_id)
-            if not reservation:
+            if not reservation or reservation.deleted_at is not None:
                 return False, "Reservation not found", 404
 
             venue = Venue.query.get(reservation.venue_id)
@@ -147,8 +286,11 @@ class ReservationFacade:
             if reservation.customer_id != user.id:
                 return False, "No permission to delete this reservation", 403
 
-            db.session.delete(reservation)
+            # Soft delete: the row stays until archival so the change feed can report it.
+            reservation.deleted_at = datetime.utcnow()
             db.session.commit()
+            if reservation.status not in INACTIVE_STATUSES:
+                run_in_background(promote_waitlist_job, reservation.venue_id, reservation.reservation_time)
             return True, "Reservation deleted successfully", 200
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -158,27 +300,203 @@ class ReservationFacade:
             print(f"Error deleting reservation: {str(e)}")
             return False, str(e), 500
 
-    def get_venue_reservations(self, venue_id, user):
+    def get_venue_reservations(self, venue_id, user, include_archived=False):
         try:
             venue = Venue.query.get(venue_id)
-            if not venue:
+            if not venue or venue.deleted_at is not None:
                 return False, "Venue not found"
 
             if venue.owner_id != user.id:
                 return False, "No permission to view these reservations"
 
-            reservations = Reservation.query.filter_by(venue_id=venue_id).all()
-            return True, [{
-                'id': reservation.id,
-                'venue_id': reservation.venue_id,
-                'venue_name': venue.name,
-                'reservation_time': reservation.reservation_time.isoformat(),
-                'party_size': reservation.party_size,
-                'notes': reservation.notes,
-                'status': reservation.status.value,
-                'customer_name': User.query.get(reservation.customer_id).username,
-                'customer_id': reservation.customer_id
-            } for reservation in reservations]
+            def build(model):
+                return self._reservation_rows_query(model).filter(model.venue_id == venue_id)
+
+            return True, [self._reservation_dict(row) for row in self._with_archive(build, include_archived).all()]
         except Exception as e:
             print(f"Error getting venue reservations: {str(e)}")
-            return False, str(e) 
\ No newline at end of file
+            return False, str(e)
+
+    def get_venue_calendar(self, venue_id, user, month, slot_minutes=30, encoding='bitmap'):
+        # Booked slots per day for one month, from a single query grouped by
+        # day and slot. Only days with bookings are listed.
+        try:
+            venue = Venue.query.get(venue_id)
+            if not venue or venue.deleted_at is not None:
+                return False, "Venue not found", 404
+
+            if venue.owner_id != user.id:
+                return False, "No permission to view these reservations", 403
+
+            start = datetime(month.year, month.month, 1)
+            end = datetime.combine(add_months(start, 1), datetime.min.time())
+            day = extract('day', Reservation.reservation_time).label('day')
+            minute_of_day = cast(extract('hour', Reservation.reservation_time) * 60
+                                 + extract('minute', Reservation.reservation_time), Integer)
+            slot = (minute_of_day / slot_minutes).label('slot')
+            rows = db.session.query(day, slot, func.count(Reservation.id), func.sum(Reservation.party_size)) \
+                .filter(Reservation.venue_id == venue_id,
+                        Reservation.reservation_time >= start,
+                        Reservation.reservation_time < end,
+                        Reservation.deleted_at.is_(None),
+                        Reservation.status.notin_(INACTIVE_STATUSES)) \
+                .group_by('day', 'slot') \
+                .all()
+
+            days = {}
+            for day_of_month, day_slot, reservations, guests in rows:
+                entry = days.setdefault(int(day_of_month), {'slots': [], 'reservations': 0, 'guests': 0})
+                entry['slots'].append(int(day_slot))
+                entry['reservations'] += reservations
+                entry['guests'] += guests or 0
+
+            slots_per_day = 1440 // slot_minutes
+            calendar = {}
+            for day_of_month, entry in sorted(days.items()):
+                booked = _bitmap(entry['slots'], slots_per_day) if encoding == 'bitmap' else _runs(entry['slots'])
+                calendar[start.date().replace(day=day_of_month).isoformat()] = {
+                    encoding: booked,
+                    'reservations': entry['reservations'],
+                    'guests': entry['guests']
+                }
+
+            return True, {
+                'venue_id': venue_id,
+                'month': start.strftime('%Y-%m'),
+                'slot_minutes': slot_minutes,
+                'slots_per_day': slots_per_day,
+                'encoding': encoding,
+                'days': calendar
+            }, 200
+        except Exception as e:
+            print(f"Error getting venue calendar: {str(e)}")
+            return False, str(e), 500
+
+    def _change_dict(self, reservation, venue_name, customer_name):
+        return {
+            'id': reservation.id,
+            'venue_id': reservation.venue_id,
+            'venue_name': venue_name,
+            'reservation_time': reservation.reservation_time.isoformat(),
+            'party_size': reservation.party_size,
+            'notes': reservation.notes,
+            'status': reservation.status.value,
+            'customer_name': customer_name,
+            'customer_id': reservation.customer_id,
+            'version': reservation.version,
+            'updated_at': reservation.updated_at.isoformat(),
+            'deleted': reservation.deleted_at is not None
+        }
+
+    def _tombstone_dict(self, tombstone):
+        return {
+            'id': tombstone.reservation_id,
+            'venue_id': tombstone.venue_id,
+            'customer_id': tombstone.customer_id,
+            'updated_at': tombstone.removed_at.isoformat(),
+            'deleted': True,
+            'removed': tombstone.reason
+        }
+
+    def get_reservation_changes(self, user, since=None, limit=100):
+        # Live rows and tombstones merged in (changed_at, id) order. updated_at
+        # is stamped before commit, so a transaction can become visible after
+        # later-stamped ones; only changes older than CHANGE_FEED_LAG_SECONDS
+        # (longer than any transaction plus clock skew between workers) are
+        # served, and the token never moves past that horizon.
+        try:
+            now = datetime.utcnow()
+            horizon = now - timedelta(seconds=current_app.config.get('CHANGE_FEED_LAG_SECONDS', 5))
+            since_key = None
+            if since:
+                try:
+                    since_key = self._decode_change_token(since)
+                except ValueError:
+                    return False, "Invalid change token", 400
+                retention = timedelta(days=current_app.config.get('RESERVATION_TOMBSTONE_RETENTION_DAYS', 30))
+                if since_key[0] < now - retention:
+                    return False, "Change token has expired; reload all reservations and start again without since", 410
+
+            def window(changed_at, key):
+                clause = changed_at <= horizon
+                if since_key:
+                    clause = and_(clause, or_(changed_at > since_key[0],
+                                              and_(changed_at == since_key[0], key > since_key[1])))
+                return clause
+
+            live = self._user_reservations_query(user) \
+                .filter(window(Reservation.updated_at, Reservation.id)) \
+                .order_by(Reservation.updated_at, Reservation.id) \
+                .limit(limit + 1).all()
+
+            owner_column = ReservationTombstone.owner_id if user.user_type.value == 'owner' else ReservationTombstone.customer_id
+            tombstones = ReservationTombstone.query \
+                .filter(owner_column == user.id, window(ReservationTombstone.removed_at, ReservationTombstone.reservation_id)) \
+                .order_by(ReservationTombstone.removed_at, ReservationTombstone.reservation_id) \
+                .limit(limit + 1).all()
+
+            changes = sorted(
+                [((reservation.updated_at, reservation.id), self._change_dict(reservation, venue_name, customer_name))
+                 for reservation, venue_name, customer_name in live] +
+                [((tombstone.removed_at, tombstone.reservation_id), self._tombstone_dict(tombstone))
+                 for tombstone in tombstones],
+                key=lambda change: change[0]
+            )
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+
+            next_key = changes[-1][0] if changes else since_key
+            if not has_more and (next_key is None or next_key < (horizon, 0)):
+                # Everything up to the horizon has been sent; start there next
+                # time so the token stays within the tombstone retention.
+                next_key = (horizon, 0)
+
+            return True, {
+                'changes': [change for _, change in changes],
+                'next_token': self._encode_change_token(*next_key),
+                'has_more': has_more
+            }, 200
+        except Exception as e:
+            print(f"Error getting reservation changes: {str(e)}")
+            return False, str(e), 500
+
+    def purge_tombstones(self, older_than_days, batch_size=1000):
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        purged = 0
+        while True:
+            ids = [row.id for row in db.session.query(ReservationTombstone.id)
+                   .filter(ReservationTombstone.removed_at < cutoff)
+                   .limit(batch_size)]
+            if not ids:
+                return purged
+            ReservationTombstone.query.filter(ReservationTombstone.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            purged += len(ids)
+
+    def archive_reservations(self, older_than_days, batch_size=1000):
+        # Moves reservations whose time is past the horizon into reservations_archive,
+        # one committed batch at a time so locks stay short.
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        columns = [column.name for column in ReservationArchive.__table__.columns if column.name != 'archived_at']
+        archived = 0
+        try:
+            while True:
+                ids = [row.id for row in db.session.query(Reservation.id)
+                       .filter(Reservation.reservation_time < cutoff)
+                       .order_by(Reservation.id)
+                       .limit(batch_size)]
+                if not ids:
+                    return True, archived
+
+                source = db.select(*[Reservation.__table__.c[name] for name in columns]
+                                   + [db.literal(datetime.utcnow()).label('archived_at')]) \
+                    .where(Reservation.id.in_(ids))
+                db.session.execute(ReservationArchive.__table__.insert().from_select(columns + ['archived_at'], source))
+                record_tombstones(Reservation.id.in_(ids), 'archived')
+                db.session.execute(Reservation.__table__.delete().where(Reservation.id.in_(ids)))
+                db.session.commit()
+                archived += len(ids)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error archiving reservations: {str(e)}")
+            return False, archived
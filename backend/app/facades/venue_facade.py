@@ -1,6 +1,13 @@
-from ..models import Venue, User, UserType, VenueType
+from ..models import Venue, VenueHours, User, UserType, VenueType, Reservation, ReservationArchive, VenueComment, VenueImage
 from ..extensions import db
-from datetime import datetime
+from ..jobs import run_in_background
+from .reservation_facade import record_tombstones
+from ..images import FORMATS, InvalidImage, build_variants, content_key, inspect_image
+from ..storage import get_storage
+from ..opening_hours import WEEKDAYS, WEEKEND, legacy_summary, open_at_clause, parse_opening_hours, rows_from_legacy, serialize_hours
+import json
+from datetime import datetime, timedelta
+from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
 import re
 
@@ -22,17 +29,39 @@ class VenueFacade:
         return bool(url_pattern.match(url))
 
     def _get_safe_image_url(self, url, is_menu=False):
+        if url and url.startswith(current_app.config.get('MEDIA_URL', '/media/')):
+            return url
         if not self._validate_url(url):
             return self.default_menu_url if is_menu else self.default_image_url
         return url
 
     def get_venues_for_user(self, user: User):
+        return self.search_venues(user)[0]
+
+    def search_venues(self, user: User, open_at=None, venue_type=None, min_rating=None, limit=None, after=None):
+        # Returns (venues, last_id); last_id is set when another page follows.
         try:
+            query = Venue.query.filter(Venue.deleted_at.is_(None))
             if user.user_type == UserType.OWNER:
-                venues = Venue.query.filter_by(owner_id=user.id).all()
-            else:
-                venues = Venue.query.all()
-            
+                query = query.filter(Venue.owner_id == user.id)
+            if venue_type is not None:
+                query = query.filter(Venue.venue_type == venue_type)
+            if min_rating is not None:
+                query = query.filter(Venue.rating >= min_rating)
+            if open_at is not None:
+                query = query.filter(open_at_clause(Venue.id, open_at))
+            if after is not None:
+                query = query.filter(Venue.id > after)
+            query = query.order_by(Venue.id)
+            if limit is not None:
+                query = query.limit(limit + 1)
+
+            venues = query.all()
+            last_id = None
+            if limit is not None and len(venues) > limit:
+                venues = venues[:limit]
+                last_id = venues[-1].id
+
             return [{
                 'id': venue.id,
                 'owner_id': venue.owner_id,
@@ -46,16 +75,19 @@ class VenueFacade:
                 'menu_image_url': self._get_safe_image_url(venue.menu_image_url, True),
                 'type': venue.venue_type.value,
                 'latitude': venue.latitude,
-                'longitude': venue.longitude
-            } for venue in venues]
+                'longitude': venue.longitude,
+                'image_srcset': venue.image_srcset,
+                'rating': venue.rating,
+                'rating_count': venue.rating_count
+            } for venue in venues], last_id
         except Exception as e:
             print(f"Error getting venues: {str(e)}")
-            return []
+            return [], None
 
     def get_venue_details(self, venue_id: int):
         try:
             venue = Venue.query.get(venue_id)
-            if not venue:
+            if not venue or venue.deleted_at is not None:
                 return False, "Venue not found"
             
             return True, {
@@ -71,7 +103,11 @@ class VenueFacade:
                 'menu_image_url': self._get_safe_image_url(venue.menu_image_url, True),
                 'type': venue.venue_type.value,
                 'latitude': venue.latitude,
-                'longitude': venue.longitude
+                'longitude': venue.longitude,
+                'image_srcset': venue.image_srcset,
+                'rating': venue.rating,
+                'rating_count': venue.rating_count,
+                'opening_hours': [serialize_hours(row) for row in venue.hours]
             }
         except Exception as e:
             print(f"Error getting venue details: {str(e)}")
@@ -79,9 +115,19 @@ class VenueFacade:
 
     def create_venue(self, user: User, venue_data: dict):
         try:
-            if not all(k in venue_data for k in ['name', 'address', 'phone', 'weekdays_hours', 'weekend_hours', 'type']):
+            if not all(k in venue_data for k in ['name', 'address', 'phone', 'type']):
                 return False, "Missing required fields"
 
+            try:
+                if venue_data.get('opening_hours') is not None:
+                    hours = parse_opening_hours(venue_data['opening_hours'])
+                elif 'weekdays_hours' in venue_data and 'weekend_hours' in venue_data:
+                    hours = rows_from_legacy(venue_data['weekdays_hours'], venue_data['weekend_hours'])
+                else:
+                    return False, "Missing required fields"
+            except ValueError as e:
+                return False, str(e)
+
             existing_venue = Venue.query.filter_by(name=venue_data['name']).first()
             if existing_venue:
                 return False, "Venue with this name already exists"
@@ -102,13 +148,14 @@ class VenueFacade:
                 address=venue_data['address'],
                 phone=venue_data['phone'],
                 email=venue_data.get('email'),
-                weekdays_hours=venue_data['weekdays_hours'],
-                weekend_hours=venue_data['weekend_hours'],
+                weekdays_hours=legacy_summary(hours, WEEKDAYS) or 'Closed',
+                weekend_hours=legacy_summary(hours, WEEKEND) or 'Closed',
                 image_url=self._get_safe_image_url(venue_data.get('image_url')),
                 menu_image_url=self._get_safe_image_url(venue_data.get('menu_image_url'), True),
                 venue_type=venue_type,
                 latitude=venue_data.get('latitude'),
-                longitude=venue_data.get('longitude')
+                longitude=venue_data.get('longitude'),
+                hours=[VenueHours(**row) for row in hours]
             )
 
             db.session.add(venue)
@@ -123,15 +170,114 @@ class VenueFacade:
             print(f"Error creating venue: {str(e)}")
             return False, str(e)
 
+    def get_opening_hours(self, venue_id: int, when: datetime):
+        venue = Venue.query.get(venue_id)
+        if not venue or venue.deleted_at is not None:
+            return False, "Venue not found"
+
+        return True, {
+            'opening_hours': [serialize_hours(row) for row in venue.hours],
+            'at': when.isoformat(timespec='minutes'),
+            'open': self.is_open(venue_id, when)
+        }
+
+    def is_open(self, venue_id: int, when: datetime):
+        return db.session.query(open_at_clause(venue_id, when)).scalar()
+
+    def set_opening_hours(self, venue_id: int, user: User, items):
+        try:
+            venue = Venue.query.get(venue_id)
+            if not venue or venue.deleted_at is not None:
+                return False, "Venue not found", 404
+
+            if venue.owner_id != user.id:
+                return False, "Do not have permission to change this venue", 403
+
+            try:
+                hours = parse_opening_hours(items)
+            except ValueError as e:
+                return False, str(e), 400
+
+            VenueHours.query.filter_by(venue_id=venue_id).delete(synchronize_session=False)
+            db.session.add_all(VenueHours(venue_id=venue_id, **row) for row in hours)
+            venue.weekdays_hours = legacy_summary(hours, WEEKDAYS) or 'Closed'
+            venue.weekend_hours = legacy_summary(hours, WEEKEND) or 'Closed'
+            db.session.commit()
+
+            return True, [serialize_hours(row) for row in venue.hours], 200
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error setting opening hours: {str(e)}")
+            return False, "Database error occurred", 500
+
+    def record_rating(self, venue_id: int, rating: int, count: int = 1):
+        # count is -1 when a rated comment is removed. One UPDATE, so
+        # concurrent comments cannot lose each other's increments.
+        total = Venue.rating_total + rating * count
+        ratings = Venue.rating_count + count
+        Venue.query.filter_by(id=venue_id).update({
+            Venue.rating_total: total,
+            Venue.rating_count: ratings,
+            Venue.rating: db.cast(total, db.Float) / db.func.nullif(ratings, 0)
+        }, synchronize_session=False)
+
+    def forget_user_ratings(self, user_id: int):
+        # A user's comments go with them through ON DELETE CASCADE, which
+        # bypasses record_rating. Take their ratings out of every venue's
+        # totals in one grouped UPDATE first; the caller commits.
+        theirs = db.session.query(VenueComment.rating).filter(
+            VenueComment.venue_id == Venue.id, VenueComment.user_id == user_id, VenueComment.rating.isnot(None)
+        )
+        total = Venue.rating_total - theirs.with_entities(
+            db.func.coalesce(db.func.sum(VenueComment.rating), 0)).scalar_subquery()
+        ratings = Venue.rating_count - theirs.with_entities(db.func.count(VenueComment.rating)).scalar_subquery()
+        rated = db.session.query(VenueComment.venue_id).filter(
+            VenueComment.user_id == user_id, VenueComment.rating.isnot(None))
+        return Venue.query.filter(Venue.id.in_(rated)).update({
+            Venue.rating_total: total,
+            Venue.rating_count: ratings,
+            Venue.rating: db.cast(total, db.Float) / db.func.nullif(ratings, 0)
+        }, synchronize_session=False)
+
+    def refresh_ratings(self):
+        ratings = db.session.query(VenueComment.rating).filter(
+            VenueComment.venue_id == Venue.id, VenueComment.rating.isnot(None)
+        )
+        updated = Venue.query.update({
+            Venue.rating_count: ratings.with_entities(db.func.count(VenueComment.rating)).scalar_subquery(),
+            Venue.rating_total: ratings.with_entities(
+                db.func.coalesce(db.func.sum(VenueComment.rating), 0)).scalar_subquery(),
+            Venue.rating: ratings.with_entities(
+                db.func.avg(db.cast(VenueComment.rating, db.Float))).scalar_subquery()
+        }, synchronize_session=False)
+        db.session.commit()
+        return updated
+
+    def _has_many_dependents(self, venue_id: int, threshold: int):
+        # Bounded counts: we only need to know whether the threshold is crossed.
+        total = 0
+        for model in (Reservation, VenueComment):
+            total += db.session.query(model.id).filter(model.venue_id == venue_id).limit(threshold + 1).count()
+        return total > threshold
+
     def delete_venue(self, venue_id: int, user: User):
         try:
             venue = Venue.query.get(venue_id)
-            if not venue:
+            if not venue or venue.deleted_at is not None:
                 return False, "Venue not found", 404
             
             if venue.owner_id != user.id:
                 return False, "Do not have permission to delete this venue", 403
 
+            if self._has_many_dependents(venue_id, current_app.config.get('VENUE_PURGE_ASYNC_THRESHOLD', 5000)):
+                venue.deleted_at = datetime.utcnow()
+                db.session.commit()
+                run_in_background(purge_venue_job, venue_id)
+                return True, "Venue deletion scheduled", 202
+
+            # Reservations and comments go with it through ON DELETE CASCADE.
+            record_tombstones(Reservation.venue_id == venue_id, 'deleted')
+            ReservationArchive.query.filter_by(venue_id=venue_id).delete(synchronize_session=False)
             db.session.delete(venue)
             db.session.commit()
             return True, "Venue is deleted", 200
@@ -141,4 +287,143 @@ class VenueFacade:
             return False, "Database error occurred", 500
         except Exception as e:
             print(f"Error deleting venue: {str(e)}")
-            return False, str(e), 500 
\ No newline at end of file
+            return False, str(e), 500
+
+    def purge_venue(self, venue_id: int, batch_size: int = 1000):
+        try:
+            for model in (Reservation, VenueComment, ReservationArchive):
+                while True:
+                    ids = [row.id for row in db.session.query(model.id)
+                           .filter(model.venue_id == venue_id).limit(batch_size)]
+                    if not ids:
+                        break
+                    if model is Reservation:
+                        record_tombstones(Reservation.id.in_(ids), 'deleted')
+                    model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+                    db.session.commit()
+
+            Venue.query.filter_by(id=venue_id).delete(synchronize_session=False)
+            db.session.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error purging venue {venue_id}: {str(e)}")
+            return False
+
+    def purge_deleted_venues(self, batch_size: int = 1000):
+        venue_ids = [row.id for row in db.session.query(Venue.id).filter(Venue.deleted_at.isnot(None))]
+        return [venue_id for venue_id in venue_ids if self.purge_venue(venue_id, batch_size)]
+
+    def _image_dict(self, image):
+        return {
+            'id': image.id,
+            'venue_id': image.venue_id,
+            'kind': image.kind,
+            'status': image.status,
+            'variants': json.loads(image.variants) if image.variants else [],
+            'error': image.error
+        }
+
+    def upload_image(self, venue_id: int, user: User, kind: str, data: bytes):
+        try:
+            venue = Venue.query.get(venue_id)
+            if not venue or venue.deleted_at is not None:
+                return False, "Venue not found", 404
+
+            if venue.owner_id != user.id:
+                return False, "Do not have permission to change this venue", 403
+
+            if kind not in ('image', 'menu'):
+                return False, "Image kind must be 'image' or 'menu'", 400
+
+            if not data:
+                return False, "No image file provided", 400
+
+            if len(data) > current_app.config.get('MEDIA_MAX_UPLOAD_BYTES', 5 * 1024 * 1024):
+                return False, "Image file is too large", 413
+
+            try:
+                image_format, _, _ = inspect_image(data)
+            except InvalidImage as e:
+                return False, str(e), 400
+
+            extension, content_type = FORMATS[image_format]
+            key = get_storage(current_app).save(content_key('originals', data, extension), data, content_type)
+
+            image = VenueImage(venue_id=venue_id, kind=kind, original_key=key, status='pending')
+            db.session.add(image)
+            db.session.commit()
+
+            run_in_background(process_venue_image_job, image.id)
+            return True, self._image_dict(image), 202
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error uploading venue image: {str(e)}")
+            return False, "Database error occurred", 500
+        except Exception as e:
+            print(f"Error uploading venue image: {str(e)}")
+            return False, str(e), 500
+
+    def get_image(self, venue_id: int, image_id: int):
+        image = VenueImage.query.filter_by(id=image_id, venue_id=venue_id).first()
+        if not image:
+            return False, "Image not found"
+        return True, self._image_dict(image)
+
+    def process_image(self, image_id: int):
+        image = db.session.get(VenueImage, image_id)
+        if not image or image.status != 'pending':
+            return False
+
+        storage = get_storage(current_app)
+        widths = [int(width) for width in current_app.config.get('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')]
+        display_width = current_app.config.get('IMAGE_DISPLAY_WIDTH', 640)
+        try:
+            variants = []
+            for width, image_format, data in build_variants(storage.read(image.original_key), widths):
+                extension, content_type = FORMATS[image_format]
+                key = storage.save(content_key('venues', data, extension), data, content_type)
+                variants.append({'width': width, 'format': extension, 'url': storage.url(key)})
+        except Exception as e:
+            db.session.rollback()
+            image.status = 'failed'
+            image.error = str(e)
+            db.session.commit()
+            print(f"Error processing venue image {image_id}: {str(e)}")
+            return False
+
+        jpegs = [variant for variant in variants if variant['format'] == 'jpg']
+        webps = [variant for variant in variants if variant['format'] == 'webp']
+        if not jpegs:
+            image.status = 'failed'
+            image.error = 'No image variants were generated'
+            db.session.commit()
+            return False
+
+        venue = image.venue
+        if image.kind == 'menu':
+            venue.menu_image_url = jpegs[-1]['url']
+        else:
+            fitting = [variant for variant in jpegs if variant['width'] >= display_width]
+            venue.image_url = (fitting[0] if fitting else jpegs[-1])['url']
+            venue.image_srcset = ', '.join(f"{variant['url']} {variant['width']}w" for variant in webps)
+
+        image.variants = json.dumps(variants)
+        image.status = 'ready'
+        db.session.commit()
+        return True
+
+    def process_pending_images(self, older_than_minutes: int = 5):
+        cutoff = datetime.utcnow() - timedelta(minutes=older_than_minutes)
+        image_ids = [row.id for row in db.session.query(VenueImage.id).filter(
+            VenueImage.status == 'pending', VenueImage.created_at <= cutoff
+        ).order_by(VenueImage.id)]
+        return [image_id for image_id in image_ids if self.process_image(image_id)]
+
+
+def process_venue_image_job(image_id):
+    VenueFacade().process_image(image_id)
+
+
+def purge_venue_job(venue_id):
+    VenueFacade().purge_venue(venue_id, current_app.config.get('VENUE_PURGE_BATCH_SIZE', 1000))
@@ -0,0 +1,191 @@
+from ..models import WaitlistEntry, Reservation, ReservationStatus, ReservationStatusEvent, Venue, INACTIVE_STATUSES
+from ..extensions import db
+from datetime import datetime
+from sqlalchemy import and_, exists
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import aliased
+
+
+def slot_taken_clause(venue_id, reservation_time):
+    return exists().where(and_(
+        Reservation.venue_id == venue_id,
+        Reservation.reservation_time == reservation_time,
+        Reservation.deleted_at.is_(None),
+        Reservation.status.notin_(INACTIVE_STATUSES)
+    ))
+
+
+class WaitlistFacade:
+    def __init__(self):
+        pass
+
+    def _entry_dict(self, entry):
+        return {
+            'id': entry.id,
+            'venue_id': entry.venue_id,
+            'reservation_time': entry.reservation_time.isoformat(),
+            'party_size': entry.party_size,
+            'notes': entry.notes,
+            'status': entry.status,
+            'reservation_id': entry.reservation_id,
+            'position': None
+        }
+
+    def join_waitlist(self, user, venue_id, data):
+        try:
+            venue = Venue.query.get(venue_id)
+            if not venue or venue.deleted_at is not None:
+                return False, "Venue not found", 404
+
+            if user.user_type.value == 'owner':
+                return False, "Only customers can join a waitlist", 403
+
+            if not all(field in data for field in ['reservation_time', 'party_size']):
+                return False, "Missing required fields", 400
+
+            try:
+                reservation_time = datetime.strptime(data['reservation_time'], "%Y-%m-%d %H:%M")
+                if reservation_time < datetime.utcnow():
+                    return False, "Reservation time must be in the future", 400
+            except ValueError:
+                return False, "Invalid datetime format", 400
+
+            if not db.session.query(slot_taken_clause(venue_id, reservation_time)).scalar():
+                return False, "This time slot is free; book it directly", 409
+
+            existing = WaitlistEntry.query.filter_by(
+                customer_id=user.id, venue_id=venue_id, reservation_time=reservation_time, status='waiting'
+            ).first()
+            if existing:
+                return False, "You are already on the waitlist for this time slot", 409
+
+            entry = WaitlistEntry(
+                customer_id=user.id,
+                venue_id=venue_id,
+                reservation_time=reservation_time,
+                party_size=data['party_size'],
+                notes=data.get('notes', '')
+            )
+            db.session.add(entry)
+            db.session.commit()
+            return True, self._entry_dict(entry), 201
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error joining waitlist: {str(e)}")
+            return False, "Database error occurred", 500
+
+    def get_entries_for_user(self, user):
+        # Position counts the waiting entries queued ahead for the same slot.
+        ahead = aliased(WaitlistEntry)
+        position = db.session.query(db.func.count(ahead.id)).filter(
+            ahead.venue_id == WaitlistEntry.venue_id,
+            ahead.reservation_time == WaitlistEntry.reservation_time,
+            ahead.status == 'waiting',
+            ahead.id <= WaitlistEntry.id
+        ).scalar_subquery()
+
+        rows = db.session.query(WaitlistEntry, position) \
+            .filter(WaitlistEntry.customer_id == user.id) \
+            .order_by(WaitlistEntry.reservation_time, WaitlistEntry.id) \
+            .all()
+        entries = []
+        for entry, place in rows:
+            item = self._entry_dict(entry)
+            item['position'] = place if entry.status == 'waiting' else None
+            entries.append(item)
+        return entries
+
+    def leave_waitlist(self, entry_id, user):
+        try:
+            entry = db.session.get(WaitlistEntry, entry_id)
+            if not entry:
+                return False, "Waitlist entry not found", 404
+
+            if entry.customer_id != user.id:
+                return False, "No permission to change this waitlist entry", 403
+
+            if entry.status != 'waiting':
+                return False, f"Waitlist entry is already {entry.status}", 409
+
+            entry.status = 'cancelled'
+            db.session.commit()
+            return True, "Left the waitlist", 200
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error leaving waitlist: {str(e)}")
+            return False, "Database error occurred", 500
+
+    def _next_promotable(self, venue_id=None, reservation_time=None):
+        # The head of each slot's queue whose slot is free. SKIP LOCKED lets
+        # concurrent workers take different slots, and because a locked head is
+        # still "waiting", no other worker sees a later entry of that slot as
+        # its head. This only orders promotion workers among themselves; a
+        # direct booking of the same slot is stopped by the unique index on
+        # active reservations (see promote).
+        earlier = aliased(WaitlistEntry)
+        query = WaitlistEntry.query.filter(
+            WaitlistEntry.status == 'waiting',
+            WaitlistEntry.reservation_time > datetime.utcnow(),
+            ~exists().where(and_(
+                earlier.venue_id == WaitlistEntry.venue_id,
+                earlier.reservation_time == WaitlistEntry.reservation_time,
+                earlier.status == 'waiting',
+                earlier.id < WaitlistEntry.id
+            )),
+            ~slot_taken_clause(WaitlistEntry.venue_id, WaitlistEntry.reservation_time)
+        )
+        if venue_id is not None:
+            query = query.filter(WaitlistEntry.venue_id == venue_id,
+                                 WaitlistEntry.reservation_time == reservation_time)
+        return query.order_by(WaitlistEntry.id).with_for_update(skip_locked=True).first()
+
+    def promote(self, venue_id=None, reservation_time=None, limit=100):
+        # Turns queued customers into pending reservations for freed slots, one
+        # committed transaction per slot. Returns the promoted entry ids.
+        promoted = []
+        conflicts = set()
+        try:
+            while len(promoted) < limit:
+                entry = self._next_promotable(venue_id, reservation_time)
+                if entry is None or entry.id in conflicts:
+                    break
+
+                entry_id = entry.id
+                reservation = Reservation(
+                    venue_id=entry.venue_id,
+                    customer_id=entry.customer_id,
+                    reservation_time=entry.reservation_time,
+                    party_size=entry.party_size,
+                    status=ReservationStatus.PENDING,
+                    notes=entry.notes
+                )
+                try:
+                    db.session.add(reservation)
+                    db.session.flush()
+                    db.session.add(ReservationStatusEvent(reservation_id=reservation.id, venue_id=entry.venue_id,
+                                                          to_status=ReservationStatus.PENDING,
+                                                          actor_id=entry.customer_id))
+                    entry.status = 'promoted'
+                    entry.reservation_id = reservation.id
+                    db.session.commit()
+                except IntegrityError:
+                    # A direct booking took the slot after it was picked; the
+                    # entry keeps waiting for the next time the slot frees up.
+                    db.session.rollback()
+                    conflicts.add(entry_id)
+                    continue
+                promoted.append(entry_id)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error promoting waitlist: {str(e)}")
+        return promoted
+
+
+def promote_waitlist_job(venue_id, reservation_time):
+    WaitlistFacade().promote(venue_id, reservation_time)
+
+
+def promote_freed_slot_job(reservation_id):
+    reservation = db.session.get(Reservation, reservation_id)
+    if reservation:
+        WaitlistFacade().promote(reservation.venue_id, reservation.reservation_time)
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+from functools import wraps
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+}
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # No JWT was checked for this view, so the response is the same for everyone.
+        return None
+
+
+def _version_etag(value):
+    # The user is part of the tag so one user's ETag never validates another
+    # user's list, e.g. through a shared cache.
+    key = repr((request.full_path, _identity(), value))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(version):
+    # version(*args, **kwargs) gets the handler's arguments and returns a cheap
+    # value that changes whenever the response would, or None to skip the check.
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+                return func(*args, **kwargs)
+
+            value = version(*args, **kwargs)
+            if value is None:
+                return func(*args, **kwargs)
+
+            etag = _version_etag(value)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            g.conditional_etag = etag
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _is_cacheable(response):
+    return (request.method in ('GET', 'HEAD')
+            and response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed)
+
+
+def _add_etag(response):
+    if 'ETag' in response.headers:
+        return
+    etag = g.pop('conditional_etag', None)
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    else:
+        response.add_etag(weak=True)
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.make_conditional(request)
+
+
+def _choose_encoding(brotli):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(response, brotli, min_size, level):
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return
+    response.vary.add('Accept-Encoding')
+
+    if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return
+
+    encoding = _choose_encoding(brotli)
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=min(level, 11)))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(data, compresslevel=min(level, 9), mtime=0))
+    else:
+        return
+    response.headers['Content-Encoding'] = encoding
+
+
+def init_http_cache(app):
+    conditional_get = app.config.get('CONDITIONAL_GET_ENABLED', True)
+    compression = app.config.get('COMPRESSION_ENABLED', True)
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+    if not conditional_get and not compression:
+        return
+
+    brotli = None
+    if compression and app.config.get('COMPRESSION_BROTLI', True):
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+
+    @app.after_request
+    def finish_http_cache(response):
+        if conditional_get and _is_cacheable(response):
+            _add_etag(response)
+        if compression:
+            _compress(response, brotli, min_size, level)
+        return response
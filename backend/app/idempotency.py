@@ -0,0 +1,167 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+from flask_restx.utils import unpack
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+PURGE_BATCH_SIZE = 1000
+# Answers that only describe the moment (timeouts, throttling) are not stored;
+# a retry with the same key runs the request again.
+TRANSIENT_STATUS_CODES = (408, 429)
+
+
+def _request_hash():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _find(user_id, key):
+    return IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return {'message': f'{HEADER} was already used for a different request'}, 422
+    if record.status_code is None:
+        return {'message': f'A request with this {HEADER} is still being processed'}, 409, {'Retry-After': '1'}
+    return json.loads(record.response_body), record.status_code, {'Idempotent-Replayed': 'true'}
+
+
+def _claim(user_id, key, request_hash):
+    now = datetime.utcnow()
+    record = _find(user_id, key)
+    if record is not None and record.expires_at <= now:
+        db.session.delete(record)
+        db.session.flush()
+        record = None
+    if record is not None:
+        lease = timedelta(seconds=current_app.config.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+        if record.status_code is None and record.request_hash == request_hash and record.claimed_at <= now - lease:
+            return _take_over(record, now)
+        return None, record
+
+    record = IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=request_hash,
+        claimed_at=now,
+        expires_at=now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400))
+    )
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker claimed the key between our lookup and insert.
+        db.session.rollback()
+        return None, _find(user_id, key)
+    return record.id, None
+
+
+def _take_over(record, now):
+    # The request holding the key never stored a response, most likely because
+    # its worker died. Only one retry wins the conditional update.
+    record_id = record.id
+    taken = IdempotencyKey.query.filter(
+        IdempotencyKey.id == record_id,
+        IdempotencyKey.status_code.is_(None),
+        IdempotencyKey.claimed_at == record.claimed_at
+    ).update({'claimed_at': now}, synchronize_session=False)
+    db.session.commit()
+    if taken:
+        return record_id, None
+    return None, db.session.get(IdempotencyKey, record_id)
+
+
+def _release(record_id):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(id=record_id).delete()
+    db.session.commit()
+
+
+def stage_response(data, status_code):
+    # Store the answer for the request's key in the caller's open transaction,
+    # so the change and its replayable response commit (or roll back) together.
+    # A worker that dies after that commit leaves nothing for a retry to redo.
+    record_id = g.get('idempotency_record_id')
+    if record_id is None:
+        return
+    IdempotencyKey.query.filter_by(id=record_id).update({
+        'status_code': status_code,
+        'response_body': json.dumps(data)
+    }, synchronize_session=False)
+    g.idempotency_staged = True
+
+
+def idempotent(func):
+    # Place below @jwt_required(); keys are scoped to the authenticated user.
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return func(*args, **kwargs)
+
+        key = key.strip()
+        if not key or len(key) > 255:
+            return {'message': f'{HEADER} must be 1-255 characters'}, 400
+
+        user_id = int(get_jwt_identity())
+        request_hash = _request_hash()
+        record_id, existing = _claim(user_id, key, request_hash)
+        if record_id is None:
+            if existing is None:
+                return {'message': f'A request with this {HEADER} is still being processed'}, 409, {'Retry-After': '1'}
+            return _replay(existing, request_hash)
+
+        g.idempotency_record_id = record_id
+        try:
+            response = func(*args, **kwargs)
+        except Exception:
+            _release(record_id)
+            raise
+        finally:
+            g.pop('idempotency_record_id', None)
+
+        data, code, headers = unpack(response)
+        if code >= 500 or code in TRANSIENT_STATUS_CODES or not isinstance(data, (dict, list)):
+            # Let the client retry failures instead of replaying them.
+            g.pop('idempotency_staged', None)
+            _release(record_id)
+            return response
+        if g.pop('idempotency_staged', False):
+            return response
+
+        IdempotencyKey.query.filter_by(id=record_id).update({
+            'status_code': code,
+            'response_body': json.dumps(data)
+        })
+        db.session.commit()
+        return response
+    return wrapper
+
+
+def purge_expired_keys(batch_size=PURGE_BATCH_SIZE):
+    purged = 0
+    now = datetime.utcnow()
+    while True:
+        ids = [row.id for row in IdempotencyKey.query.with_entities(IdempotencyKey.id)
+               .filter(IdempotencyKey.expires_at <= now).limit(batch_size)]
+        if not ids:
+            return purged
+        IdempotencyKey.query.filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        purged += len(ids)
+
+
+def init_idempotency(app):
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Delete expired Idempotency-Key records."""
+        click.echo(f'Purged {purge_expired_keys()} expired idempotency keys')
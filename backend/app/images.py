@@ -0,0 +1,70 @@
+import hashlib
+from io import BytesIO
+
+# Pillow is imported inside the functions so it only loads in processes that
+# actually handle uploads.
+
+FORMATS = {'JPEG': ('jpg', 'image/jpeg'), 'PNG': ('png', 'image/png'), 'WEBP': ('webp', 'image/webp')}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+MAX_PIXELS = 40_000_000
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def content_key(prefix, data, extension):
+    return f'{prefix}/{hashlib.sha256(data).hexdigest()[:20]}.{extension}'
+
+
+def inspect_image(data):
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except Image.DecompressionBombError:
+        raise InvalidImage('Image dimensions are too large')
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise InvalidImage(f'Not a valid image: {e}')
+
+    if image_format not in FORMATS:
+        raise InvalidImage(f'Unsupported image format: {image_format}')
+    if width * height > MAX_PIXELS:
+        raise InvalidImage('Image dimensions are too large')
+    return image_format, width, height
+
+
+def _encode(image, image_format):
+    out = BytesIO()
+    if image_format == 'JPEG':
+        image.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(out, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return out.getvalue()
+
+
+def build_variants(data, widths):
+    # Yields (width, format, bytes) for every target width no larger than the
+    # original, in JPEG (fallback) and WebP, never upscaling.
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        elif image.mode == 'L':
+            image = image.convert('RGB')
+
+        targets = sorted({min(width, image.width) for width in widths})
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+            for image_format in ('JPEG', 'WEBP'):
+                yield width, image_format, _encode(resized, image_format)
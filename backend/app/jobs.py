@@ -0,0 +1,23 @@
+import threading
+from flask import current_app
+from .extensions import db
+
+
+def run_in_background(func, *args, **kwargs):
+    # Fire-and-forget work in a daemon thread with its own app context and
+    # session. Jobs must be safe to resume from the CLI if the worker dies.
+    app = current_app._get_current_object()
+    if app.config.get('JOBS_INLINE', False):
+        func(*args, **kwargs)
+        return None
+
+    def run():
+        with app.app_context():
+            try:
+                func(*args, **kwargs)
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=run, name=f'job-{func.__name__}', daemon=True)
+    thread.start()
+    return thread
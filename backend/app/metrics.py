@@ -0,0 +1,179 @@
+import time
+from threading import Lock
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from .extensions import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.request_duration = {}
+        self.request_db_duration = {}
+        self.request_queries = {}
+        self.requests_total = {}
+        self.exceptions_total = {}
+
+    def _histogram(self, store, key, buckets):
+        if key not in store:
+            store[key] = Histogram(buckets)
+        return store[key]
+
+    def observe_request(self, method, endpoint, status, duration, db_duration, query_count):
+        key = (method, endpoint)
+        with self.lock:
+            self._histogram(self.request_duration, key, LATENCY_BUCKETS).observe(duration)
+            self._histogram(self.request_db_duration, key, LATENCY_BUCKETS).observe(db_duration)
+            self._histogram(self.request_queries, key, QUERY_COUNT_BUCKETS).observe(query_count)
+            status_key = (method, endpoint, str(status))
+            self.requests_total[status_key] = self.requests_total.get(status_key, 0) + 1
+
+    def observe_exception(self, method, endpoint):
+        key = (method, endpoint)
+        with self.lock:
+            self.exceptions_total[key] = self.exceptions_total.get(key, 0) + 1
+
+    def render(self, pool_stats=None):
+        lines = []
+        with self.lock:
+            _render_histogram(lines, 'http_request_duration_seconds',
+                              'Request latency in seconds', self.request_duration)
+            _render_histogram(lines, 'http_request_db_duration_seconds',
+                              'Time spent in SQL statements per request in seconds', self.request_db_duration)
+            _render_histogram(lines, 'http_request_sql_statements',
+                              'Number of SQL statements executed per request', self.request_queries)
+            _render_counter(lines, 'http_requests_total', 'Completed requests by status code',
+                            ('method', 'endpoint', 'status'), self.requests_total)
+            _render_counter(lines, 'http_request_exceptions_total', 'Requests that raised an unhandled exception',
+                            ('method', 'endpoint'), self.exceptions_total)
+        for name, value in (pool_stats or {}).items():
+            lines.append(f'# HELP db_pool_{name} SQLAlchemy connection pool {name} connections')
+            lines.append(f'# TYPE db_pool_{name} gauge')
+            lines.append(f'db_pool_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for key, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{_labels(("method", "endpoint"), key, [("le", bound)])} {count}')
+        lines.append(f'{name}_bucket{_labels(("method", "endpoint"), key, [("le", "+Inf")])} {histogram.total}')
+        lines.append(f'{name}_sum{_labels(("method", "endpoint"), key)} {histogram.sum}')
+        lines.append(f'{name}_count{_labels(("method", "endpoint"), key)} {histogram.total}')
+
+
+def _render_counter(lines, name, help_text, label_names, counters):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for key, value in sorted(counters.items()):
+        lines.append(f'{name}{_labels(label_names, key)} {value}')
+
+
+registry = MetricsRegistry()
+
+
+def pool_stats(engine):
+    stats = {}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        getter = getattr(engine.pool, name, None)
+        if getter is not None:
+            try:
+                stats[name] = getter()
+            except (AttributeError, TypeError):
+                pass
+    return stats
+
+
+def _endpoint_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if has_request_context() and 'request_metrics' in g:
+        g.request_metrics['queries'] += 1
+        g.request_metrics['db_time'] += elapsed
+
+
+def _handle_error(context):
+    start_times = context.connection.info.get('query_start_time') if context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def init_metrics(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    app.extensions['metrics_engine'] = engine
+
+    server_timing = app.config.get('METRICS_SERVER_TIMING', True)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = {'start': time.perf_counter(), 'queries': 0, 'db_time': 0.0}
+
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+
+        duration = time.perf_counter() - metrics['start']
+        registry.observe_request(request.method, _endpoint_label(), response.status_code,
+                                 duration, metrics['db_time'], metrics['queries'])
+
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={metrics["db_time"] * 1000:.2f};desc="{metrics["queries"]} queries", '
+                f'app;dur={duration * 1000:.2f}'
+            )
+        return response
+
+    @app.teardown_request
+    def record_request_exception(exc):
+        if exc is not None:
+            registry.observe_exception(request.method, _endpoint_label())
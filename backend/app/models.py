@@ -18,16 +18,28 @@ class ReservationStatus(Enum):
     REJECTED = "rejected"
     CANCELLED = "cancelled"
 
+# Reservations in these states no longer hold their slot.
+INACTIVE_STATUSES = (ReservationStatus.CANCELLED, ReservationStatus.REJECTED)
+ACTIVE_SLOT_CONDITION = "deleted_at IS NULL AND status NOT IN ('CANCELLED', 'REJECTED')"
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
     password_hash = db.Column(db.String(120), nullable=False)
     user_type = db.Column(db.Enum(UserType), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    venue = db.relationship('Venue', back_populates='owner', uselist=False, cascade='all, delete-orphan')
-    reservations = db.relationship('Reservation', back_populates='customer')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    venue = db.relationship('Venue', back_populates='owner', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+    reservations = db.relationship('Reservation', back_populates='customer', cascade='all, delete-orphan', passive_deletes=True)
+
+    # Usernames and emails are unique regardless of case; lookups compare
+    # lower(...) so they can use these indexes.
+    __table_args__ = (
+        db.Index('uq_users_username_lower', db.func.lower(username), unique=True),
+        db.Index('uq_users_email_lower', db.func.lower(email), unique=True),
+    )
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -47,36 +59,213 @@ class Venue(db.Model):
     weekdays_hours = db.Column(db.String(11), nullable=False)  
     weekend_hours = db.Column(db.String(11), nullable=False) 
     address = db.Column(db.String(200), unique=True, nullable=False)
-    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     owner = db.relationship('User', back_populates='venue')
-    reservations = db.relationship('Reservation', back_populates='venue', cascade="all, delete-orphan")
-    comments = db.relationship('VenueComment', back_populates='venue', cascade="all, delete-orphan")
+    reservations = db.relationship('Reservation', back_populates='venue', cascade="all, delete-orphan", passive_deletes=True)
+    comments = db.relationship('VenueComment', back_populates='venue', cascade="all, delete-orphan", passive_deletes=True)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    image_srcset = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime)
+    images = db.relationship('VenueImage', back_populates='venue', cascade="all, delete-orphan", passive_deletes=True)
+    hours = db.relationship('VenueHours', back_populates='venue', cascade="all, delete-orphan", passive_deletes=True,
+                            order_by='[VenueHours.weekday, VenueHours.date, VenueHours.opens_at]')
+    # Running totals of customer comment ratings, kept up to date on every
+    # comment write so listings can filter on the average without aggregating.
+    rating = db.Column(db.Float)
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_venues_venue_type_rating', 'venue_type', 'rating'),
+        db.Index('ix_venues_rating', 'rating'),
+    )
+
+class VenueHours(db.Model):
+    # One opening range per row, in minutes from midnight. Weekly rows set
+    # weekday (0 = Monday); date rows are exceptions that replace the weekly
+    # hours for that day, or close it when closed is set. closes_at may run
+    # past 1440 for venues that close after midnight.
+    __tablename__ = 'venue_hours'
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    weekday = db.Column(db.SmallInteger)
+    date = db.Column(db.Date)
+    opens_at = db.Column(db.SmallInteger)
+    closes_at = db.Column(db.SmallInteger)
+    closed = db.Column(db.Boolean, nullable=False, default=False)
+    venue = db.relationship('Venue', back_populates='hours')
+
+    __table_args__ = (
+        db.Index('ix_venue_hours_venue_id_weekday', 'venue_id', 'weekday', 'opens_at', 'closes_at'),
+        db.Index('ix_venue_hours_venue_id_date', 'venue_id', 'date'),
+        db.Index('ix_venue_hours_weekday_opens_at', 'weekday', 'opens_at', 'closes_at', 'venue_id'),
+    )
 
 class Reservation(db.Model):
+    # On Postgres the table is range-partitioned by month on reservation_time with
+    # primary key (id, reservation_time); ids stay unique, so the ORM keys on id alone.
     __tablename__ = 'reservations'
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
     reservation_time = db.Column(db.DateTime, nullable=False)
     party_size = db.Column(db.Integer, nullable=False)
     status = db.Column(db.Enum(ReservationStatus), default=ReservationStatus.PENDING)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    deleted_at = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
     customer = db.relationship('User', back_populates='reservations')
     venue = db.relationship('Venue', back_populates='reservations')
 
+    __table_args__ = (
+        db.Index('ix_reservations_customer_id_updated_at', 'customer_id', 'updated_at', 'id'),
+        db.Index('ix_reservations_venue_id_updated_at', 'venue_id', 'updated_at', 'id'),
+        db.Index('ix_reservations_venue_id_reservation_time', 'venue_id', 'reservation_time'),
+        # A slot holds at most one active reservation, whichever path books it.
+        db.Index('uq_reservations_active_slot', 'venue_id', 'reservation_time', unique=True,
+                 postgresql_where=db.text(ACTIVE_SLOT_CONDITION), sqlite_where=db.text(ACTIVE_SLOT_CONDITION)),
+    )
+    # Every ORM flush checks and bumps version; Core updates must do the same.
+    __mapper_args__ = {'version_id_col': version}
+
     def __repr__(self):
         return f'<Reservation {self.id} for {self.venue.name}>'
+
+class ReservationStatusEvent(db.Model):
+    # Append-only history of status changes, written in the same transaction
+    # as the change itself. Never updated or deleted by the application.
+    __tablename__ = 'reservation_status_events'
+    id = db.Column(db.Integer, primary_key=True)
+    reservation_id = db.Column(db.Integer, nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    from_status = db.Column(db.Enum(ReservationStatus))
+    to_status = db.Column(db.Enum(ReservationStatus), nullable=False)
+    actor_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_reservation_status_events_reservation_id', 'reservation_id', 'id'),
+        db.Index('ix_reservation_status_events_venue_id_created_at', 'venue_id', 'created_at'),
+    )
+
+class WaitlistEntry(db.Model):
+    # A customer queued for a taken slot. Entries are promoted to pending
+    # reservations in id order when the slot frees up.
+    __tablename__ = 'waitlist_entries'
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    reservation_time = db.Column(db.DateTime, nullable=False)
+    party_size = db.Column(db.Integer, nullable=False)
+    notes = db.Column(db.Text)
+    status = db.Column(db.String(10), nullable=False, default='waiting')
+    # No foreign key: the partitioned reservations table is keyed on (id, reservation_time).
+    reservation_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_waitlist_entries_venue_id_reservation_time', 'venue_id', 'reservation_time', 'status', 'id'),
+        db.Index('ix_waitlist_entries_customer_id', 'customer_id', 'status'),
+    )
+
+class ReservationArchive(db.Model):
+    __tablename__ = 'reservations_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    customer_id = db.Column(db.Integer, nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    reservation_time = db.Column(db.DateTime, nullable=False)
+    party_size = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Enum(ReservationStatus))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    deleted_at = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_reservations_archive_customer_id_reservation_time', 'customer_id', 'reservation_time'),
+        db.Index('ix_reservations_archive_venue_id_reservation_time', 'venue_id', 'reservation_time'),
+    )
+
+class ReservationTombstone(db.Model):
+    # Reservations that left the reservations table (archived, or removed with
+    # their venue or user), so the change feed can tell clients to drop them.
+    # No foreign keys: the venue and users may be gone too.
+    __tablename__ = 'reservation_tombstones'
+    id = db.Column(db.Integer, primary_key=True)
+    reservation_id = db.Column(db.Integer, nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    customer_id = db.Column(db.Integer, nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(10), nullable=False)
+    removed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('ix_reservation_tombstones_customer_id_removed_at', 'customer_id', 'removed_at', 'reservation_id'),
+        db.Index('ix_reservation_tombstones_owner_id_removed_at', 'owner_id', 'removed_at', 'reservation_id'),
+    )
     
 class VenueComment(db.Model):
     __tablename__ = "venue_comments"
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     text = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Integer) 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     venue = db.relationship('Venue', back_populates='comments')
-    user = db.relationship('User')
\ No newline at end of file
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_venue_comments_venue_id_updated_at', 'venue_id', 'updated_at', 'id'),
+    )
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # When the request holding the key started; another request may take the
+    # key over once this is older than IDEMPOTENCY_LEASE_SECONDS.
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_id_key'),
+    )
+
+class RefreshTokenFamily(db.Model):
+    # One row per login session. Every refresh token issued for the session
+    # carries the family id and its generation; only the latest generation may
+    # be exchanged, so presenting an older one means the token was replayed.
+    __tablename__ = 'refresh_token_families'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime)
+
+class VenueImage(db.Model):
+    __tablename__ = 'venue_images'
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.String(10), nullable=False)
+    original_key = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    variants = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    venue = db.relationship('Venue', back_populates='images')
@@ -0,0 +1,157 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, or_, exists
+from .models import VenueHours
+
+# Opening hours are stored as minute offsets from midnight. A range that closes
+# after midnight keeps closes_at above 1440 on the day it opened, so
+# "22:00-02:00" on Friday is (1320, 1560) on weekday 4.
+
+MINUTES_PER_DAY = 1440
+WEEKDAYS = range(0, 5)
+WEEKEND = range(5, 7)
+
+
+def local_now(timezone):
+    # Opening hours are naive local times, so "now" has to be the wall clock
+    # where the venues are, not the server's.
+    return datetime.now(ZoneInfo(timezone)).replace(tzinfo=None)
+
+
+def parse_time(value):
+    hours, minutes = value.strip().split(':')
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= minutes < 60 and (0 <= hours < 24 or (hours == 24 and minutes == 0))):
+        raise ValueError(f'Invalid time: {value}')
+    return hours * 60 + minutes
+
+
+def parse_range(opens, closes):
+    opens_at, closes_at = parse_time(opens), parse_time(closes)
+    if opens_at == MINUTES_PER_DAY:
+        raise ValueError('Opening time must be before 24:00')
+    if closes_at <= opens_at:
+        closes_at += MINUTES_PER_DAY
+    return opens_at, closes_at
+
+
+def parse_hours_string(hours):
+    try:
+        opens, closes = hours.split('-')
+        return parse_range(opens, closes)
+    except (AttributeError, ValueError):
+        raise ValueError(f'Invalid hours "{hours}", expected HH:MM-HH:MM')
+
+
+def format_minutes(minutes):
+    if minutes == MINUTES_PER_DAY:
+        return '24:00'
+    hours, minutes = divmod(minutes % MINUTES_PER_DAY, 60)
+    return f'{hours:02d}:{minutes:02d}'
+
+
+def format_range(opens_at, closes_at):
+    return f'{format_minutes(opens_at)}-{format_minutes(closes_at)}'
+
+
+def rows_from_legacy(weekdays_hours, weekend_hours):
+    weekdays = parse_hours_string(weekdays_hours)
+    weekend = parse_hours_string(weekend_hours)
+    return [{'weekday': day, 'date': None, 'opens_at': weekdays[0], 'closes_at': weekdays[1], 'closed': False}
+            for day in WEEKDAYS] + \
+           [{'weekday': day, 'date': None, 'opens_at': weekend[0], 'closes_at': weekend[1], 'closed': False}
+            for day in WEEKEND]
+
+
+def parse_opening_hours(items):
+    # Accepts [{"weekday": 0-6 | "date": "YYYY-MM-DD", "opens": "HH:MM",
+    # "closes": "HH:MM"} | {"date": ..., "closed": true}, ...].
+    if not isinstance(items, list):
+        raise ValueError('opening_hours must be a list')
+
+    rows = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('Each opening_hours entry must be an object')
+
+        weekday, day = item.get('weekday'), item.get('date')
+        if (weekday is None) == (day is None):
+            raise ValueError('Each opening_hours entry needs exactly one of weekday or date')
+        if weekday is not None and (not isinstance(weekday, int) or not 0 <= weekday <= 6):
+            raise ValueError('weekday must be 0 (Monday) to 6 (Sunday)')
+        if day is not None:
+            try:
+                day = date.fromisoformat(day)
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid date: {day}')
+
+        if item.get('closed'):
+            if day is None:
+                raise ValueError('Only date exceptions can be marked closed; omit the weekday instead')
+            rows.append({'weekday': None, 'date': day, 'opens_at': None, 'closes_at': None, 'closed': True})
+            continue
+
+        try:
+            opens_at, closes_at = parse_range(item['opens'], item['closes'])
+        except (KeyError, AttributeError, ValueError):
+            raise ValueError('Each opening_hours entry needs opens and closes as HH:MM')
+        rows.append({'weekday': weekday, 'date': day, 'opens_at': opens_at, 'closes_at': closes_at, 'closed': False})
+
+    for key in ('weekday', 'date'):
+        by_day = {}
+        for row in rows:
+            if row[key] is not None:
+                by_day.setdefault(row[key], []).append(row)
+        for day_rows in by_day.values():
+            if any(row['closed'] for row in day_rows) and len(day_rows) > 1:
+                raise ValueError('A closed date cannot also have opening hours')
+            ranges = sorted((row['opens_at'], row['closes_at']) for row in day_rows if not row['closed'])
+            if any(previous[1] > current[0] for previous, current in zip(ranges, ranges[1:])):
+                raise ValueError('Opening hours for the same day overlap')
+    return rows
+
+
+def serialize_hours(row):
+    data = {'weekday': row.weekday, 'date': row.date.isoformat() if row.date else None, 'closed': row.closed}
+    if not row.closed:
+        data['opens'] = format_minutes(row.opens_at)
+        data['closes'] = format_minutes(row.closes_at)
+    return data
+
+
+def legacy_summary(rows, days):
+    # First range of the first listed day, for the weekdays_hours/weekend_hours
+    # strings older clients still read.
+    for day in days:
+        ranges = sorted((row['opens_at'], row['closes_at']) for row in rows
+                        if row['weekday'] == day and not row['closed'])
+        if ranges:
+            return format_range(*ranges[0])
+    return None
+
+
+def _has_exception(venue_id, day):
+    return exists().where(and_(VenueHours.venue_id == venue_id, VenueHours.date == day))
+
+
+def open_at_clause(venue_id, when):
+    # SQL predicate that is true when the venue is open at the naive local
+    # datetime `when`. Date exceptions replace the weekly hours for their day,
+    # including ranges that spill over from that day into the next.
+    day, minute = when.date(), when.hour * 60 + when.minute
+    previous_day = day - timedelta(days=1)
+    hours = VenueHours.__table__.alias('open_hours')
+    open_today = and_(hours.c.opens_at <= minute, hours.c.closes_at > minute)
+    open_since_yesterday = hours.c.closes_at > minute + MINUTES_PER_DAY
+
+    return exists().where(and_(
+        hours.c.venue_id == venue_id,
+        hours.c.closed.is_(False),
+        or_(
+            and_(hours.c.date == day, open_today),
+            and_(hours.c.date == previous_day, open_since_yesterday),
+            and_(hours.c.weekday == day.weekday(), open_today, ~_has_exception(venue_id, day)),
+            and_(hours.c.weekday == previous_day.weekday(), open_since_yesterday,
+                 ~_has_exception(venue_id, previous_day)),
+        )
+    ))
@@ -0,0 +1,59 @@
+from datetime import date
+from sqlalchemy import text
+
+PARENT = 'reservations'
+DEFAULT_PARTITION = 'reservations_default'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month:%Y%m}'
+
+
+def is_partitioned(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"
+    ), {'parent': PARENT}).scalar()
+
+
+def create_month_partition(connection, month):
+    name = partition_name(month)
+    if connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+        return False
+
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    # Rows that already landed in the default partition for this month have to
+    # move before the new partition can be attached.
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE reservation_time >= :start AND reservation_time < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    connection.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+    return True
+
+
+def ensure_reservation_partitions(connection, months_ahead=3, today=None):
+    if not is_partitioned(connection):
+        return None
+
+    first = month_start(today or date.today())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        if create_month_partition(connection, month):
+            created.append(partition_name(month))
+    return created
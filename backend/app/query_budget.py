@@ -0,0 +1,89 @@
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+from .extensions import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label, budget, statements):
+        self.label = label
+        self.budget = budget
+        self.statements = list(statements)
+        listing = '\n'.join(f'  {i}. {statement}' for i, statement in enumerate(self.statements, 1))
+        super().__init__(f'{label} executed {len(self.statements)} SQL statements, budget is {budget}:\n{listing}')
+
+
+def query_budget(max_queries):
+    def decorator(func):
+        func.query_budget = max_queries
+        return func
+    return decorator
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'after_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'after_cursor_execute', self._record)
+        return False
+
+    def assert_at_most(self, budget, label='Block'):
+        if self.count > budget:
+            raise QueryBudgetExceeded(label, budget, self.statements)
+
+    def assert_does_not_scale(self, make_request, grow, label='Request'):
+        with self:
+            make_request()
+        baseline = self.statements
+        grow()
+        with self:
+            make_request()
+        if self.count > len(baseline):
+            raise QueryBudgetExceeded(f'{label} (query count grew with result size)', len(baseline), self.statements)
+
+
+def _view_budget():
+    view = current_app.view_functions.get(request.endpoint)
+    view_class = getattr(view, 'view_class', None)
+    handler = getattr(view_class, request.method.lower(), None) if view_class else view
+    return getattr(handler, 'query_budget', None)
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_statements' in g:
+        g.query_statements.append(statement)
+
+
+def init_query_budget(app):
+    if not app.config.get('QUERY_BUDGET_ENFORCED', False):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'after_cursor_execute', _record_statement):
+        event.listen(engine, 'after_cursor_execute', _record_statement)
+
+    @app.before_request
+    def start_query_log():
+        g.query_statements = []
+
+    @app.after_request
+    def check_query_budget(response):
+        statements = g.pop('query_statements', [])
+        budget = _view_budget()
+        if budget is not None and len(statements) > budget:
+            raise QueryBudgetExceeded(f'{request.method} {request.path}', budget, statements)
+        return response
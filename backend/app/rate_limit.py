@@ -0,0 +1,166 @@
+import math
+import time
+from functools import wraps
+from threading import Lock
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit):
+    # "10/minute" allows bursts of 10 and refills one token every 6 seconds.
+    count, period = limit.split('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()]
+
+
+class MemoryBackend:
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = Lock()
+        self.calls = 0
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Each bucket records when it will be full again under its own
+            # limit, since one backend serves limits with different rates.
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+
+            self.calls += 1
+            if self.calls % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now):
+        # A bucket idle long enough to refill completely is the same as no bucket.
+        for key in [key for key, (_, _, full_at) in self.buckets.items() if full_at <= now]:
+            del self.buckets[key]
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisBackend:
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, rate):
+        allowed, tokens = self.script(keys=[f'rate_limit:{key}'], args=[capacity, rate])
+        allowed = bool(allowed)
+        return allowed, 0 if allowed else (1 - float(tokens)) / rate
+
+    def reset(self):
+        for key in self.client.scan_iter('rate_limit:*'):
+            self.client.delete(key)
+
+
+def create_backend(url):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+def remote_ip():
+    return f'ip:{request.remote_addr}'
+
+
+def user_or_ip():
+    identity = get_jwt_identity()
+    return f'user:{identity}' if identity else remote_ip()
+
+
+def rate_limit(config_key, key=remote_ip):
+    # Place below @jwt_required() when keying by user so the identity is verified.
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            limit = config.get(config_key)
+            backend = current_app.extensions.get('rate_limit')
+            if backend is None or not limit:
+                return func(*args, **kwargs)
+
+            capacity, rate = parse_limit(limit)
+            allowed, retry_after = backend.consume(f'{config_key}:{key()}', capacity, rate)
+            if not allowed:
+                return {'message': 'Too many requests, please try again later'}, 429, \
+                    {'Retry-After': str(max(1, math.ceil(retry_after)))}
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LoadShedder:
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.lock = Lock()
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            return self.in_flight <= self.max_in_flight
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def init_rate_limit(app):
+    if app.config.get('RATE_LIMIT_ENABLED', True):
+        app.extensions['rate_limit'] = create_backend(app.config.get('RATE_LIMIT_STORAGE_URL', 'memory://'))
+
+    max_in_flight = app.config.get('LOAD_SHED_MAX_IN_FLIGHT', 0)
+    if not max_in_flight:
+        return
+
+    shedder = LoadShedder(max_in_flight)
+    app.extensions['load_shedder'] = shedder
+    exempt = ('/health', '/metrics')
+    retry_after = str(app.config.get('LOAD_SHED_RETRY_AFTER', 1))
+
+    @app.before_request
+    def shed_load():
+        if request.path in exempt:
+            return None
+        request.environ['load_shedder.entered'] = True
+        if not shedder.enter():
+            return {'message': 'Server is busy, please retry shortly'}, 503, {'Retry-After': retry_after}
+        return None
+
+    @app.teardown_request
+    def release_load(exc):
+        if request.environ.pop('load_shedder.entered', False):
+            shedder.leave()
@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime
+import click
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from .extensions import db
+from .models import RefreshTokenFamily
+
+PURGE_BATCH_SIZE = 1000
+
+# Refresh tokens carry everything needed to mint the next pair (user id, user
+# type, family id and generation), so a refresh is a signature check plus one
+# conditional UPDATE on the family's primary key. Access tokens stay stateless
+# and short-lived.
+
+
+class RefreshTokenError(Exception):
+    pass
+
+
+def _refresh_ttl():
+    return current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+
+
+def _create_tokens(user_id, user_type, family_id, generation):
+    claims = {'user_type': user_type}
+    return {
+        'access_token': create_access_token(identity=str(user_id), additional_claims=claims),
+        'refresh_token': create_refresh_token(
+            identity=str(user_id),
+            additional_claims={**claims, 'fam': family_id, 'gen': generation}
+        )
+    }
+
+
+def issue_tokens(user):
+    family = RefreshTokenFamily(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        expires_at=datetime.utcnow() + _refresh_ttl()
+    )
+    db.session.add(family)
+    db.session.commit()
+    return _create_tokens(user.id, user.user_type.value, family.id, family.generation)
+
+
+def rotate_tokens(claims):
+    family_id, generation = claims.get('fam'), claims.get('gen')
+    if family_id is None or generation is None:
+        raise RefreshTokenError('Refresh token is not valid')
+
+    now = datetime.utcnow()
+    rotated = RefreshTokenFamily.query.filter(
+        RefreshTokenFamily.id == family_id,
+        RefreshTokenFamily.generation == generation,
+        RefreshTokenFamily.revoked_at.is_(None),
+        RefreshTokenFamily.expires_at > now
+    ).update({
+        'generation': generation + 1,
+        'last_used_at': now,
+        'expires_at': now + _refresh_ttl()
+    }, synchronize_session=False)
+
+    if rotated:
+        db.session.commit()
+        return _create_tokens(claims['sub'], claims['user_type'], family_id, generation + 1)
+
+    # An older generation came back after it was exchanged: either the token
+    # leaked or the client replayed it. End the whole session.
+    reused = RefreshTokenFamily.query.filter(
+        RefreshTokenFamily.id == family_id,
+        RefreshTokenFamily.generation > generation,
+        RefreshTokenFamily.revoked_at.is_(None),
+        RefreshTokenFamily.expires_at > now
+    ).update({'revoked_at': now}, synchronize_session=False)
+    if not reused:
+        raise RefreshTokenError('Refresh token is no longer valid')
+    db.session.commit()
+    raise RefreshTokenError('Refresh token reuse detected; please log in again')
+
+
+def revoke_family(claims):
+    family_id = claims.get('fam')
+    if family_id is None:
+        return 0
+    revoked = RefreshTokenFamily.query.filter(
+        RefreshTokenFamily.id == family_id,
+        RefreshTokenFamily.user_id == int(claims['sub']),
+        RefreshTokenFamily.revoked_at.is_(None)
+    ).update({'revoked_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return revoked
+
+
+def purge_expired_families(batch_size=PURGE_BATCH_SIZE):
+    purged = 0
+    now = datetime.utcnow()
+    while True:
+        ids = [row.id for row in RefreshTokenFamily.query.with_entities(RefreshTokenFamily.id)
+               .filter(db.or_(RefreshTokenFamily.expires_at <= now,
+                              RefreshTokenFamily.revoked_at.isnot(None)))
+               .limit(batch_size)]
+        if not ids:
+            return purged
+        RefreshTokenFamily.query.filter(RefreshTokenFamily.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        purged += len(ids)
+
+
+def init_refresh_tokens(app):
+    @app.cli.command('purge-refresh-tokens')
+    def purge_refresh_tokens_command():
+        """Delete expired and revoked refresh token families."""
+        click.echo(f'Purged {purge_expired_families()} refresh token families')
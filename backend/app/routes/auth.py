@@ -1,13 +1,32 @@
 from flask import request
 from flask_restx import Resource, fields, Namespace
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from datetime import timedelta
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from ..extensions import api, db
-from ..models import User, UserType
+from ..models import User, UserType, Reservation, ReservationArchive, Venue
+from ..facades.reservation_facade import record_tombstones
+from ..facades.venue_facade import VenueFacade
+from ..query_budget import query_budget
+from ..rate_limit import rate_limit
+from ..refresh_tokens import RefreshTokenError, issue_tokens, rotate_tokens, revoke_family
 from flask import make_response
 
 ns = Namespace('auth', description='Authentication operations')
 
+# Unique index name -> message for a registration that collides with it.
+DUPLICATE_MESSAGES = {
+    'uq_users_username_lower': 'Username is already taken',
+    'uq_users_email_lower': 'Email is already taken',
+}
+
+
+def _duplicate_message(error):
+    for index, message in DUPLICATE_MESSAGES.items():
+        if index in str(error.orig):
+            return message
+    return 'Username or email is already taken'
+
 user_model = ns.model('User', {
     'username': fields.String(required=True, description='Username'),
     'email': fields.String(required=True, description='Email address'),
@@ -40,7 +59,8 @@ register_model = ns.model('Register', {
 })
 
 token_response = ns.model('TokenResponse', {
-    'access_token': fields.String(description='JWT access token')
+    'access_token': fields.String(description='JWT access token'),
+    'refresh_token': fields.String(description='JWT refresh token for POST /api/auth/refresh')
 })
 
 @ns.route('/login')
@@ -48,17 +68,16 @@ class Login(Resource):
     @ns.expect(login_model)
     @ns.response(200, 'Login successful', token_response)
     @ns.response(401, 'Invalid credentials')
+    @ns.response(429, 'Too many login attempts')
+    @rate_limit('RATE_LIMIT_LOGIN')
     def post(self):
         data = request.get_json()
-        user = User.query.filter_by(email=data['email']).first()
+        user = User.query.filter(func.lower(User.email) == func.lower(data['email'])).first()
 
         if user and user.check_password(data['password']):
-            access_token = create_access_token(
-                identity=str(user.id),
-                additional_claims={'user_type': user.user_type.value},
-                expires_delta=timedelta(hours=1)
-            )
-            return {'access_token': access_token, 
+            tokens = issue_tokens(user)
+            return {'access_token': tokens['access_token'],
+                    'refresh_token': tokens['refresh_token'],
                     'user_type': user.user_type.value, 
                     'username': user.username,
                     "user_id": user.id
@@ -73,15 +92,11 @@ class Register(Resource):
     @ns.response(201, 'Registration successful', token_response)
     @ns.response(400, 'Username or email already taken')
     @ns.response(500, 'Internal server error')
+    @ns.response(429, 'Too many registration attempts')
+    @rate_limit('RATE_LIMIT_REGISTER')
     def post(self):
         data = request.get_json()
         try:
-            if User.query.filter_by(username=data['username']).first():
-                return {'message': 'Username is already taken'}, 400
-
-            if User.query.filter_by(email=data['email']).first():
-                return {'message': 'Email is already taken'}, 400
-
             user = User(
                 username=data['username'],
                 email=data['email'],
@@ -89,16 +104,19 @@ class Register(Resource):
             )
             user.set_password(data['password'])
             db.session.add(user)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError as e:
+                # The case-insensitive unique indexes decide; checking first
+                # would race with concurrent registrations anyway.
+                db.session.rollback()
+                return {'message': _duplicate_message(e)}, 400
 
-            access_token = create_access_token(
-                identity=str(user.id),
-                additional_claims={'user_type': user.user_type.value},
-                expires_delta=timedelta(hours=1)
-            )
+            tokens = issue_tokens(user)
             return {
                 'message': 'Successfully registered',
-                'access_token': access_token,
+                'access_token': tokens['access_token'],
+                'refresh_token': tokens['refresh_token'],
                 'user_id': user.id,
                 'username': user.username,
                 'user_type': user.user_type.value
@@ -108,6 +126,32 @@ class Register(Resource):
             db.session.rollback()
             return {'message': f'Error with registration: {str(e)}'}, 500
 
+@ns.route('/refresh')
+class Refresh(Resource):
+    @ns.doc(security='Bearer', description='Send the refresh token as the Bearer token. '
+                                           'Returns a new access token and a new refresh token; '
+                                           'the presented refresh token cannot be used again.')
+    @ns.response(200, 'Tokens renewed', token_response)
+    @ns.response(401, 'Refresh token expired, revoked or reused')
+    @jwt_required(refresh=True)
+    @query_budget(4)
+    def post(self):
+        try:
+            return rotate_tokens(get_jwt()), 200
+        except RefreshTokenError as e:
+            return {'message': str(e)}, 401
+
+
+@ns.route('/logout')
+class Logout(Resource):
+    @ns.doc(security='Bearer', description='Send the refresh token as the Bearer token to end the session.')
+    @ns.response(200, 'Logged out')
+    @jwt_required(refresh=True)
+    def post(self):
+        revoke_family(get_jwt())
+        return {'message': 'Logged out'}, 200
+
+
 @ns.route('/users/<int:user_id>')
 class UserDelete(Resource):
     @jwt_required()
@@ -118,6 +162,14 @@ class UserDelete(Resource):
         user = User.query.get(user_id)
         if not user:
             return {'message': 'User not found'}, 404
+        VenueFacade().forget_user_ratings(user.id)
+        # Their bookings, and their venue's, go with them through ON DELETE CASCADE.
+        record_tombstones(db.or_(Reservation.customer_id == user.id, Venue.owner_id == user.id), 'deleted')
+        # The archive has no foreign keys, so clear it the way venue deletes do.
+        ReservationArchive.query.filter(db.or_(
+            ReservationArchive.customer_id == user.id,
+            ReservationArchive.venue_id.in_(db.session.query(Venue.id).filter(Venue.owner_id == user.id))
+        )).delete(synchronize_session=False)
         db.session.delete(user)
         db.session.commit()
         return {'message': 'User deleted'}, 200
\ No newline at end of file
@@ -0,0 +1,9 @@
+from flask import Blueprint, current_app
+from ..storage import get_storage
+
+media_bp = Blueprint('media', __name__)
+
+@media_bp.route('/media/<path:key>')
+def media(key):
+    # Development fallback; in production nginx serves the media volume directly.
+    return get_storage(current_app).send(key)
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response, current_app
+from ..metrics import registry, pool_stats
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def metrics():
+    engine = current_app.extensions.get('metrics_engine')
+    body = registry.render(pool_stats(engine) if engine is not None else None)
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -1,8 +1,15 @@
+from datetime import datetime
 from flask import request
 from flask_restx import Resource, fields, Namespace
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import User, ReservationStatus
-from ..facades.reservation_facade import ReservationFacade
+from ..facades.reservation_facade import ReservationFacade, CALENDAR_ENCODINGS
+from ..facades.waitlist_facade import WaitlistFacade
+from ..query_budget import query_budget
+from ..serializers import fast_marshal_list_with
+from ..http_cache import conditional
+from ..rate_limit import rate_limit, user_or_ip
+from ..idempotency import idempotent
 
 ns = Namespace('reservations', description='Reservation operations')
 
@@ -15,7 +22,8 @@ reservation_model = ns.model('Reservation', {
     'notes': fields.String(description='Options or special requests'),
     'status': fields.String,
     'customer_name': fields.String,
-    'customer_id': fields.Integer
+    'customer_id': fields.Integer,
+    'version': fields.Integer(description='Send as If-Match: "<version>" to update only this revision')
 })
 
 reservation_response = ns.model('ReservationResponse', {
@@ -23,34 +31,104 @@ reservation_response = ns.model('ReservationResponse', {
     'id': fields.Integer
 })
 
+reservation_change_model = ns.inherit('ReservationChange', reservation_model, {
+    'updated_at': fields.DateTime,
+    'deleted': fields.Boolean(description='The reservation was deleted; remove it from local state'),
+    'removed': fields.String(description='Set when the reservation left the live table: "archived" or "deleted"')
+})
+
+reservation_changes_model = ns.model('ReservationChanges', {
+    'changes': fields.List(fields.Nested(reservation_change_model)),
+    'next_token': fields.String(description='Pass as "since" to fetch the next batch of changes'),
+    'has_more': fields.Boolean
+})
+
+calendar_day_model = ns.model('ReservationCalendarDay', {
+    'bitmap': fields.String(description='Base64 bitmap of booked slots, most significant bit first (encoding=bitmap)'),
+    'rle': fields.List(fields.List(fields.Integer), description='[first_slot, length] runs of booked slots (encoding=rle)'),
+    'reservations': fields.Integer,
+    'guests': fields.Integer
+})
+
+calendar_model = ns.model('ReservationCalendar', {
+    'venue_id': fields.Integer,
+    'month': fields.String(description='YYYY-MM'),
+    'slot_minutes': fields.Integer,
+    'slots_per_day': fields.Integer,
+    'encoding': fields.String(enum=list(CALENDAR_ENCODINGS)),
+    'days': fields.Raw(description='Days with bookings, keyed by YYYY-MM-DD, each a ReservationCalendarDay')
+})
+
+waitlist_entry_model = ns.model('WaitlistEntry', {
+    'id': fields.Integer,
+    'venue_id': fields.Integer(required=True, description='ID of the restaurant'),
+    'reservation_time': fields.String(required=True, description='Date (YYYY-MM-DD HH:MM) of the taken slot'),
+    'party_size': fields.Integer(required=True, description='Number of guests'),
+    'notes': fields.String(description='Options or special requests'),
+    'status': fields.String(enum=['waiting', 'promoted', 'cancelled']),
+    'reservation_id': fields.Integer(description='Pending reservation created when the entry was promoted'),
+    'position': fields.Integer(description='Place in the queue while waiting, starting at 1')
+})
+
 status_model = ns.model('StatusUpdate', {
     'status': fields.String(required=True, enum=[s.value for s in ReservationStatus], description='New status of the reservation')
 })
 
+def _if_match_version():
+    # A reservation's ETag is its quoted version number. Anything that is not
+    # a version can never match, so it ends in 412 like a stale one.
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    versions = [int(tag) for tag in request.if_match.as_set() if tag.isdigit()]
+    return versions[0] if versions else -1
+
+def _include_archived():
+    return request.args.get('include_archived', 'false').lower() in ('1', 'true', 'yes')
+
+def _reservations_version(resource):
+    return resource.facade.get_reservations_version(int(get_jwt_identity()))
+
+def _venue_reservations_version(resource, venue_id):
+    return resource.facade.get_venue_reservations_version(venue_id, int(get_jwt_identity()))
+
+def _calendar_version(resource, venue_id):
+    # Without ?month= the response depends on today's month, not just the data.
+    version = _venue_reservations_version(resource, venue_id)
+    return version and (datetime.utcnow().strftime('%Y-%m'), version)
+
 @ns.route('/')
 class ReservationList(Resource):
     def __init__(self, api=None, *args, **kwargs):
         super().__init__(api, *args, **kwargs)
         self.facade = ReservationFacade()
 
-    @ns.doc(security='Bearer')
+    @ns.doc(security='Bearer', params={'include_archived': 'Also return reservations moved to the archive'})
     @jwt_required()
-    @ns.marshal_list_with(reservation_model)
+    @conditional(_reservations_version)
+    @fast_marshal_list_with(ns, reservation_model)
+    @query_budget(3)
     def get(self):
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
         if not user:
             return [], 200
 
-        reservations = self.facade.get_reservations_for_user(user)
+        reservations = self.facade.get_reservations_for_user(user, _include_archived())
         return reservations, 200
 
-    @ns.doc(security='Bearer')
+    @ns.doc(security='Bearer', params={
+        'Idempotency-Key': {'in': 'header', 'description': 'Retries with the same key replay the first response'}
+    })
     @jwt_required()
     @ns.expect(reservation_model)
     @ns.response(201, 'The reservation has been created')
     @ns.response(400, 'Invalid data')
     @ns.response(403, 'Venue owners cannot make reservations')
+    @ns.response(409, 'A request with this Idempotency-Key is still being processed')
+    @ns.response(422, 'Idempotency-Key reused for a different request')
+    @ns.response(429, 'Too many reservation requests')
+    @rate_limit('RATE_LIMIT_RESERVATIONS', key=user_or_ip)
+    @idempotent
     def post(self):
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -68,13 +146,113 @@ class ReservationList(Resource):
             
         return {'message': 'The reservation has been created', 'id': result['id']}, status_code
 
+@ns.route('/waitlist')
+class Waitlist(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = WaitlistFacade()
+
+    @ns.doc(security='Bearer')
+    @jwt_required()
+    @ns.marshal_list_with(waitlist_entry_model)
+    @query_budget(2)
+    def get(self):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return [], 200
+
+        return self.facade.get_entries_for_user(user), 200
+
+    @ns.doc(security='Bearer')
+    @jwt_required()
+    @ns.expect(waitlist_entry_model)
+    @ns.response(201, 'Queued for the slot; promoted to a pending reservation when it frees up', waitlist_entry_model)
+    @ns.response(400, 'Invalid data')
+    @ns.response(403, 'Venue owners cannot join a waitlist')
+    @ns.response(409, 'The slot is free, or you are already queued for it')
+    @rate_limit('RATE_LIMIT_RESERVATIONS', key=user_or_ip)
+    def post(self):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        data = request.get_json()
+        if 'venue_id' not in data:
+            return {'message': 'venue_id is required'}, 400
+
+        success, result, status_code = self.facade.join_waitlist(user, data['venue_id'], data)
+        if not success:
+            return {'message': result}, status_code
+
+        return result, status_code
+
+@ns.route('/waitlist/<int:entry_id>')
+class WaitlistEntryDetail(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = WaitlistFacade()
+
+    @ns.doc(security='Bearer')
+    @jwt_required()
+    @ns.response(200, 'Left the waitlist')
+    @ns.response(403, 'No permission')
+    @ns.response(404, 'Waitlist entry not found')
+    @ns.response(409, 'Entry was already promoted or cancelled')
+    def delete(self, entry_id):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        success, message, status_code = self.facade.leave_waitlist(entry_id, user)
+        return {'message': message}, status_code
+
+@ns.route('/changes')
+class ReservationChanges(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = ReservationFacade()
+
+    @ns.doc(security='Bearer', params={
+        'since': 'Change token returned by the previous call',
+        'limit': 'Maximum number of changes to return (default 100, max 500)'
+    })
+    @jwt_required()
+    @ns.response(200, 'Reservations changed since the token', reservation_changes_model)
+    @ns.response(400, 'Invalid change token')
+    @ns.response(410, 'Change token is older than the tombstone retention; reload everything')
+    @query_budget(3)
+    def get(self):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+        success, result, status_code = self.facade.get_reservation_changes(user, request.args.get('since'), limit)
+        if not success:
+            return {'message': result}, status_code
+
+        return result, 200
+
 @ns.route('/<int:reservation_id>/status')
 class ReservationStatusUpdate(Resource):
     def __init__(self, api=None, *args, **kwargs):
         super().__init__(api, *args, **kwargs)
         self.facade = ReservationFacade()
 
-    @ns.doc(security='Bearer')
+    @ns.doc(security='Bearer', description='Owners confirm or reject pending reservations and cancel confirmed ones; '
+                                           'customers can cancel their own.',
+            params={'If-Match': {'in': 'header', 'description': 'Quoted reservation version; the change only applies to it'}})
+    @ns.expect(status_model)
+    @ns.response(200, 'Status changed')
+    @ns.response(400, 'Invalid status')
+    @ns.response(403, 'No permission')
+    @ns.response(404, 'Reservation not found')
+    @ns.response(409, 'The reservation cannot move to this status from its current one')
+    @ns.response(412, 'The reservation changed since the If-Match version')
     @jwt_required()
     def patch(self, reservation_id):
         current_user_id = get_jwt_identity()
@@ -83,14 +261,13 @@ class ReservationStatusUpdate(Resource):
             return {'message': 'User not found'}, 404
 
         data = request.get_json()
-        success, message = self.facade.update_reservation(
-            reservation_id, user, {'status': data.get('status')}
+        success, result, status_code = self.facade.change_status(
+            reservation_id, user, data.get('status'), _if_match_version()
         )
-        
         if not success:
-            return {'message': message}, 400 if 'Invalid' in message else 403
-            
-        return {'message': message}, 200
+            return {'message': result}, status_code
+
+        return result, status_code, {'ETag': f'"{result["version"]}"'}
 
 @ns.route('/venue/<int:venue_id>')
 class VenueReservations(Resource):
@@ -98,21 +275,67 @@ class VenueReservations(Resource):
         super().__init__(api, *args, **kwargs)
         self.facade = ReservationFacade()
 
-    @ns.doc(security='Bearer')
+    @ns.doc(security='Bearer', params={'include_archived': 'Also return reservations moved to the archive'})
     @jwt_required()
-    @ns.marshal_list_with(reservation_model)
+    @conditional(_venue_reservations_version)
+    @fast_marshal_list_with(ns, reservation_model)
+    @query_budget(4)
     def get(self, venue_id):
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
         if not user:
             return {'message': 'User not found'}, 404
 
-        success, result = self.facade.get_venue_reservations(venue_id, user)
+        success, result = self.facade.get_venue_reservations(venue_id, user, _include_archived())
         if not success:
             return {'message': result}, 403
 
         return result, 200
 
+@ns.route('/venue/<int:venue_id>/calendar')
+class VenueReservationCalendar(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = ReservationFacade()
+
+    @ns.doc(security='Bearer', params={
+        'month': 'YYYY-MM (default: current month)',
+        'slot': 'Slot length in minutes; must divide a day (default 30)',
+        'encoding': 'bitmap (default) or rle'
+    })
+    @jwt_required()
+    @ns.response(200, 'Booked slots per day', calendar_model)
+    @ns.response(400, 'Invalid month, slot or encoding')
+    @ns.response(403, 'No permission')
+    @ns.response(404, 'Venue not found')
+    @conditional(_calendar_version)
+    @query_budget(4)
+    def get(self, venue_id):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        try:
+            month = datetime.strptime(request.args['month'], '%Y-%m') if request.args.get('month') \
+                else datetime.utcnow().replace(day=1)
+        except ValueError:
+            return {'message': 'month must be YYYY-MM'}, 400
+
+        slot_minutes = request.args.get('slot', 30, type=int)
+        if not 5 <= slot_minutes <= 240 or 1440 % slot_minutes:
+            return {'message': 'slot must be between 5 and 240 minutes and divide a day evenly'}, 400
+
+        encoding = request.args.get('encoding', 'bitmap')
+        if encoding not in CALENDAR_ENCODINGS:
+            return {'message': f"encoding must be one of: {', '.join(CALENDAR_ENCODINGS)}"}, 400
+
+        success, result, status_code = self.facade.get_venue_calendar(venue_id, user, month, slot_minutes, encoding)
+        if not success:
+            return {'message': result}, status_code
+
+        return result, status_code
+
 @ns.route('/<int:reservation_id>')
 class ReservationDelete(Resource):
     def __init__(self, api=None, *args, **kwargs):
@@ -1,15 +1,23 @@
-from flask import request
-from flask_restx import Resource, fields, Namespace
+from flask import request, current_app
+from flask_restx import Resource, fields, Namespace, reqparse
+from werkzeug.datastructures import FileStorage
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from urllib.parse import urlencode
 from ..models import Venue, User, VenueComment, VenueType, UserType
 from ..extensions import db
 from sqlalchemy import func
-import requests
+from sqlalchemy.orm import joinedload
 from ..facades.venue_facade import VenueFacade
+from ..query_budget import query_budget
+from ..serializers import fast_marshal_list_with
+from ..http_cache import conditional
+from ..opening_hours import local_now
 
 ns = Namespace('venues', description='Venue operations')
 
+MAX_PAGE_SIZE = 100
+
 venue_model = ns.model('Venue', {
     'id': fields.Integer,
     'owner_id': fields.Integer,
@@ -17,15 +25,67 @@ venue_model = ns.model('Venue', {
     'address': fields.String(required=True, description='Address'),
     'phone': fields.String(required=True, description='Phone number'),
     'email': fields.String(description='Email of the venue'),
-    'weekdays_hours': fields.String(required=True, description='Working hours for weekdays, format HH:MM-HH:MM'),
-    'weekend_hours': fields.String(required=True, description='Working hours for weekend, format HH:MM-HH:MM'),
+    'weekdays_hours': fields.String(description='Working hours for weekdays, format HH:MM-HH:MM; summary of opening_hours'),
+    'weekend_hours': fields.String(description='Working hours for weekend, format HH:MM-HH:MM; summary of opening_hours'),
     'image_url': fields.String(required=False, description='URL for restaurant image'), 
     'menu_image_url': fields.String(required=False, description='URL for menu image'),
     'type': fields.String(required=True, description='Type of the venue (restaurant, bar, cafe, etc.)'),
     'latitude': fields.Float,
-    'longitude': fields.Float
+    'longitude': fields.Float,
+    'image_srcset': fields.String(description='WebP variants of the uploaded image for <img srcset>'),
+    'rating': fields.Float(description='Average customer rating'),
+    'rating_count': fields.Integer(description='Number of customer ratings')
+})
+
+venue_list_parser = reqparse.RequestParser()
+venue_list_parser.add_argument('open_at', location='args', help='Only venues open at this local time, YYYY-MM-DDTHH:MM, or "now" in VENUE_TIMEZONE')
+venue_list_parser.add_argument('type', location='args', choices=[venue_type.value for venue_type in VenueType])
+venue_list_parser.add_argument('min_rating', location='args', type=float, help='Minimum average rating (1-5)')
+venue_list_parser.add_argument('limit', location='args', type=int,
+                               help='Page size (max 100); the next page is linked in the Link header')
+venue_list_parser.add_argument('after', location='args', type=int, help='Return venues after this id')
+
+opening_hours_model = ns.model('OpeningHours', {
+    'weekday': fields.Integer(description='0 (Monday) to 6 (Sunday) for weekly hours'),
+    'date': fields.String(description='YYYY-MM-DD for a date exception that replaces the weekly hours'),
+    'opens': fields.String(description='HH:MM'),
+    'closes': fields.String(description='HH:MM; earlier than opens means after midnight'),
+    'closed': fields.Boolean(description='Closed all day (date exceptions only)')
+})
+
+venue_detail_model = ns.clone('VenueDetail', venue_model, {
+    'opening_hours': fields.List(fields.Nested(opening_hours_model),
+                                 description='Structured hours; replaces weekdays_hours/weekend_hours when given')
+})
+
+venue_hours_model = ns.model('VenueHoursStatus', {
+    'opening_hours': fields.List(fields.Nested(opening_hours_model)),
+    'at': fields.String,
+    'open': fields.Boolean
+})
+
+opening_hours_parser = reqparse.RequestParser()
+opening_hours_parser.add_argument('at', location='args', help='Local time to check, YYYY-MM-DDTHH:MM (default: now in VENUE_TIMEZONE)')
+
+image_variant_model = ns.model('VenueImageVariant', {
+    'width': fields.Integer,
+    'format': fields.String,
+    'url': fields.String
 })
 
+venue_image_model = ns.model('VenueImage', {
+    'id': fields.Integer,
+    'venue_id': fields.Integer,
+    'kind': fields.String(enum=['image', 'menu']),
+    'status': fields.String(enum=['pending', 'ready', 'failed']),
+    'variants': fields.List(fields.Nested(image_variant_model)),
+    'error': fields.String
+})
+
+image_upload_parser = reqparse.RequestParser()
+image_upload_parser.add_argument('file', location='files', type=FileStorage, required=True)
+image_upload_parser.add_argument('kind', location='form', choices=('image', 'menu'), default='image')
+
 venue_response = ns.model('VenueResponse', {
     'message': fields.String,
     'id': fields.Integer
@@ -44,21 +104,9 @@ comment_model = ns.model('VenueComment', {
 def enum_to_val(enum_obj):
     return enum_obj.value if enum_obj else None
 
-def validate_hours(hours_str):
-    try:
-        start, end = hours_str.split('-')
-        start = start.strip()
-        end = end.strip()
-        datetime.strptime(start, '%H:%M')
-        if end == "24:00":
-            return True
-            
-        datetime.strptime(end, '%H:%M')
-        return True
-    except:
-        return False
-
 def get_coordinates(address):
+    import requests
+
     url = "https://nominatim.openstreetmap.org/search"
     params = {"q": address, "format": "json", "limit": 1}
     headers = {"User-Agent": "reservation-app"}
@@ -73,20 +121,39 @@ class VenueListCreate(Resource):
         super().__init__(api, *args, **kwargs)
         self.facade = VenueFacade()
 
-    @ns.marshal_list_with(venue_model)
+    @fast_marshal_list_with(ns, venue_model)
+    @ns.expect(venue_list_parser)
     @ns.response(200, 'List of venues returned')
+    @ns.response(400, 'Invalid filter')
     @jwt_required()
+    @query_budget(2)
     def get(self):
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
         if not user:
             return {'message': 'User not found'}, 404
 
-        venues = self.facade.get_venues_for_user(user)
-        return venues
+        args = request.args
+        try:
+            open_at = args.get('open_at')
+            if open_at is not None:
+                open_at = local_now(current_app.config['VENUE_TIMEZONE']) if open_at == 'now' else datetime.fromisoformat(open_at)
+            venue_type = VenueType(args['type']) if args.get('type') else None
+            min_rating = float(args['min_rating']) if args.get('min_rating') else None
+            limit = min(max(int(args['limit']), 1), MAX_PAGE_SIZE) if args.get('limit') else None
+            after = int(args['after']) if args.get('after') else None
+        except ValueError:
+            return {'message': 'Invalid filter; see the API docs for accepted values'}, 400
+
+        venues, last_id = self.facade.search_venues(user, open_at, venue_type, min_rating, limit, after)
+        if last_id is None:
+            return venues
+
+        next_args = dict(args.items(), after=last_id)
+        return venues, 200, {'Link': f'<{request.base_url}?{urlencode(next_args)}>; rel="next"'}
 
     @jwt_required()
-    @ns.expect(venue_model)
+    @ns.expect(venue_detail_model)
     @ns.response(201, 'Venue created successfully', venue_response)
     @ns.response(400, 'Missing or invalid fields')
     @ns.response(403, 'Not authorized')
@@ -112,7 +179,7 @@ class VenueDetail(Resource):
         super().__init__(api, *args, **kwargs)
         self.facade = VenueFacade()
 
-    @ns.marshal_with(venue_model)
+    @ns.marshal_with(venue_detail_model)
     @ns.response(200, 'Venue details')
     @ns.response(404, 'Venue not found')
     @jwt_required()
@@ -123,6 +190,7 @@ class VenueDetail(Resource):
         return result
     
     @ns.response(200, 'Venue deleted')
+    @ns.response(202, 'Venue hidden; its reservations and comments are purged in the background')
     @ns.response(403, 'No permission')
     @ns.response(404, 'Venue not found')
     @jwt_required()
@@ -138,11 +206,106 @@ class VenueDetail(Resource):
 
         return {'message': message}, status_code
 
+@ns.route('/<int:venue_id>/hours')
+class VenueOpeningHours(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = VenueFacade()
+
+    @ns.expect(opening_hours_parser)
+    @ns.response(200, 'Opening hours and whether the venue is open at the given time', venue_hours_model)
+    @ns.response(400, 'Invalid time')
+    @ns.response(404, 'Venue not found')
+    @jwt_required()
+    def get(self, venue_id):
+        at = request.args.get('at')
+        try:
+            when = datetime.fromisoformat(at) if at else local_now(current_app.config['VENUE_TIMEZONE'])
+        except ValueError:
+            return {'message': 'at must be an ISO datetime, e.g. 2024-05-17T19:30'}, 400
+
+        success, result = self.facade.get_opening_hours(venue_id, when)
+        if not success:
+            return {'message': result}, 404
+        return result
+
+    @ns.expect([opening_hours_model])
+    @ns.response(200, 'Opening hours replaced', [opening_hours_model])
+    @ns.response(400, 'Invalid opening hours')
+    @ns.response(403, 'No permission')
+    @ns.response(404, 'Venue not found')
+    @jwt_required()
+    def put(self, venue_id):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        success, result, status_code = self.facade.set_opening_hours(venue_id, user, request.get_json())
+        if not success:
+            return {'message': result}, status_code
+        return result, status_code
+
+@ns.route('/<int:venue_id>/images')
+class VenueImages(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = VenueFacade()
+
+    @ns.doc(security='Bearer')
+    @ns.expect(image_upload_parser)
+    @ns.response(202, 'Image stored; resized variants are generated in the background', venue_image_model)
+    @ns.response(400, 'Missing or invalid image')
+    @ns.response(403, 'No permission')
+    @ns.response(413, 'Image too large')
+    @jwt_required()
+    def post(self, venue_id):
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        upload = request.files.get('file')
+        limit = current_app.config.get('MEDIA_MAX_UPLOAD_BYTES', 5 * 1024 * 1024)
+        data = upload.stream.read(limit + 1) if upload else b''
+        success, result, status_code = self.facade.upload_image(
+            venue_id, user, request.form.get('kind', 'image'), data
+        )
+        if not success:
+            return {'message': result}, status_code
+
+        return result, status_code
+
+@ns.route('/<int:venue_id>/images/<int:image_id>')
+class VenueImageDetail(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self.facade = VenueFacade()
+
+    @ns.response(200, 'Image processing status and variants', venue_image_model)
+    @ns.response(404, 'Image not found')
+    @jwt_required()
+    def get(self, venue_id, image_id):
+        success, result = self.facade.get_image(venue_id, image_id)
+        if not success:
+            return {'message': result}, 404
+        return result
+
+def _comments_version(resource, venue_id):
+    return tuple(db.session.query(
+        func.count(VenueComment.id), func.max(VenueComment.updated_at), func.max(VenueComment.id)
+    ).filter(VenueComment.venue_id == venue_id).one())
+
 @ns.route('/<int:venue_id>/comments')
 class VenueComments(Resource):
+    @conditional(_comments_version)
     @ns.marshal_list_with(comment_model)
+    @query_budget(2)
     def get(self, venue_id):
-        comments = VenueComment.query.filter_by(venue_id=venue_id).order_by(VenueComment.created_at.desc()).all()
+        comments = VenueComment.query.options(joinedload(VenueComment.user)) \
+            .filter_by(venue_id=venue_id) \
+            .order_by(VenueComment.created_at.desc()) \
+            .all()
         return comments
     
     @jwt_required()
@@ -170,6 +333,8 @@ class VenueComments(Resource):
             rating=int(rating) if rating is not None else None
         )
         db.session.add(comment)
+        if comment.rating is not None:
+            VenueFacade().record_rating(venue_id, comment.rating)
         db.session.commit()
         return {'message': 'Comment added.'}, 201
 
@@ -193,6 +358,8 @@ class VenueCommentDelete(Resource):
             return {'message': 'No permission to delete this comment'}, 403
 
         db.session.delete(comment)
+        if comment.rating is not None:
+            VenueFacade().record_rating(venue_id, comment.rating, -1)
         db.session.commit()
         return {'message': 'Comment deleted'}, 200
 
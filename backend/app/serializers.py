@@ -0,0 +1,104 @@
+import json
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request
+from flask_restx import fields, marshal
+from flask_restx.utils import unpack
+
+
+def _datetime_converter(field):
+    def convert(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except (TypeError, ValueError):
+            return field.format(value)
+    return convert
+
+
+_CONVERTERS = {
+    fields.Integer: lambda field: int,
+    fields.Float: lambda field: float,
+    fields.String: lambda field: str,
+    fields.Boolean: lambda field: bool,
+    fields.DateTime: _datetime_converter,
+}
+
+
+def _dump_json(data):
+    return json.dumps(data).encode() + b'\n'
+
+
+def _dump_orjson(data):
+    # Same JSON values, different bytes: compact separators and raw UTF-8
+    # instead of \uXXXX escapes.
+    import orjson
+    return orjson.dumps(data) + b'\n'
+
+
+BACKENDS = {'json': _dump_json, 'orjson': _dump_orjson}
+
+
+class CompiledSchema:
+    def __init__(self, model):
+        self.model = model
+        self.fields = []
+        for name, field in model.items():
+            field = field() if isinstance(field, type) else field
+            factory = _CONVERTERS.get(type(field))
+            if field.attribute is not None or '.' in name or getattr(field, 'dt_format', 'iso8601') != 'iso8601':
+                factory = None
+            if factory is None:
+                self.fields.append((name, None, field))
+            else:
+                default = field.default
+                self.fields.append((name, factory(field), field.format(default) if default else default))
+
+    def _item(self, obj):
+        item = {}
+        for name, convert, extra in self.fields:
+            if convert is None:
+                item[name] = extra.output(name, obj)
+                continue
+            value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+            item[name] = extra if value is None else convert(value)
+        return item
+
+    def serialize(self, items):
+        return [self._item(obj) for obj in items]
+
+    def dumps(self, items, backend='json'):
+        return BACKENDS[backend](self.serialize(items))
+
+
+def _fast_path_enabled():
+    config = current_app.config
+    return (config.get('FAST_SERIALIZER', False)
+            and not current_app.debug
+            and not config.get('RESTX_JSON')
+            and not request.headers.get(config.get('RESTX_MASK_HEADER', 'X-Fields')))
+
+
+def fast_marshal_list_with(ns, model):
+    schema = CompiledSchema(model)
+    marshal_list_with = ns.marshal_list_with(model)
+
+    def decorator(func):
+        marshalled = marshal_list_with(func)
+
+        @wraps(marshalled)
+        def wrapper(*args, **kwargs):
+            if not _fast_path_enabled():
+                return marshalled(*args, **kwargs)
+
+            data, code, headers = unpack(func(*args, **kwargs))
+            if not isinstance(data, list):
+                return marshal(data, model), code, headers
+
+            body = schema.dumps(data, current_app.config.get('FAST_SERIALIZER_BACKEND', 'json'))
+            response = current_app.response_class(body, code, mimetype='application/json')
+            response.headers.extend(headers or {})
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,81 @@
+import importlib
+import os
+from flask import send_from_directory
+
+IMMUTABLE_MAX_AGE = 31536000
+
+
+class Storage:
+    # Object-store interface for uploaded media. Keys are relative paths such as
+    # "venues/3f2a....webp"; implementations decide where the bytes live.
+
+    def save(self, key, data, content_type):
+        raise NotImplementedError
+
+    def read(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    def __init__(self, root, base_url):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'Invalid storage key: {key}')
+        return path
+
+    def save(self, key, data, content_type):
+        path = self._path(key)
+        if os.path.exists(path):
+            # Keys are content hashes, so an existing file already has these bytes.
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return key
+
+    def read(self, key):
+        with open(self._path(key), 'rb') as f:
+            return f.read()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        return self.base_url + key
+
+    def send(self, key):
+        response = send_from_directory(self.root, key, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def create_storage(app):
+    backend = app.config.get('MEDIA_STORAGE', 'local')
+    if backend == 'local':
+        return LocalStorage(app.config['MEDIA_ROOT'], app.config.get('MEDIA_URL', '/media/'))
+
+    module_name, class_name = backend.split(':')
+    storage_class = getattr(importlib.import_module(module_name), class_name)
+    return storage_class.from_config(app.config)
+
+
+def get_storage(app):
+    if 'media_storage' not in app.extensions:
+        app.extensions['media_storage'] = create_storage(app)
+    return app.extensions['media_storage']
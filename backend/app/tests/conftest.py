@@ -1,24 +1,152 @@
+import fcntl
+import hashlib
+import os
+import tempfile
 import pytest
-from sqlalchemy_utils import database_exists, create_database
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateTable
+from sqlalchemy_utils import database_exists, create_database, drop_database
 from app import create_app, db
 from app.config import TestingConfig
+from app.query_budget import QueryCounter
+from benchmarks.datagen import SCALES, generate_dataset
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'timing: wall-clock targets; set RUN_TIMING_TESTS=1 to run them on an idle machine')
+    config.addinivalue_line('markers', 'postgres: needs TEST_DATABASE_URL pointing at Postgres')
+
+
+def pytest_collection_modifyitems(config, items):
+    skips = {}
+    if os.environ.get('RUN_TIMING_TESTS') != '1':
+        skips['timing'] = pytest.mark.skip(reason='timing test; set RUN_TIMING_TESTS=1 to run')
+    if not make_url(TestingConfig.SQLALCHEMY_DATABASE_URI).drivername.startswith('postgresql'):
+        skips['postgres'] = pytest.mark.skip(reason='needs TEST_DATABASE_URL pointing at Postgres')
+    for item in items:
+        for marker, skip in skips.items():
+            if marker in item.keywords:
+                item.add_marker(skip)
+
+
+def _worker_id():
+    return os.environ.get('PYTEST_XDIST_WORKER', 'master')
+
+
+def _worker_database_url(base_url, worker_id):
+    url = make_url(base_url)
+    if worker_id == 'master':
+        return base_url
+    if url.drivername.startswith('sqlite'):
+        # In-memory databases are already private to each worker process.
+        if url.database in (None, '', ':memory:'):
+            return base_url
+        root, ext = os.path.splitext(url.database)
+        return str(url.set(database=f'{root}_{worker_id}{ext}'))
+    return str(url.set(database=f'{url.database}_{worker_id}'))
+
+
+def _schema_hash():
+    ddl = ''.join(str(CreateTable(table)) for table in db.metadata.sorted_tables)
+    return hashlib.sha1(ddl.encode()).hexdigest()[:8]
+
+
+def _provision_postgres(base_url, worker_url):
+    # Build the schema once into a template database (named after the schema so
+    # model changes get a fresh one) and clone it per worker, which is much
+    # faster than running create_all in every worker.
+    template = make_url(base_url).set(database=f'{make_url(base_url).database}_template_{_schema_hash()}')
+    lock_path = os.path.join(tempfile.gettempdir(), f'{template.database}.lock')
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not database_exists(template):
+            create_database(template)
+            engine = create_engine(template)
+            db.metadata.create_all(engine)
+            engine.dispose()
+        if database_exists(worker_url):
+            drop_database(worker_url)
+        create_database(worker_url, template=template.database)
+
+
+def _enable_sqlite_savepoints(engine):
+    # pysqlite defers BEGIN and breaks SAVEPOINT; let SQLAlchemy emit BEGIN itself.
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def emit_begin(connection):
+        connection.exec_driver_sql('BEGIN')
+
 
 @pytest.fixture(scope='session')
 def app():
-    test_db_url = TestingConfig.SQLALCHEMY_DATABASE_URI
-    
-    if not database_exists(test_db_url):
+    test_db_url = _worker_database_url(TestingConfig.SQLALCHEMY_DATABASE_URI, _worker_id())
+    is_postgres = make_url(test_db_url).drivername.startswith('postgresql')
+
+    if is_postgres:
+        _provision_postgres(TestingConfig.SQLALCHEMY_DATABASE_URI, test_db_url)
+    elif not database_exists(test_db_url):
         create_database(test_db_url)
         print(f"Created test database: {test_db_url}")
-    
-    app = create_app(TestingConfig)
-    
+
+    config = type('WorkerTestingConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': test_db_url})
+    app = create_app(config)
+
     with app.app_context():
-        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            _enable_sqlite_savepoints(db.engine)
+        if not is_postgres:
+            db.create_all()
         yield app
         db.session.remove()
         db.drop_all()
+        db.engine.dispose()
+
+    if is_postgres or make_url(test_db_url).database not in (None, '', ':memory:'):
+        drop_database(test_db_url)
 
 @pytest.fixture(scope='session')
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+@pytest.fixture(scope='function')
+def init_database(app):
+    # Every test runs inside a transaction that is rolled back afterwards.
+    # Application commits only release a SAVEPOINT, which is restarted
+    # immediately, so the schema is built once per worker.
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        session = db.create_scoped_session(options={'bind': connection, 'binds': {}})
+        nested = connection.begin_nested()
+
+        @event.listens_for(session, 'after_transaction_end')
+        def restart_savepoint(sess, trans):
+            nonlocal nested
+            if not nested.is_active:
+                nested = connection.begin_nested()
+
+        original_session = db.session
+        db.session = session
+        try:
+            yield db
+        finally:
+            session.remove()
+            db.session = original_session
+            transaction.rollback()
+            connection.close()
+
+@pytest.fixture
+def query_counter(app):
+    with app.app_context():
+        return QueryCounter(db.engine)
+
+@pytest.fixture
+def synthetic_data(app, init_database):
+    def _generate(scale='tiny', seed=42, **counts):
+        with app.app_context():
+            return generate_dataset(seed=seed, **dict(SCALES[scale], **counts))
+    return _generate
@@ -1,15 +1,8 @@
 import pytest
+from datetime import datetime
 from flask_jwt_extended import create_access_token
 from ..extensions import db
-from ..models import User, UserType
-
-@pytest.fixture(scope='function')
-def init_database(app):
-    with app.app_context():
-        db.create_all()
-        yield db
-        db.session.remove()
-        db.drop_all()
+from ..models import User, UserType, ReservationArchive, Venue
 
 @pytest.fixture
 def register_user(client, init_database):
@@ -83,6 +76,39 @@ def test_delete_user_success(client, init_database, register_user):
     assert response.status_code == 200
     assert response.get_json()['message'] == 'User deleted'
 
+def test_delete_user_purges_archived_reservations(app, client, init_database, register_user):
+    data = register_user('testuser', 'test@example.com', 'Password123').get_json()
+    with app.app_context():
+        db.session.add(ReservationArchive(id=999, customer_id=data['user_id'], venue_id=1,
+                                          reservation_time=datetime(2020, 1, 1, 19, 0), party_size=2,
+                                          updated_at=datetime(2020, 1, 1)))
+        db.session.commit()
+
+    response = client.delete(f"/api/auth/users/{data['user_id']}",
+                             headers={"Authorization": f"Bearer {data['access_token']}"})
+    assert response.status_code == 200
+    with app.app_context():
+        assert ReservationArchive.query.filter_by(customer_id=data['user_id']).count() == 0
+
+def test_delete_user_removes_their_ratings(app, client, init_database, register_user):
+    owner = register_user('owner', 'owner@example.com', 'Password123', 'owner').get_json()
+    venue = client.post('/api/venues/', headers={"Authorization": f"Bearer {owner['access_token']}"}, json={
+        "name": "Rated", "address": "Rated street", "phone": "555-0100", "email": "rated@example.com",
+        "weekdays_hours": "09:00-17:00", "weekend_hours": "10:00-16:00", "type": "cafe"
+    }).get_json()
+    critic = register_user('critic', 'critic@example.com', 'Password123').get_json()
+    fan = register_user('fan', 'fan@example.com', 'Password123').get_json()
+    for user, rating in ((critic, 1), (critic, 2), (fan, 5)):
+        client.post(f"/api/venues/{venue['id']}/comments", json={'text': 'ok', 'rating': rating},
+                    headers={"Authorization": f"Bearer {user['access_token']}"})
+
+    response = client.delete(f"/api/auth/users/{critic['user_id']}",
+                             headers={"Authorization": f"Bearer {critic['access_token']}"})
+    assert response.status_code == 200
+    with app.app_context():
+        rated = db.session.get(Venue, venue['id'])
+        assert (rated.rating_count, rated.rating_total, rated.rating) == (1, 5, 5.0)
+
 def test_delete_user_no_permission(client, init_database, register_user):
     user1_response = register_user('user1', 'u1@example.com', 'Password123')
     user1_id = user1_response.get_json()['user_id']
@@ -98,4 +124,72 @@ def test_delete_user_no_permission(client, init_database, register_user):
     response = client.delete(f'/api/auth/users/{user1_id}', 
                            headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 403
-    assert 'No permission' in response.get_json()['message']
\ No newline at end of file
+    assert 'No permission' in response.get_json()['message']
+
+def _login(client, register_user):
+    register_user('testuser', 'test@example.com', 'Password123')
+    return client.post('/api/auth/login', json={
+        'email': 'test@example.com',
+        'password': 'Password123'
+    }).get_json()
+
+def _refresh(client, refresh_token):
+    return client.post('/api/auth/refresh', headers={"Authorization": f"Bearer {refresh_token}"})
+
+def test_refresh_rotates_tokens(app, client, init_database, register_user, query_counter):
+    tokens = _login(client, register_user)
+    assert 'refresh_token' in tokens
+
+    with query_counter:
+        response = _refresh(client, tokens['refresh_token'])
+    assert response.status_code == 200
+    # A single UPDATE; the SAVEPOINT statements come from the test transaction.
+    statements = [s for s in query_counter.statements if 'SAVEPOINT' not in s]
+    assert len(statements) == 1 and statements[0].startswith('UPDATE refresh_token_families')
+    renewed = response.get_json()
+    assert renewed['refresh_token'] != tokens['refresh_token']
+
+    response = client.delete('/api/auth/users/999',
+                             headers={"Authorization": f"Bearer {renewed['access_token']}"})
+    assert response.status_code == 403
+
+    assert _refresh(client, renewed['refresh_token']).status_code == 200
+
+def test_refresh_token_reuse_revokes_session(client, init_database, register_user):
+    tokens = _login(client, register_user)
+    renewed = _refresh(client, tokens['refresh_token']).get_json()
+
+    response = _refresh(client, tokens['refresh_token'])
+    assert response.status_code == 401
+    assert 'reuse' in response.get_json()['message']
+    # The legitimate holder of the newer token is logged out too.
+    assert _refresh(client, renewed['refresh_token']).status_code == 401
+
+def test_refresh_rejects_access_token(client, init_database, register_user):
+    tokens = _login(client, register_user)
+    assert _refresh(client, tokens['access_token']).status_code in (401, 422)
+
+def test_logout_revokes_refresh_token(client, init_database, register_user):
+    tokens = _login(client, register_user)
+    response = client.post('/api/auth/logout', headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 200
+    assert _refresh(client, tokens['refresh_token']).status_code == 401
+
+def test_register_duplicate_ignores_case(client, init_database, register_user):
+    register_user('TestUser', 'Test@Example.com', 'Password123')
+    response = register_user('testuser', 'other@example.com', 'Password123')
+    assert response.status_code == 400
+    assert 'Username is already taken' in response.get_json()['message']
+    response = register_user('otheruser', 'test@EXAMPLE.com', 'Password123')
+    assert response.status_code == 400
+    assert 'Email is already taken' in response.get_json()['message']
+    assert register_user('otheruser', 'other@example.com', 'Password123').status_code == 201
+
+def test_login_email_ignores_case(client, init_database, register_user):
+    register_user('testuser', 'Test@Example.com', 'Password123')
+    response = client.post('/api/auth/login', json={
+        'email': 'test@example.COM',
+        'password': 'Password123'
+    })
+    assert response.status_code == 201
+    assert response.get_json()['username'] == 'testuser'
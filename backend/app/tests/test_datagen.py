@@ -0,0 +1,50 @@
+from datetime import datetime
+from ..extensions import db
+
+def test_synthetic_data_counts_and_unique_slots(app, synthetic_data, init_database):
+    seeded = synthetic_data('tiny', reservations=800)
+    assert len(seeded['venue_ids']) == 5
+    assert len(seeded['customer_ids']) == 50
+
+    with app.app_context():
+        assert db.session.execute(db.text("SELECT COUNT(*) FROM reservations")).scalar() == 800
+        assert db.session.execute(db.text("SELECT COUNT(*) FROM venue_comments")).scalar() == 200
+        duplicates = db.session.execute(db.text(
+            "SELECT COUNT(*) FROM (SELECT venue_id, reservation_time FROM reservations "
+            "GROUP BY venue_id, reservation_time HAVING COUNT(*) > 1) d"
+        )).scalar()
+        assert duplicates == 0
+        per_venue = [count for count, in db.session.execute(db.text(
+            "SELECT COUNT(*) FROM reservations GROUP BY venue_id ORDER BY 1 DESC"
+        ))]
+        assert per_venue[0] > 2 * per_venue[-1]
+
+def _snapshot(app, seeded):
+    # Surrogate ids depend on what is already in the database, so rows are
+    # compared with user and venue ids made relative to the generated ranges.
+    first_user_id, first_venue_id = seeded['owner_ids'][0], seeded['venue_ids'][0]
+    with app.app_context():
+        reservations = db.session.execute(db.text(
+            "SELECT venue_id, customer_id, reservation_time, party_size, status, notes, created_at "
+            "FROM reservations WHERE venue_id BETWEEN :first AND :last ORDER BY venue_id, reservation_time"
+        ), {'first': first_venue_id, 'last': seeded['venue_ids'][-1]}).fetchall()
+        comments = db.session.execute(db.text(
+            "SELECT venue_id, user_id, text, rating, created_at "
+            "FROM venue_comments WHERE venue_id BETWEEN :first AND :last ORDER BY id"
+        ), {'first': first_venue_id, 'last': seeded['venue_ids'][-1]}).fetchall()
+    return (
+        [(row[0] - first_venue_id, row[1] - first_user_id) + tuple(row[2:]) for row in reservations],
+        [(row[0] - first_venue_id, row[1] - first_user_id) + tuple(row[2:]) for row in comments],
+    )
+
+def test_synthetic_data_is_deterministic(app, init_database):
+    from benchmarks.datagen import generate_dataset
+    now = datetime(2030, 1, 1, 12, 0)
+    snapshots = []
+    for seed in (7, 7, 8):
+        with app.app_context():
+            seeded = generate_dataset(venues=3, customers=10, reservations=100, comments=30, seed=seed, now=now)
+        snapshots.append(_snapshot(app, seeded))
+    assert len(snapshots[0][0]) == 100 and len(snapshots[0][1]) == 30
+    assert snapshots[0] == snapshots[1]
+    assert snapshots[0] != snapshots[2]
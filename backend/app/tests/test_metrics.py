@@ -0,0 +1,25 @@
+def test_server_timing_header(client, init_database):
+    response = client.post('/api/auth/login', json={
+        'email': 'nobody@example.com',
+        'password': 'Password123'
+    })
+    assert response.status_code == 401
+    server_timing = response.headers['Server-Timing']
+    assert server_timing.startswith('db;dur=')
+    assert '1 queries' in server_timing
+    assert 'app;dur=' in server_timing
+
+def test_metrics_endpoint(client, init_database):
+    client.get('/health')
+    client.post('/api/auth/login', json={
+        'email': 'nobody@example.com',
+        'password': 'Password123'
+    })
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_requests_total{method="POST",endpoint="/api/auth/login",status="401"}' in body
+    assert 'http_request_sql_statements_bucket{method="POST",endpoint="/api/auth/login",le="1"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/health"}' in body
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from ..partitions import add_months, month_start, partition_name, ensure_reservation_partitions, is_partitioned
+from ..extensions import db
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+def test_month_arithmetic():
+    assert month_start(date(2026, 10, 19)) == date(2026, 10, 1)
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partition_name(date(2027, 1, 1)) == 'reservations_p202701'
+
+def test_sqlite_stays_unpartitioned(app, init_database):
+    with app.app_context():
+        assert ensure_reservation_partitions(db.session.connection()) is None
+    result = app.test_cli_runner().invoke(args=['partition-reservations'])
+    assert 'not partitioned' in result.output
+
+def _partitioned_rows(connection):
+    return connection.execute(text(
+        "SELECT tableoid::regclass::text, reservation_time FROM reservations ORDER BY reservation_time"
+    )).fetchall()
+
+@pytest.mark.postgres
+def test_month_partitions_take_rows_from_default(app, init_database):
+    # The test schema comes from create_all, so partition reservations the way
+    # the migration does, inside the test transaction that is rolled back.
+    with app.app_context():
+        connection = db.session.connection()
+        connection.execute(text("ALTER TABLE reservations RENAME TO reservations_plain"))
+        connection.execute(text(
+            "CREATE TABLE reservations (LIKE reservations_plain INCLUDING DEFAULTS) PARTITION BY RANGE (reservation_time)"
+        ))
+        connection.execute(text("CREATE TABLE reservations_default PARTITION OF reservations DEFAULT"))
+        connection.execute(text(
+            "INSERT INTO reservations (customer_id, venue_id, reservation_time, party_size, status, updated_at) "
+            "VALUES (1, 1, '2030-02-14 19:00', 2, 'PENDING', now()), (1, 1, '2030-06-01 12:00', 2, 'PENDING', now())"
+        ))
+        assert is_partitioned(connection)
+
+        created = ensure_reservation_partitions(connection, months_ahead=1, today=date(2030, 1, 20))
+        assert created == ['reservations_p203001', 'reservations_p203002']
+        assert _partitioned_rows(connection)[0][0] == 'reservations_p203002'
+        assert _partitioned_rows(connection)[1][0] == 'reservations_default'
+
+        assert ensure_reservation_partitions(connection, months_ahead=1, today=date(2030, 1, 20)) == []
+
+def _flask(url, *args):
+    environment = {k: v for k, v in os.environ.items() if k != 'FLASK_RUN_FROM_CLI'}
+    environment.update(DATABASE_URL=url, FLASK_APP='app:create_app')
+    return subprocess.run([sys.executable, '-m', 'flask'] + list(args), cwd=BACKEND_DIR, env=environment,
+                          capture_output=True, text=True, check=True).stdout
+
+@pytest.mark.postgres
+def test_migrations_partition_reservations(app):
+    base = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    url = base.set(database=f'{base.database}_migrations')
+    if database_exists(url):
+        drop_database(url)
+    create_database(url)
+    try:
+        _flask(str(url), 'db', 'upgrade')
+        engine = create_engine(url)
+        with engine.connect() as connection:
+            assert is_partitioned(connection)
+            partitions = {name for name, in connection.execute(text(
+                "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'reservations'::regclass"
+            ))}
+            assert 'reservations_default' in partitions
+            assert partition_name(month_start(date.today())) in partitions
+
+        ahead = add_months(month_start(date.today()), 5)
+        _flask(str(url), 'partition-reservations', '--months-ahead', '5')
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT to_regclass(:name)"), {'name': partition_name(ahead)}).scalar()
+        engine.dispose()
+    finally:
+        drop_database(url)
@@ -0,0 +1,92 @@
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from ..extensions import db
+from ..models import User, Venue, Reservation, VenueComment, UserType, VenueType
+from ..query_budget import QueryBudgetExceeded
+
+@pytest.fixture
+def owner_and_venue(app, init_database):
+    with app.app_context():
+        owner = User(username="owner", email="owner@test.com", user_type=UserType.OWNER)
+        owner.set_password("password123")
+        db.session.add(owner)
+        db.session.flush()
+        venue = Venue(
+            name="Budget Venue",
+            venue_type=VenueType.RESTAURANT,
+            phone="1234567890",
+            email="venue@test.com",
+            address="Sofia, Bulgaria",
+            owner_id=owner.id,
+            weekdays_hours="09:00-18:00",
+            weekend_hours="10:00-16:00"
+        )
+        db.session.add(venue)
+        db.session.commit()
+        return {"owner_id": owner.id, "venue_id": venue.id}
+
+@pytest.fixture
+def add_customer_activity(app, owner_and_venue):
+    counter = {"n": 0}
+
+    def _add(count):
+        with app.app_context():
+            for _ in range(count):
+                counter["n"] += 1
+                customer = User(
+                    username=f"customer{counter['n']}",
+                    email=f"customer{counter['n']}@test.com",
+                    user_type=UserType.CUSTOMER,
+                    password_hash="x"
+                )
+                db.session.add(customer)
+                db.session.flush()
+                db.session.add(Reservation(
+                    customer_id=customer.id,
+                    venue_id=owner_and_venue["venue_id"],
+                    reservation_time=datetime.utcnow() + timedelta(days=1, hours=counter["n"]),
+                    party_size=2
+                ))
+                db.session.add(VenueComment(
+                    venue_id=owner_and_venue["venue_id"],
+                    user_id=customer.id,
+                    text="Nice",
+                    rating=4
+                ))
+            db.session.commit()
+    return _add
+
+def test_owner_reservation_list_does_not_scale(app, client, query_counter, owner_and_venue, add_customer_activity):
+    with app.app_context():
+        token = create_access_token(identity=str(owner_and_venue["owner_id"]))
+    headers = {"Authorization": f"Bearer {token}"}
+    add_customer_activity(1)
+
+    query_counter.assert_does_not_scale(
+        lambda: client.get("/api/reservations/", headers=headers),
+        lambda: add_customer_activity(5),
+        label="GET /api/reservations/"
+    )
+
+def test_venue_comments_do_not_scale(client, query_counter, owner_and_venue, add_customer_activity):
+    url = f"/api/venues/{owner_and_venue['venue_id']}/comments"
+    add_customer_activity(1)
+
+    query_counter.assert_does_not_scale(
+        lambda: client.get(url),
+        lambda: add_customer_activity(5),
+        label=f"GET {url}"
+    )
+    assert len(client.get(url).get_json()) == 6
+
+def test_query_counter_reports_statements(app, query_counter, init_database):
+    with app.app_context():
+        with query_counter:
+            User.query.filter_by(username="a").first()
+            User.query.filter_by(username="b").first()
+    assert query_counter.count == 2
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        query_counter.assert_at_most(1)
+    assert "executed 2 SQL statements, budget is 1" in str(excinfo.value)
+    assert "FROM users" in str(excinfo.value)
@@ -0,0 +1,91 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from ..extensions import db
+from ..models import User, UserType
+from ..rate_limit import MemoryBackend, init_rate_limit, parse_limit
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    backend = MemoryBackend()
+    monkeypatch.setitem(app.extensions, 'rate_limit', backend)
+    return backend
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('1/second') == (1, 1)
+
+def test_token_bucket_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: now[0])
+    backend = MemoryBackend()
+
+    assert backend.consume('k', 2, 1.0) == (True, 0)
+    assert backend.consume('k', 2, 1.0) == (True, 0)
+    allowed, retry_after = backend.consume('k', 2, 1.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+    now[0] += 1.0
+    assert backend.consume('k', 2, 1.0)[0]
+    assert backend.consume('other', 2, 1.0)[0]
+
+def test_prune_keeps_drained_slow_buckets(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: now[0])
+    monkeypatch.setattr(MemoryBackend, 'PRUNE_EVERY', 2)
+    backend = MemoryBackend()
+
+    # A slow limit (1 per minute) is drained, then a fast limit triggers pruning.
+    assert backend.consume('login', 1, 1 / 60)[0]
+    now[0] += 5
+    assert backend.consume('fast', 1, 1.0)[0]
+    assert 'login' in backend.buckets
+    assert not backend.consume('login', 1, 1 / 60)[0]
+
+def test_login_rate_limited(app, client, limiter, monkeypatch, init_database):
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_LOGIN', '2/minute')
+    credentials = {'email': 'nobody@example.com', 'password': 'Password123'}
+
+    assert client.post('/api/auth/login', json=credentials).status_code == 401
+    assert client.post('/api/auth/login', json=credentials).status_code == 401
+    response = client.post('/api/auth/login', json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_reservation_limit_is_per_user(app, client, limiter, monkeypatch, init_database):
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_RESERVATIONS', '1/minute')
+    with app.app_context():
+        users = [User(username=f'limited{i}', email=f'limited{i}@test.com',
+                      user_type=UserType.CUSTOMER, password_hash='x') for i in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        tokens = [create_access_token(identity=str(user.id)) for user in users]
+
+    def post(token):
+        return client.post('/api/reservations/', json={'venue_id': 999},
+                           headers={'Authorization': f'Bearer {token}'})
+
+    assert post(tokens[0]).status_code == 404
+    assert post(tokens[0]).status_code == 429
+    assert post(tokens[1]).status_code == 404
+
+def test_load_shedder_returns_503_when_saturated():
+    app = Flask(__name__)
+    app.config.update(RATE_LIMIT_ENABLED=False, LOAD_SHED_MAX_IN_FLIGHT=1, LOAD_SHED_RETRY_AFTER=2)
+    app.add_url_rule('/work', 'work', lambda: 'done')
+    app.add_url_rule('/health', 'health', lambda: 'OK')
+    init_rate_limit(app)
+    client = app.test_client()
+    shedder = app.extensions['load_shedder']
+
+    assert client.get('/work').status_code == 200
+    assert shedder.in_flight == 0
+
+    shedder.enter()
+    response = client.get('/work')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+    assert client.get('/health').status_code == 200
+    shedder.leave()
+    assert shedder.in_flight == 0
+    assert client.get('/work').status_code == 200
@@ -1,16 +1,12 @@
+import base64
 import pytest
 from datetime import datetime, timedelta
 from flask_jwt_extended import create_access_token
-from ..models import User, Venue, Reservation, ReservationStatus, UserType, VenueType
+from ..models import User, Venue, IdempotencyKey, Reservation, ReservationArchive, ReservationStatus, ReservationStatusEvent, UserType, VenueType, WaitlistEntry
 from ..extensions import db
-
-@pytest.fixture(scope='function')
-def init_database(app):
-    with app.app_context():
-        db.create_all()
-        yield db
-        db.session.remove()
-        db.drop_all()
+from ..facades.reservation_facade import ReservationFacade
+from ..facades.waitlist_facade import WaitlistFacade
+from ..rate_limit import MemoryBackend
 
 @pytest.fixture
 def customer_user(app, init_database):
@@ -221,7 +217,12 @@ def test_delete_reservation_success(client, customer_token, reservation, init_da
             headers={"Authorization": f"Bearer {customer_token}"}
         )
         assert response.status_code == 200
-        assert db.session.get(Reservation, res_id) is None
+        assert db.session.get(Reservation, res_id).deleted_at is not None
+
+    listed = client.get("/api/reservations/", headers={"Authorization": f"Bearer {customer_token}"})
+    assert listed.json == []
+    changes = client.get("/api/reservations/changes", headers={"Authorization": f"Bearer {customer_token}"})
+    assert changes.json["changes"][0]["deleted"] is True
 
 def test_delete_reservation_unauthorized(client, owner_token, reservation, init_database):
     response = client.delete(
@@ -236,4 +237,406 @@ def test_delete_nonexistent_reservation(client, customer_token, init_database):
             "/api/reservations/9999",
             headers={"Authorization": f"Bearer {customer_token}"}
         )
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+
+def test_reservation_changes_since_token(client, customer_token, owner_token, reservation, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    response = client.get("/api/reservations/changes", headers=headers)
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json["changes"]] == [reservation["id"]]
+    token = response.json["next_token"]
+
+    response = client.get(f"/api/reservations/changes?since={token}", headers=headers)
+    assert response.status_code == 200
+    assert response.json["changes"] == []
+    token = response.json["next_token"]
+
+    client.patch(
+        f"/api/reservations/{reservation['id']}/status",
+        json={"status": "confirmed"},
+        headers={"Authorization": f"Bearer {owner_token}"}
+    )
+    response = client.get(f"/api/reservations/changes?since={token}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json["changes"]) == 1
+    assert response.json["changes"][0]["status"] == "confirmed"
+    assert response.json["next_token"] != token
+
+def test_reservation_changes_wait_for_lag(app, client, customer_token, reservation, monkeypatch, init_database):
+    # Changes newer than the lag may still be joined by earlier ones that are
+    # committing, so they are held back and the token stays behind them.
+    monkeypatch.setitem(app.config, "CHANGE_FEED_LAG_SECONDS", 60)
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    response = client.get("/api/reservations/changes", headers=headers)
+    assert response.json["changes"] == []
+
+    monkeypatch.setitem(app.config, "CHANGE_FEED_LAG_SECONDS", 0)
+    response = client.get(f"/api/reservations/changes?since={response.json['next_token']}", headers=headers)
+    assert [c["id"] for c in response.json["changes"]] == [reservation["id"]]
+
+def test_reservation_changes_report_deleted_venue(client, customer_token, owner_token, venue, reservation, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    token = client.get("/api/reservations/changes", headers=headers).json["next_token"]
+
+    response = client.delete(f"/api/venues/{venue['id']}", headers={"Authorization": f"Bearer {owner_token}"})
+    assert response.status_code == 200
+
+    changes = client.get(f"/api/reservations/changes?since={token}", headers=headers).json["changes"]
+    assert [(c["id"], c["deleted"], c["removed"]) for c in changes] == [(reservation["id"], True, "deleted")]
+
+def test_reservation_changes_expired_token(client, customer_token, init_database):
+    token = (datetime.utcnow() - timedelta(days=60)).strftime("%Y%m%d%H%M%S%f") + "-1"
+    response = client.get(
+        f"/api/reservations/changes?since={token}",
+        headers={"Authorization": f"Bearer {customer_token}"}
+    )
+    assert response.status_code == 410
+
+def test_reservation_changes_invalid_token(client, customer_token, init_database):
+    response = client.get(
+        "/api/reservations/changes?since=garbage",
+        headers={"Authorization": f"Bearer {customer_token}"}
+    )
+    assert response.status_code == 400
+
+def test_fast_serializer_matches_marshal(app, client, owner_token, venue, reservation, monkeypatch):
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    urls = ["/api/reservations/", f"/api/reservations/venue/{venue['id']}"]
+    marshalled = [client.get(url, headers=headers).data for url in urls]
+
+    monkeypatch.setitem(app.config, "FAST_SERIALIZER", True)
+    fast = [client.get(url, headers=headers).data for url in urls]
+    assert fast == marshalled
+
+def test_reservation_list_not_modified(client, customer_token, owner_token, reservation, query_counter, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    response = client.get("/api/reservations/", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    with query_counter:
+        response = client.get("/api/reservations/", headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 304
+    assert response.data == b""
+    assert query_counter.count == 1
+
+    client.patch(
+        f"/api/reservations/{reservation['id']}/status",
+        json={"status": "confirmed"},
+        headers={"Authorization": f"Bearer {owner_token}"}
+    )
+    response = client.get("/api/reservations/", headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json[0]["status"] == "confirmed"
+
+def test_reservation_list_etag_tracks_venue_and_user(app, client, customer_token, owner_token, venue, reservation, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    etag = client.get("/api/reservations/", headers=headers).headers["ETag"]
+
+    with app.app_context():
+        db.session.get(Venue, venue["id"]).name = "Renamed Venue"
+        db.session.commit()
+    response = client.get("/api/reservations/", headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert response.json[0]["venue_name"] == "Renamed Venue"
+
+    # Another user's tag never validates, even for the same URL.
+    etag = response.headers["ETag"]
+    response = client.get("/api/reservations/", headers={"Authorization": f"Bearer {owner_token}", "If-None-Match": etag})
+    assert response.status_code == 200
+
+def test_create_reservation_idempotent_retry(client, customer_token, venue, query_counter, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}", "Idempotency-Key": "booking-1"}
+    data = {
+        "venue_id": venue["id"],
+        "reservation_time": (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M"),
+        "party_size": 2
+    }
+    first = client.post("/api/reservations/", json=data, headers=headers)
+    assert first.status_code == 201
+
+    with query_counter:
+        retry = client.post("/api/reservations/", json=data, headers=headers)
+    assert retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert not any("reservations" in statement for statement in query_counter.statements)
+
+    with client.application.app_context():
+        assert Reservation.query.filter_by(venue_id=venue["id"]).count() == 1
+
+    changed = client.post("/api/reservations/", json=dict(data, party_size=3), headers=headers)
+    assert changed.status_code == 422
+
+def test_idempotency_key_taken_over_after_lease(app, client, customer_token, venue, init_database):
+    headers = {"Authorization": f"Bearer {customer_token}", "Idempotency-Key": "booking-2"}
+    data = {
+        "venue_id": venue["id"],
+        "reservation_time": (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M"),
+        "party_size": 2
+    }
+    assert client.post("/api/reservations/", json=data, headers=headers).status_code == 201
+
+    # Make it look as if the worker died before the booking committed.
+    with app.app_context():
+        Reservation.query.filter_by(venue_id=venue["id"]).delete()
+        record = IdempotencyKey.query.filter_by(key="booking-2").one()
+        record.status_code = None
+        record.response_body = None
+        db.session.commit()
+
+    assert client.post("/api/reservations/", json=data, headers=headers).status_code == 409
+
+    with app.app_context():
+        record = IdempotencyKey.query.filter_by(key="booking-2").one()
+        record.claimed_at = datetime.utcnow() - timedelta(seconds=app.config["IDEMPOTENCY_LEASE_SECONDS"] + 1)
+        db.session.commit()
+
+    retry = client.post("/api/reservations/", json=data, headers=headers)
+    assert retry.status_code == 201
+    assert client.post("/api/reservations/", json=data, headers=headers).headers["Idempotent-Replayed"] == "true"
+
+def test_rate_limited_request_is_not_replayed(app, client, customer_token, venue, monkeypatch, init_database):
+    now = [100.0]
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: now[0])
+    monkeypatch.setitem(app.extensions, 'rate_limit', MemoryBackend())
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_RESERVATIONS', '1/minute')
+    auth = {"Authorization": f"Bearer {customer_token}"}
+    data = {
+        "venue_id": venue["id"],
+        "reservation_time": (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M"),
+        "party_size": 2
+    }
+    assert client.post("/api/reservations/", json=data, headers=dict(auth, **{"Idempotency-Key": "a"})).status_code == 201
+
+    later = dict(data, reservation_time=(datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%d %H:%M"))
+    headers = dict(auth, **{"Idempotency-Key": "b"})
+    throttled = client.post("/api/reservations/", json=later, headers=headers)
+    assert throttled.status_code == 429
+    assert "Retry-After" in throttled.headers
+
+    now[0] += 60
+    retry = client.post("/api/reservations/", json=later, headers=headers)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+
+def test_idempotent_response_commits_with_the_reservation(app, client, customer_token, venue, monkeypatch,
+                                                          init_database):
+    class WorkerDied(BaseException):
+        pass
+
+    create = ReservationFacade.create_reservation
+
+    def create_then_die(self, *args):
+        create(self, *args)
+        raise WorkerDied()
+
+    headers = {"Authorization": f"Bearer {customer_token}", "Idempotency-Key": "booking-3"}
+    data = {
+        "venue_id": venue["id"],
+        "reservation_time": (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M"),
+        "party_size": 2
+    }
+    monkeypatch.setattr(ReservationFacade, 'create_reservation', create_then_die)
+    with pytest.raises(WorkerDied):
+        client.post("/api/reservations/", json=data, headers=headers)
+    monkeypatch.undo()
+
+    retry = client.post("/api/reservations/", json=data, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    with app.app_context():
+        reservation = Reservation.query.filter_by(venue_id=venue["id"]).one()
+    assert retry.json == {"message": "The reservation has been created", "id": reservation.id}
+
+def test_archive_reservations(app, client, customer_user, customer_token, venue, reservation, init_database):
+    with app.app_context():
+        old = Reservation(
+            customer_id=customer_user["id"],
+            venue_id=venue["id"],
+            reservation_time=datetime.utcnow() - timedelta(days=400),
+            party_size=2,
+            status=ReservationStatus.CONFIRMED
+        )
+        db.session.add(old)
+        db.session.commit()
+        old_id = old.id
+
+    result = app.test_cli_runner().invoke(args=["archive-reservations", "--older-than-days", "180", "--batch-size", "1"])
+    assert "Archived 1 reservations" in result.output
+
+    with app.app_context():
+        assert db.session.get(Reservation, old_id) is None
+        assert db.session.get(ReservationArchive, old_id).status == ReservationStatus.CONFIRMED
+
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    hot = client.get("/api/reservations/", headers=headers).json
+    assert [r["id"] for r in hot] == [reservation["id"]]
+    history = client.get("/api/reservations/?include_archived=true", headers=headers).json
+    assert sorted(r["id"] for r in history) == sorted([reservation["id"], old_id])
+
+    changes = client.get("/api/reservations/changes", headers=headers).json["changes"]
+    assert {c["id"]: c.get("removed") for c in changes} == {reservation["id"]: None, old_id: "archived"}
+
+def test_venue_calendar(app, client, customer_user, owner_token, customer_token, venue, query_counter, init_database):
+    with app.app_context():
+        for time, party_size, status in (
+            (datetime(2024, 5, 3, 19, 0), 2, ReservationStatus.CONFIRMED),
+            (datetime(2024, 5, 3, 19, 15), 4, ReservationStatus.PENDING),
+            (datetime(2024, 5, 3, 19, 30), 3, ReservationStatus.PENDING),
+            (datetime(2024, 5, 3, 21, 0), 2, ReservationStatus.CANCELLED),
+            (datetime(2024, 5, 31, 0, 0), 1, ReservationStatus.CONFIRMED),
+            (datetime(2024, 6, 1, 12, 0), 5, ReservationStatus.CONFIRMED),
+        ):
+            db.session.add(Reservation(customer_id=customer_user["id"], venue_id=venue["id"],
+                                       reservation_time=time, party_size=party_size, status=status))
+        db.session.commit()
+
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    url = f"/api/reservations/venue/{venue['id']}/calendar?month=2024-05"
+    with query_counter:
+        calendar = client.get(url, headers=headers).json
+    assert query_counter.count <= 4
+    assert calendar["slots_per_day"] == 48
+    assert sorted(calendar["days"]) == ["2024-05-03", "2024-05-31"]
+
+    may_3 = calendar["days"]["2024-05-03"]
+    assert (may_3["reservations"], may_3["guests"]) == (3, 9)
+    bits = int.from_bytes(base64.b64decode(may_3["bitmap"]), "big")
+    booked = [slot for slot in range(48) if bits >> (47 - slot) & 1]
+    assert booked == [38, 39]
+
+    runs = client.get(url + "&encoding=rle&slot=15", headers=headers).json["days"]
+    assert runs["2024-05-03"]["rle"] == [[76, 3]]
+    assert runs["2024-05-31"]["rle"] == [[0, 1]]
+
+    assert client.get(url + "&slot=7", headers=headers).status_code == 400
+    forbidden = client.get(url, headers={"Authorization": f"Bearer {customer_token}"})
+    assert forbidden.status_code == 403
+
+@pytest.fixture
+def second_customer_token(app, init_database):
+    with app.app_context():
+        user = User(username="second_customer", email="second@test.com", user_type=UserType.CUSTOMER)
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        return create_access_token(identity=str(user.id)), user.id
+
+def test_waitlist_promotes_in_order_when_slot_frees(app, client, customer_token, owner_token, second_customer_token,
+                                                    venue, init_database):
+    slot = (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%d 19:00")
+    customer = {"Authorization": f"Bearer {customer_token}"}
+    second_token, second_id = second_customer_token
+    second = {"Authorization": f"Bearer {second_token}"}
+    booking = {"venue_id": venue["id"], "reservation_time": slot, "party_size": 2}
+
+    assert client.post("/api/reservations/waitlist", json=booking, headers=second).status_code == 409
+    reservation_id = client.post("/api/reservations/", json=booking, headers=customer).json["id"]
+    assert client.post("/api/reservations/", json=booking, headers=second).status_code == 400
+
+    queued = client.post("/api/reservations/waitlist", json=dict(booking, party_size=4), headers=second)
+    assert queued.status_code == 201
+    assert client.post("/api/reservations/waitlist", json=booking, headers=second).status_code == 409
+    assert client.get("/api/reservations/waitlist", headers=second).json[0]["position"] == 1
+
+    rejected = client.patch(f"/api/reservations/{reservation_id}/status", json={"status": "rejected"},
+                            headers={"Authorization": f"Bearer {owner_token}"})
+    assert rejected.status_code == 200
+
+    entry = client.get("/api/reservations/waitlist", headers=second).json[0]
+    assert (entry["status"], entry["position"]) == ("promoted", None)
+    with app.app_context():
+        promoted = db.session.get(Reservation, entry["reservation_id"])
+        assert (promoted.customer_id, promoted.party_size, promoted.status) == (second_id, 4, ReservationStatus.PENDING)
+
+    # The slot is held again, so the rejected customer can queue for it.
+    assert client.post("/api/reservations/waitlist", json=booking, headers=customer).status_code == 201
+    assert client.delete(f"/api/reservations/{entry['reservation_id']}", headers=second).status_code == 200
+    mine = client.get("/api/reservations/waitlist", headers=customer).json[0]
+    assert mine["status"] == "promoted"
+
+def test_promote_waitlist_cli_skips_taken_slots(app, client, customer_token, second_customer_token, venue, init_database):
+    slot = (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%d 20:00")
+    booking = {"venue_id": venue["id"], "reservation_time": slot, "party_size": 2}
+    client.post("/api/reservations/", json=booking, headers={"Authorization": f"Bearer {customer_token}"})
+    client.post("/api/reservations/waitlist", json=booking,
+                headers={"Authorization": f"Bearer {second_customer_token[0]}"})
+
+    assert "Promoted 0 waitlist entries" in app.test_cli_runner().invoke(args=["promote-waitlist"]).output
+
+def test_slot_holds_one_active_reservation_when_checks_race(app, client, customer_token, second_customer_token,
+                                                          venue, monkeypatch, init_database):
+    # Both paths check the slot before inserting; make the checks miss the
+    # competing booking as if it committed in between.
+    from sqlalchemy import false
+    monkeypatch.setattr("app.facades.reservation_facade.slot_taken_clause", lambda *args: false())
+    monkeypatch.setattr("app.facades.waitlist_facade.slot_taken_clause", lambda *args: false())
+    slot = (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%d 21:00")
+    booking = {"venue_id": venue["id"], "reservation_time": slot, "party_size": 2}
+    second = {"Authorization": f"Bearer {second_customer_token[0]}"}
+
+    assert client.post("/api/reservations/", json=booking, headers={"Authorization": f"Bearer {customer_token}"}).status_code == 201
+    taken = client.post("/api/reservations/", json=booking, headers=second)
+    assert taken.status_code == 400 and "already taken" in taken.json["message"]
+
+    with app.app_context():
+        db.session.add(WaitlistEntry(customer_id=second_customer_token[1], venue_id=venue["id"],
+                                     reservation_time=datetime.strptime(slot, "%Y-%m-%d %H:%M"), party_size=2))
+        db.session.commit()
+        assert WaitlistFacade().promote(venue["id"], datetime.strptime(slot, "%Y-%m-%d %H:%M")) == []
+        assert WaitlistEntry.query.one().status == "waiting"
+        assert Reservation.query.filter_by(venue_id=venue["id"]).count() == 1
+
+def test_status_transitions_are_guarded_and_audited(app, client, owner_token, customer_token, customer_user,
+                                                    owner_user, reservation, query_counter, init_database):
+    owner = {"Authorization": f"Bearer {owner_token}"}
+    customer = {"Authorization": f"Bearer {customer_token}"}
+    url = f"/api/reservations/{reservation['id']}/status"
+
+    with query_counter:
+        assert client.patch(url, json={"status": "confirmed"}, headers=owner).status_code == 200
+    # user lookup, audit INSERT ... SELECT and the guarded UPDATE; no read of the reservation
+    # beyond the new version, which SQLite cannot hand back through RETURNING
+    assert not any(statement.lstrip().startswith("SELECT") and "FROM reservations" in statement
+                   and not statement.lstrip().startswith("SELECT reservations.version")
+                   for statement in query_counter.statements)
+
+    assert client.patch(url, json={"status": "confirmed"}, headers=owner).status_code == 409
+    assert client.patch(url, json={"status": "rejected"}, headers=owner).status_code == 409
+    assert client.patch(url, json={"status": "pending"}, headers=owner).status_code == 403
+    assert client.patch(url, json={"status": "cancelled"}, headers=customer).status_code == 200
+    assert client.patch(url, json={"status": "confirmed"}, headers=owner).status_code == 409
+    assert client.patch("/api/reservations/999999/status", json={"status": "cancelled"}, headers=owner).status_code == 404
+
+    with app.app_context():
+        events = ReservationStatusEvent.query.filter_by(reservation_id=reservation["id"]) \
+            .order_by(ReservationStatusEvent.id).all()
+        assert [(e.from_status, e.to_status, e.actor_id) for e in events] == [
+            (ReservationStatus.PENDING, ReservationStatus.CONFIRMED, owner_user["id"]),
+            (ReservationStatus.CONFIRMED, ReservationStatus.CANCELLED, customer_user["id"]),
+        ]
+
+def test_status_update_if_match(client, owner_token, customer_token, reservation, init_database):
+    owner = {"Authorization": f"Bearer {owner_token}"}
+    url = f"/api/reservations/{reservation['id']}/status"
+    version = client.get("/api/reservations/", headers=owner).json[0]["version"]
+    assert version == 1
+
+    response = client.patch(url, json={"status": "confirmed"}, headers=dict(owner, **{"If-Match": f'"{version}"'}))
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    # A second writer still holding version 1 loses, even for an allowed transition.
+    stale = client.patch(url, json={"status": "cancelled"}, headers=dict(owner, **{"If-Match": '"1"'}))
+    assert stale.status_code == 412
+    customer = {"Authorization": f"Bearer {customer_token}"}
+    assert client.patch(url, json={"status": "cancelled"}, headers=dict(customer, **{"If-Match": '"2"'})).status_code == 200
+
+def test_status_update_returns_version_without_if_match(client, owner_token, reservation, init_database):
+    owner = {"Authorization": f"Bearer {owner_token}"}
+    response = client.patch(f"/api/reservations/{reservation['id']}/status", json={"status": "confirmed"}, headers=owner)
+    assert response.status_code == 200
+    assert response.json["version"] == 2
+    assert response.headers["ETag"] == '"2"'
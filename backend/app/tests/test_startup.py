@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+COLD_START_TARGET_SECONDS = 2.0
+
+def _run(code, **env):
+    environment = {k: v for k, v in os.environ.items() if k != 'FLASK_RUN_FROM_CLI'}
+    environment.update(DATABASE_URL='sqlite:///:memory:', **env)
+    return subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=environment,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+def test_create_app_defers_optional_imports():
+    output = _run(
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app()\n"
+        "print(','.join(sorted(m for m in ('requests', 'flask_migrate', 'PIL') if m in sys.modules)))\n"
+    )
+    assert output == ''
+
+def test_lazy_routes_register_on_first_request():
+    output = _run(
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "before = any(r.rule.startswith('/api/venues') for r in app.url_map.iter_rules())\n"
+        "app.test_client().get('/health')\n"
+        "after = any(r.rule.startswith('/api/venues') for r in app.url_map.iter_rules())\n"
+        "print(before, after)\n",
+        LAZY_ROUTES='True'
+    )
+    assert output == 'False True'
+
+def test_lazy_routes_behind_proxy_fix():
+    output = _run(
+        "from app import create_app, ensure_routes\n"
+        "app = create_app()\n"
+        "ensure_routes(app)\n"
+        "print(any(r.rule.startswith('/api/venues') for r in app.url_map.iter_rules()))\n",
+        LAZY_ROUTES='True', TRUSTED_PROXIES='1'
+    )
+    assert output == 'True'
+
+def test_swagger_can_be_disabled():
+    output = _run(
+        "from app import create_app\n"
+        "client = create_app().test_client()\n"
+        "print(client.get('/api/swagger.json').status_code, client.get('/swagger/').status_code)\n",
+        SWAGGER_ENABLED='False'
+    )
+    assert output == '404 404'
+
+@pytest.mark.timing
+def test_cold_start_within_target():
+    from benchmarks.startup import measure_cold_start
+    assert measure_cold_start(runs=3)['total_s'] < COLD_START_TARGET_SECONDS
+
+def test_swagger_spec_is_cached_with_etag(client):
+    response = client.get('/api/swagger.json')
+    assert response.status_code == 200
+    assert response.json['basePath'] == '/api'
+    assert 'max-age=' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+
+    response = client.get('/api/swagger.json', headers={'If-None-Match': etag})
+    assert response.status_code == 304
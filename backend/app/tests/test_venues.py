@@ -1,16 +1,12 @@
+import gzip
+import io
 import pytest
+from datetime import datetime
 from flask_jwt_extended import create_access_token
 import uuid
 from ..extensions import db
-from ..models import User, Venue, VenueComment, VenueType
-
-@pytest.fixture(scope='function')
-def init_database(app):
-    with app.app_context():
-        db.create_all()
-        yield db
-        db.session.remove()
-        db.drop_all()
+from ..models import User, Venue, VenueComment, VenueType, Reservation
+from ..storage import LocalStorage
 
 @pytest.fixture
 def register_user(client):
@@ -255,4 +251,273 @@ def test_get_comments(client, create_venue, customer_token, init_database):
     
     assert comment['text'] == "Lovely cafe!"
     assert comment['rating'] == 5
-    assert comment['venue_id'] == venue_id
\ No newline at end of file
+    assert comment['venue_id'] == venue_id
+def test_fast_serializer_matches_marshal(app, client, create_venue, customer_token, monkeypatch):
+    create_venue()
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    marshalled = client.get('/api/venues/', headers=headers).data
+
+    monkeypatch.setitem(app.config, "FAST_SERIALIZER", True)
+    assert client.get('/api/venues/', headers=headers).data == marshalled
+
+def test_venue_list_compressed_with_weak_etag(app, client, synthetic_data):
+    ids = synthetic_data()
+    with app.app_context():
+        token = create_access_token(identity=str(ids["customer_ids"][0]))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    plain = client.get('/api/venues/', headers=headers)
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    compressed = client.get('/api/venues/', headers=dict(headers, **{"Accept-Encoding": "gzip"}))
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers["ETag"] == plain.headers["ETag"]
+
+    not_modified = client.get('/api/venues/', headers=dict(headers, **{"If-None-Match": plain.headers["ETag"]}))
+    assert not_modified.status_code == 304
+
+def _owner_headers(app, ids, index=0):
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=str(ids['owner_ids'][index]))}"}
+
+def _dependent_rows(app, venue_id):
+    with app.app_context():
+        return (Reservation.query.filter_by(venue_id=venue_id).count(),
+                VenueComment.query.filter_by(venue_id=venue_id).count())
+
+def test_delete_venue_cascades_in_database(app, client, synthetic_data):
+    ids = synthetic_data()
+    venue_id = ids["venue_ids"][0]
+    assert _dependent_rows(app, venue_id) != (0, 0)
+
+    response = client.delete(f'/api/venues/{venue_id}', headers=_owner_headers(app, ids))
+    assert response.status_code == 200
+    assert _dependent_rows(app, venue_id) == (0, 0)
+
+def test_delete_large_venue_purges_in_background(app, client, synthetic_data, monkeypatch):
+    ids = synthetic_data()
+    venue_id = ids["venue_ids"][1]
+    monkeypatch.setitem(app.config, "VENUE_PURGE_ASYNC_THRESHOLD", 0)
+    monkeypatch.setitem(app.config, "VENUE_PURGE_BATCH_SIZE", 7)
+    scheduled = []
+    monkeypatch.setattr("app.facades.venue_facade.run_in_background",
+                        lambda func, *args: scheduled.append((func, args)))
+    headers = _owner_headers(app, ids, 1)
+
+    response = client.delete(f'/api/venues/{venue_id}', headers=headers)
+    assert response.status_code == 202
+    assert client.get(f'/api/venues/{venue_id}', headers=headers).status_code == 404
+    assert _dependent_rows(app, venue_id) != (0, 0)
+
+    result = app.test_cli_runner().invoke(args=["purge-deleted-venues"])
+    assert "Purged 1 deleted venues" in result.output
+    assert _dependent_rows(app, venue_id) == (0, 0)
+    with app.app_context():
+        assert db.session.get(Venue, venue_id) is None
+    assert scheduled[0][1] == (venue_id,)
+
+def _png(width, height):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(out, 'PNG')
+    return out.getvalue()
+
+def test_upload_venue_image_builds_variants(app, client, owner_token, create_venue, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'media_storage', LocalStorage(str(tmp_path), '/media/'))
+    monkeypatch.setattr("app.facades.venue_facade.run_in_background", lambda func, *args: func(*args))
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+
+    response = client.post(f'/api/venues/{venue_id}/images', headers=headers,
+                           data={'file': (io.BytesIO(_png(1000, 500)), 'photo.png'), 'kind': 'image'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    image = client.get(f'/api/venues/{venue_id}/images/{response.json["id"]}', headers=headers).json
+    assert image['status'] == 'ready'
+    assert sorted({(v['width'], v['format']) for v in image['variants']}) == [
+        (320, 'jpg'), (320, 'webp'), (640, 'jpg'), (640, 'webp'), (1000, 'jpg'), (1000, 'webp')
+    ]
+
+    venue = client.get(f'/api/venues/{venue_id}', headers=headers).json
+    card = next(v for v in image['variants'] if v['width'] == 640 and v['format'] == 'jpg')
+    assert venue['image_url'] == card['url']
+    assert venue['image_srcset'].count('.webp') == 3
+
+    served = client.get(card['url'])
+    assert served.status_code == 200
+    assert 'immutable' in served.headers['Cache-Control']
+    served.close()
+
+def test_upload_rejects_non_images(app, client, owner_token, create_venue, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'media_storage', LocalStorage(str(tmp_path), '/media/'))
+    venue_id = create_venue()
+    response = client.post(f'/api/venues/{venue_id}/images',
+                           headers={"Authorization": f"Bearer {owner_token}"},
+                           data={'file': (io.BytesIO(b'not an image'), 'notes.txt')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_upload_rejects_decompression_bombs(app, client, owner_token, create_venue, tmp_path, monkeypatch):
+    from PIL import Image
+    monkeypatch.setitem(app.extensions, 'media_storage', LocalStorage(str(tmp_path), '/media/'))
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    venue_id = create_venue()
+    response = client.post(f'/api/venues/{venue_id}/images',
+                           headers={"Authorization": f"Bearer {owner_token}"},
+                           data={'file': (io.BytesIO(_png(100, 100)), 'bomb.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_process_pending_images_resumes_interrupted_uploads(app, client, owner_token, create_venue, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'media_storage', LocalStorage(str(tmp_path), '/media/'))
+    monkeypatch.setattr("app.facades.venue_facade.run_in_background", lambda func, *args: None)
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    response = client.post(f'/api/venues/{venue_id}/images', headers=headers,
+                           data={'file': (io.BytesIO(_png(800, 400)), 'photo.png'), 'kind': 'image'},
+                           content_type='multipart/form-data')
+    image_id = response.json['id']
+
+    result = app.test_cli_runner().invoke(args=['process-pending-images'])
+    assert 'Processed 0 pending venue images' in result.output
+
+    result = app.test_cli_runner().invoke(args=['process-pending-images', '--older-than-minutes', '0'])
+    assert 'Processed 1 pending venue images' in result.output
+    image = client.get(f'/api/venues/{venue_id}/images/{image_id}', headers=headers).json
+    assert image['status'] == 'ready'
+
+def test_process_image_without_variants_marks_failed(app, client, owner_token, create_venue, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'media_storage', LocalStorage(str(tmp_path), '/media/'))
+    monkeypatch.setattr("app.facades.venue_facade.run_in_background", lambda func, *args: func(*args))
+    monkeypatch.setattr("app.facades.venue_facade.build_variants", lambda data, widths: iter(()))
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    response = client.post(f'/api/venues/{venue_id}/images', headers=headers,
+                           data={'file': (io.BytesIO(_png(800, 400)), 'photo.png'), 'kind': 'image'},
+                           content_type='multipart/form-data')
+    image = client.get(f'/api/venues/{venue_id}/images/{response.json["id"]}', headers=headers).json
+    assert image['status'] == 'failed'
+
+def test_create_venue_builds_weekly_hours(client, owner_token, create_venue):
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+
+    venue = client.get(f'/api/venues/{venue_id}', headers=headers).json
+    assert len(venue['opening_hours']) == 7
+    assert venue['opening_hours'][0] == {'weekday': 0, 'date': None, 'opens': '09:00', 'closes': '18:00', 'closed': False}
+
+    # 2024-05-18 is a Saturday (10:00-16:00)
+    hours = client.get(f'/api/venues/{venue_id}/hours?at=2024-05-18T15:59', headers=headers).json
+    assert hours['open'] is True
+    assert client.get(f'/api/venues/{venue_id}/hours?at=2024-05-18T16:00', headers=headers).json['open'] is False
+
+def test_create_venue_rejects_invalid_hours(client, owner_token, init_database):
+    response = client.post('/api/venues/', headers={"Authorization": f"Bearer {owner_token}"}, json={
+        "name": "Bad Hours", "address": "Sofia", "phone": "555", "type": "bar",
+        "weekdays_hours": "9am-5pm", "weekend_hours": "10:00-16:00"
+    })
+    assert response.status_code == 400
+
+def test_opening_hours_now_uses_venue_timezone(app, client, owner_token, create_venue, monkeypatch):
+    from zoneinfo import ZoneInfo
+    monkeypatch.setitem(app.config, 'VENUE_TIMEZONE', 'Etc/GMT-14')
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    hour = datetime.now(ZoneInfo('Etc/GMT-14')).hour
+    client.put(f'/api/venues/{venue_id}/hours', headers=headers, json=[
+        {'weekday': day, 'opens': f'{hour:02d}:00', 'closes': f'{hour + 1:02d}:00'} for day in range(7)
+    ])
+
+    assert client.get(f'/api/venues/{venue_id}/hours', headers=headers).json['open'] is True
+    assert [v['id'] for v in client.get('/api/venues/?open_at=now', headers=headers).get_json()] == [venue_id]
+
+@pytest.mark.parametrize('at, is_open', [
+    ('2024-05-17T23:30', True),   # Friday evening
+    ('2024-05-18T01:59', True),   # Friday's hours run past midnight
+    ('2024-05-18T02:00', False),
+    ('2024-05-20T23:30', False),  # Monday is a date exception: closed
+    ('2024-05-21T01:00', False),  # ...including the spill-over into Tuesday
+    ('2024-05-22T12:30', True),   # Wednesday lunch
+    ('2024-05-22T16:00', False),  # between lunch and dinner
+    ('2024-05-24T21:00', False),  # Friday exception with shorter hours
+])
+def test_opening_hours_open_at(client, owner_token, create_venue, at, is_open):
+    venue_id = create_venue()
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    weekly = [{'weekday': day, 'opens': '18:00', 'closes': '02:00'} for day in range(7) if day != 2]
+    response = client.put(f'/api/venues/{venue_id}/hours', headers=headers, json=weekly + [
+        {'weekday': 2, 'opens': '12:00', 'closes': '15:00'},
+        {'weekday': 2, 'opens': '18:00', 'closes': '23:00'},
+        {'date': '2024-05-20', 'closed': True},
+        {'date': '2024-05-24', 'opens': '12:00', 'closes': '20:00'},
+    ])
+    assert response.status_code == 200
+
+    assert client.get(f'/api/venues/{venue_id}/hours?at={at}', headers=headers).json['open'] is is_open
+    assert client.get(f'/api/venues/{venue_id}', headers=headers).json['weekdays_hours'] == '18:00-02:00'
+
+def test_set_opening_hours_rejects_overlaps(client, owner_token, create_venue):
+    venue_id = create_venue()
+    response = client.put(f'/api/venues/{venue_id}/hours', headers={"Authorization": f"Bearer {owner_token}"}, json=[
+        {'weekday': 0, 'opens': '09:00', 'closes': '14:00'},
+        {'weekday': 0, 'opens': '13:00', 'closes': '18:00'},
+    ])
+    assert response.status_code == 400
+
+def _add_venue(client, headers, name, venue_type, weekdays_hours):
+    response = client.post('/api/venues/', headers=headers, json={
+        "name": name, "address": f"{name} street", "phone": f"phone-{name}", "email": f"{name}@example.com",
+        "weekdays_hours": weekdays_hours, "weekend_hours": "10:00-16:00", "type": venue_type
+    })
+    return response.get_json()['id']
+
+def test_list_venues_filters(app, client, owner_token, customer_token):
+    owner = {"Authorization": f"Bearer {owner_token}"}
+    customer = {"Authorization": f"Bearer {customer_token}"}
+    cafe = _add_venue(client, owner, 'cafe', 'cafe', '08:00-17:00')
+    bar = _add_venue(client, owner, 'bar', 'bar', '18:00-03:00')
+    restaurant = _add_venue(client, owner, 'restaurant', 'restaurant', '12:00-23:00')
+    for venue_id, rating in ((bar, 5), (bar, 4), (restaurant, 3), (cafe, 5)):
+        client.post(f'/api/venues/{venue_id}/comments', headers=customer, json={'text': 'ok', 'rating': rating})
+
+    def ids(query):
+        response = client.get(f'/api/venues/?{query}', headers=customer)
+        assert response.status_code == 200
+        return [venue['id'] for venue in response.get_json()]
+
+    # 2024-05-22 is a Wednesday
+    assert ids('open_at=2024-05-22T19:30') == [bar, restaurant]
+    assert ids('open_at=2024-05-23T01:00') == [bar]
+    assert ids('open_at=2024-05-22T19:30&type=restaurant') == [restaurant]
+    assert ids('min_rating=4') == [cafe, bar]
+    assert ids('min_rating=4&open_at=2024-05-22T09:00') == [cafe]
+    assert client.get('/api/venues/?type=nightclub', headers=customer).status_code == 400
+
+    bar_details = client.get(f'/api/venues/{bar}', headers=customer).get_json()
+    assert (bar_details['rating'], bar_details['rating_count']) == (4.5, 2)
+
+    comment_id = client.get(f'/api/venues/{bar}/comments').get_json()[0]['id']
+    client.delete(f'/api/venues/{bar}/comments/{comment_id}', headers=customer)
+    assert client.get(f'/api/venues/{bar}', headers=customer).get_json()['rating_count'] == 1
+    with app.app_context():
+        before = db.session.query(Venue.rating, Venue.rating_count, Venue.rating_total).order_by(Venue.id).all()
+    assert "Refreshed ratings" in app.test_cli_runner().invoke(args=["refresh-venue-ratings"]).output
+    with app.app_context():
+        assert db.session.query(Venue.rating, Venue.rating_count, Venue.rating_total).order_by(Venue.id).all() == before
+
+def test_list_venues_paginates(client, owner_token, init_database):
+    headers = {"Authorization": f"Bearer {owner_token}"}
+    created = [_add_venue(client, headers, f'cafe{index}', 'cafe', '09:00-18:00') for index in range(5)]
+    _add_venue(client, headers, 'bar', 'bar', '18:00-02:00')
+
+    seen, url = [], '/api/venues/?limit=2&type=cafe'
+    while url:
+        response = client.get(url, headers=headers)
+        page = [venue['id'] for venue in response.get_json()]
+        assert len(page) <= 2
+        seen += page
+        link = response.headers.get('Link')
+        url = link[link.index('/api/'):link.index('>')] if link else None
+    assert seen == created
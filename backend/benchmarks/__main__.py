@@ -0,0 +1,144 @@
+import argparse
+import sys
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Venue, UserType
+from .report import compare, format_table, summarize, write_results
+from .runners import HttpRunner, TestClientRunner
+from .scenarios import Workload
+from .startup import format_startup, profile_startup
+from .datagen import SCALES, generate_dataset
+
+
+def _scale_counts(args):
+    counts = dict(SCALES[args.scale])
+    for key in counts:
+        if getattr(args, key) is not None:
+            counts[key] = getattr(args, key)
+    return counts
+
+
+def _load_seeded():
+    users = db.session.query(User.id, User.user_type).filter(User.username.like('bench_user_%')).all()
+    owner_ids = {user_id for user_id, user_type in users if user_type == UserType.OWNER}
+    venues = db.session.query(Venue.id, Venue.owner_id).filter(Venue.owner_id.in_(owner_ids)) \
+        .order_by(Venue.id).all()
+    return {
+        'owner_ids': [owner_id for _, owner_id in venues],
+        'venue_ids': [venue_id for venue_id, _ in venues],
+        'customer_ids': [user_id for user_id, user_type in users if user_type == UserType.CUSTOMER],
+    }
+
+
+def cmd_seed(args):
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        seeded = generate_dataset(seed=args.seed, skew=args.skew, **_scale_counts(args))
+    print(f"Seeded {len(seeded['venue_ids'])} venues and {len(seeded['customer_ids'])} customers")
+
+
+def cmd_run(args):
+    app = create_app(Config)
+    with app.app_context():
+        if args.target == 'testclient' or args.seed_db:
+            db.create_all()
+            seeded = generate_dataset(seed=args.seed, skew=args.skew, **_scale_counts(args))
+        else:
+            seeded = _load_seeded()
+    if not seeded['venue_ids'] or not seeded['customer_ids']:
+        sys.exit('No benchmark data found; run "python -m benchmarks seed" or pass --seed-db')
+
+    workload = Workload(app, seeded, seed=args.seed)
+    runner = TestClientRunner(app) if args.target == 'testclient' else HttpRunner(args.url)
+
+    if args.warmup:
+        runner.run(workload, args.warmup, args.concurrency)
+    samples, elapsed = runner.run(workload, args.requests, args.concurrency)
+
+    summary = summarize(samples, elapsed)
+    print(format_table(summary))
+    path = write_results(summary, {
+        'target': runner.name,
+        'url': args.url if args.target == 'http' else None,
+        'scale': args.scale,
+        'counts': _scale_counts(args),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://', 1)[0],
+    }, args.output)
+    print(f'Results written to {path}')
+
+
+def cmd_startup(args):
+    env = {'SWAGGER_ENABLED': 'False'} if args.no_swagger else {}
+    profile = profile_startup(args.runs, env)
+    print(format_startup(profile))
+    path = write_results(profile, {'target': 'startup', 'runs': args.runs, 'swagger': not args.no_swagger}, args.output)
+    print(f'Results written to {path}')
+
+
+def cmd_serialize(args):
+    from .serialization import benchmark_serialization, format_serialization
+    result = benchmark_serialization(args.rows, args.repeat)
+    print(format_serialization(result))
+    path = write_results(result, {'target': 'serialize', 'rows': args.rows}, args.output)
+    print(f'Results written to {path}')
+
+
+def cmd_compare(args):
+    print(compare(args.baseline, args.candidate))
+
+
+def _add_scale_args(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and request mix')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent for venue popularity')
+    for key in ('venues', 'customers', 'reservations', 'comments'):
+        parser.add_argument(f'--{key}', type=int, help=f'Override the number of {key} for the scale')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Seed data and benchmark the reservation API')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='Seed the database from DATABASE_URL')
+    _add_scale_args(seed_parser)
+    seed_parser.set_defaults(func=cmd_seed)
+
+    run_parser = commands.add_parser('run', help='Replay the request mix and report latency')
+    _add_scale_args(run_parser)
+    run_parser.add_argument('--target', choices=('testclient', 'http'), default='testclient')
+    run_parser.add_argument('--url', default='http://localhost:5000', help='Base URL for --target http')
+    run_parser.add_argument('--seed-db', action='store_true', help='Seed before an http run')
+    run_parser.add_argument('--requests', type=int, default=2000)
+    run_parser.add_argument('--warmup', type=int, default=100)
+    run_parser.add_argument('--concurrency', type=int, default=8, help='Client threads for --target http')
+    run_parser.add_argument('--output', help='Result file (default: benchmarks/results/<time>-<commit>-<target>.json)')
+    run_parser.set_defaults(func=cmd_run)
+
+    startup_parser = commands.add_parser('startup', help='Profile cold start time and import cost')
+    startup_parser.add_argument('--runs', type=int, default=5)
+    startup_parser.add_argument('--no-swagger', action='store_true', help='Profile with SWAGGER_ENABLED=False')
+    startup_parser.add_argument('--output', help='Result file (default: benchmarks/results/<time>-<commit>-startup.json)')
+    startup_parser.set_defaults(func=cmd_startup)
+
+    serialize_parser = commands.add_parser('serialize', help='Compare list serializers on large responses')
+    serialize_parser.add_argument('--rows', type=int, default=10000)
+    serialize_parser.add_argument('--repeat', type=int, default=5)
+    serialize_parser.add_argument('--output', help='Result file (default: benchmarks/results/<time>-<commit>-serialize.json)')
+    serialize_parser.set_defaults(func=cmd_serialize)
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+import csv
+import io
+import math
+import random
+from datetime import datetime, timedelta
+from enum import Enum
+from werkzeug.security import generate_password_hash
+from app.extensions import db
+from app.models import User, Venue, VenueHours, Reservation, VenueComment, UserType, VenueType, ReservationStatus
+from app.opening_hours import rows_from_legacy
+from app.facades.venue_facade import VenueFacade
+
+BENCH_PASSWORD = 'BenchPassword123'
+
+SCALES = {
+    'tiny': {'venues': 5, 'customers': 50, 'reservations': 500, 'comments': 200},
+    'small': {'venues': 20, 'customers': 200, 'reservations': 2000, 'comments': 1000},
+    'medium': {'venues': 200, 'customers': 2000, 'reservations': 50000, 'comments': 20000},
+    'large': {'venues': 1000, 'customers': 20000, 'reservations': 500000, 'comments': 200000},
+    'xlarge': {'venues': 5000, 'customers': 1000000, 'reservations': 5000000, 'comments': 1000000},
+}
+
+CHUNK_SIZE = 20000
+
+# Bookings cluster around lunch and dinner; weights are per hour of day.
+HOUR_WEIGHTS = {9: 2, 10: 3, 11: 5, 12: 12, 13: 12, 14: 6, 15: 3, 16: 3, 17: 5, 18: 10, 19: 16, 20: 16, 21: 9, 22: 4}
+SLOT_MINUTES = (0, 15, 30, 45)
+# Online reviews are J-shaped: mostly 5s and 4s with a bump at 1.
+RATING_WEIGHTS = {1: 7, 2: 5, 3: 12, 4: 30, 5: 46}
+PARTY_SIZE_WEIGHTS = {1: 5, 2: 40, 3: 12, 4: 25, 5: 6, 6: 7, 7: 2, 8: 3}
+PAST_STATUS_WEIGHTS = {ReservationStatus.CONFIRMED: 80, ReservationStatus.CANCELLED: 12, ReservationStatus.REJECTED: 8}
+FUTURE_STATUS_WEIGHTS = {ReservationStatus.PENDING: 55, ReservationStatus.CONFIRMED: 40, ReservationStatus.CANCELLED: 5}
+WEEKDAYS_HOURS = '09:00-23:00'
+WEEKEND_HOURS = '10:00-23:00'
+HISTORY_DAYS = 365
+FUTURE_DAYS = 60
+
+
+class _Sampler:
+    def __init__(self, rng, weights):
+        self.rng = rng
+        self.values = list(weights)
+        total = 0
+        self.cum_weights = []
+        for value in self.values:
+            total += weights[value]
+            self.cum_weights.append(total)
+
+    def __call__(self):
+        return self.rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def venue_weights(count, skew=1.0):
+    # Zipf-like popularity: the venue at rank r gets weight 1 / r^skew.
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _allocate(total, weights):
+    weight_sum = sum(weights)
+    counts = [int(total * weight / weight_sum) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % len(counts)] += 1
+    return counts
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def _copy_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+
+class _Loader:
+    def __init__(self, connection):
+        self.connection = connection
+        self.use_copy = connection.dialect.name == 'postgresql'
+
+    def load(self, model, rows):
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= CHUNK_SIZE:
+                self._flush(model, buffer)
+                buffer = []
+        if buffer:
+            self._flush(model, buffer)
+
+    def _flush(self, model, rows):
+        if self.use_copy:
+            self._copy(model.__table__, rows)
+        else:
+            self.connection.execute(model.__table__.insert(), rows)
+
+    def _copy(self, table, rows):
+        columns = list(rows[0])
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        out.seek(0)
+        cursor = self.connection.connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", out)
+        cursor.close()
+
+    def sync_sequences(self):
+        if not self.use_copy:
+            return
+        for table in ('users', 'venues', 'venue_hours', 'reservations', 'venue_comments'):
+            self.connection.execute(db.text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+            ))
+
+
+def _users(first_id, owners, customers, password_hash, created_at):
+    for offset in range(owners + customers):
+        user_id = first_id + offset
+        yield {
+            'id': user_id,
+            'username': f'bench_user_{user_id}',
+            'email': f'bench_user_{user_id}@example.com',
+            'password_hash': password_hash,
+            'user_type': UserType.OWNER if offset < owners else UserType.CUSTOMER,
+            'created_at': created_at,
+        }
+
+
+def _venues(rng, venue_ids, owner_ids):
+    venue_types = list(VenueType)
+    for venue_id, owner_id in zip(venue_ids, owner_ids):
+        yield {
+            'id': venue_id,
+            'name': f'Bench Venue {venue_id}',
+            'venue_type': venue_types[venue_id % len(venue_types)],
+            'phone': f'+359{venue_id:09d}',
+            'email': f'bench_venue_{venue_id}@example.com',
+            'address': f'{venue_id} Bench Street, Sofia',
+            'weekdays_hours': WEEKDAYS_HOURS,
+            'weekend_hours': WEEKEND_HOURS,
+            'owner_id': owner_id,
+            'latitude': round(42.69 + rng.uniform(-0.05, 0.05), 6),
+            'longitude': round(23.32 + rng.uniform(-0.05, 0.05), 6),
+        }
+
+
+def _venue_hours(venue_ids):
+    hours = rows_from_legacy(WEEKDAYS_HOURS, WEEKEND_HOURS)
+    for venue_id in venue_ids:
+        for row in hours:
+            yield dict(row, venue_id=venue_id)
+
+
+def _reservations(rng, venue_ids, customer_ids, per_venue, now):
+    hour = _Sampler(rng, HOUR_WEIGHTS)
+    party_size = _Sampler(rng, PARTY_SIZE_WEIGHTS)
+    past_status = _Sampler(rng, PAST_STATUS_WEIGHTS)
+    future_status = _Sampler(rng, FUTURE_STATUS_WEIGHTS)
+    slots_per_day = len(HOUR_WEIGHTS) * len(SLOT_MINUTES)
+    start_day = (now - timedelta(days=HISTORY_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    for venue_id, count in zip(venue_ids, per_venue):
+        # Widen the booking window for hot venues so every slot stays unique.
+        days = max(HISTORY_DAYS + FUTURE_DAYS, math.ceil(count * 2 / slots_per_day))
+        taken = set()
+        while len(taken) < count:
+            slot = start_day + timedelta(days=rng.randrange(days), hours=hour(), minutes=rng.choice(SLOT_MINUTES))
+            if slot in taken:
+                continue
+            taken.add(slot)
+            created_at = min(slot - timedelta(hours=rng.randint(1, 24 * 21)), now)
+            yield {
+                'customer_id': rng.choice(customer_ids),
+                'venue_id': venue_id,
+                'reservation_time': slot,
+                'party_size': party_size(),
+                'status': past_status() if slot < now else future_status(),
+                'notes': '',
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+
+def _comments(rng, venue_ids, customer_ids, count, weights, now):
+    rating = _Sampler(rng, RATING_WEIGHTS)
+    venue = _Sampler(rng, dict(zip(venue_ids, weights)))
+    for _ in range(count):
+        created_at = now - timedelta(minutes=rng.randrange(HISTORY_DAYS * 24 * 60))
+        yield {
+            'venue_id': venue(),
+            'user_id': rng.choice(customer_ids),
+            'text': 'Benchmark comment',
+            'rating': rating(),
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+
+def generate_dataset(venues, customers, reservations, comments, seed=42, skew=1.0, now=None):
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(second=0, microsecond=0)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    first_user_id = _next_id(User)
+    first_venue_id = _next_id(Venue)
+    owner_ids = list(range(first_user_id, first_user_id + venues))
+    customer_ids = list(range(first_user_id + venues, first_user_id + venues + customers))
+    venue_ids = list(range(first_venue_id, first_venue_id + venues))
+    # Popularity rank is shuffled so hot venues are not simply the lowest ids.
+    ranked_venue_ids = venue_ids[:]
+    rng.shuffle(ranked_venue_ids)
+    weights = venue_weights(venues, skew)
+
+    connection = db.session.connection()
+    loader = _Loader(connection)
+    loader.load(User, _users(first_user_id, venues, customers, password_hash, now))
+    loader.load(Venue, _venues(rng, venue_ids, owner_ids))
+    loader.load(VenueHours, _venue_hours(venue_ids))
+    loader.load(Reservation, _reservations(rng, ranked_venue_ids, customer_ids,
+                                           _allocate(reservations, weights), now))
+    loader.load(VenueComment, _comments(rng, ranked_venue_ids, customer_ids, comments, weights, now))
+    loader.sync_sequences()
+    db.session.commit()
+    VenueFacade().refresh_ratings()
+
+    return {'owner_ids': owner_ids, 'customer_ids': customer_ids, 'venue_ids': venue_ids}
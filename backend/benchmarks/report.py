@@ -0,0 +1,86 @@
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def _summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def summarize(samples, elapsed):
+    by_endpoint = {}
+    for name, latency, status in samples:
+        by_endpoint.setdefault(name, []).append((latency, status))
+
+    endpoints = {
+        name: _summarize([latency for latency, _ in rows],
+                         sum(1 for _, status in rows if status == 0 or status >= 500), elapsed)
+        for name, rows in sorted(by_endpoint.items())
+    }
+    overall = _summarize([latency for _, latency, _ in samples],
+                         sum(1 for _, _, status in samples if status == 0 or status >= 500), elapsed)
+    return {'endpoints': endpoints, 'overall': overall}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def write_results(summary, meta, output=None):
+    meta = dict(meta, commit=git_commit(), timestamp=datetime.utcnow().isoformat(),
+                python=platform.python_version())
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{meta['commit']}-{meta['target']}.json"
+    output = Path(output)
+    output.write_text(json.dumps(dict(summary, meta=meta), indent=2))
+    return output
+
+
+def format_table(summary):
+    lines = [f"{'endpoint':<24}{'reqs':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    rows = list(summary['endpoints'].items()) + [('overall', summary['overall'])]
+    for name, stats in rows:
+        lines.append(f"{name:<24}{stats['requests']:>8}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+                     f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    return '\n'.join(lines)
+
+
+def compare(baseline_path, candidate_path):
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    lines = [f"{'endpoint':<24}{'metric':>16}{'baseline':>12}{'candidate':>12}{'change':>10}"]
+    names = sorted(set(baseline['endpoints']) & set(candidate['endpoints'])) + ['overall']
+    for name in names:
+        before = baseline['overall'] if name == 'overall' else baseline['endpoints'][name]
+        after = candidate['overall'] if name == 'overall' else candidate['endpoints'][name]
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            lines.append(f"{name:<24}{metric:>16}{before[metric]:>12}{after[metric]:>12}{change:>+9.1f}%")
+    return '\n'.join(lines)
@@ -0,0 +1,54 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestClientRunner:
+    name = 'testclient'
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def run(self, workload, total_requests, concurrency=1):
+        samples = []
+        started = time.perf_counter()
+        for _ in range(total_requests):
+            name, method, path, headers, payload = workload.next_request()
+            t0 = time.perf_counter()
+            response = self.client.open(path, method=method, headers=headers, json=payload)
+            samples.append((name, time.perf_counter() - t0, response.status_code))
+        return samples, time.perf_counter() - started
+
+
+class HttpRunner:
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def _send(self, request):
+        name, method, path, headers, payload = request
+        t0 = time.perf_counter()
+        try:
+            response = self._session().request(method, self.base_url + path, headers=headers,
+                                               json=payload, timeout=self.timeout)
+            status = response.status_code
+        except self._requests.RequestException:
+            status = 0
+        return name, time.perf_counter() - t0, status
+
+    def run(self, workload, total_requests, concurrency=8):
+        planned = [workload.next_request() for _ in range(total_requests)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(self._send, planned))
+        return samples, time.perf_counter() - started
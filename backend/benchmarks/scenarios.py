@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+
+# (name, weight) pairs; the weights approximate production traffic where
+# browsing dominates and bookings are comparatively rare.
+DEFAULT_MIX = (
+    ('list_venues', 30),
+    ('venue_details', 20),
+    ('venue_comments', 20),
+    ('customer_reservations', 10),
+    ('owner_reservations', 5),
+    ('venue_reservations', 5),
+    ('reservation_changes', 5),
+    ('create_reservation', 5),
+)
+
+
+class Workload:
+    def __init__(self, app, seeded, mix=DEFAULT_MIX, seed=42):
+        self.rng = random.Random(seed)
+        self.venue_ids = seeded['venue_ids']
+        self.owner_ids = seeded['owner_ids']
+        self.customer_ids = seeded['customer_ids']
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        with app.app_context():
+            self.tokens = {
+                user_id: create_access_token(identity=str(user_id), expires_delta=timedelta(hours=12))
+                for user_id in self.owner_ids + self.customer_ids
+            }
+
+    def _headers(self, user_id):
+        return {'Authorization': f'Bearer {self.tokens[user_id]}'}
+
+    def next_request(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        return (name,) + getattr(self, name)()
+
+    def list_venues(self):
+        return 'GET', '/api/venues/', self._headers(self.rng.choice(self.customer_ids)), None
+
+    def venue_details(self):
+        venue_id = self.rng.choice(self.venue_ids)
+        return 'GET', f'/api/venues/{venue_id}', self._headers(self.rng.choice(self.customer_ids)), None
+
+    def venue_comments(self):
+        return 'GET', f'/api/venues/{self.rng.choice(self.venue_ids)}/comments', {}, None
+
+    def customer_reservations(self):
+        return 'GET', '/api/reservations/', self._headers(self.rng.choice(self.customer_ids)), None
+
+    def owner_reservations(self):
+        return 'GET', '/api/reservations/', self._headers(self.rng.choice(self.owner_ids)), None
+
+    def venue_reservations(self):
+        index = self.rng.randrange(len(self.venue_ids))
+        return 'GET', f'/api/reservations/venue/{self.venue_ids[index]}', self._headers(self.owner_ids[index]), None
+
+    def reservation_changes(self):
+        return 'GET', '/api/reservations/changes', self._headers(self.rng.choice(self.customer_ids)), None
+
+    def create_reservation(self):
+        slot = datetime.utcnow() + timedelta(days=self.rng.randint(61, 365), minutes=self.rng.randrange(0, 24 * 60, 15))
+        payload = {
+            'venue_id': self.rng.choice(self.venue_ids),
+            'reservation_time': slot.strftime('%Y-%m-%d %H:%M'),
+            'party_size': self.rng.randint(1, 8),
+        }
+        return 'POST', '/api/reservations/', self._headers(self.rng.choice(self.customer_ids)), payload
@@ -0,0 +1,85 @@
+import json
+import time
+from datetime import datetime, timedelta
+from flask_restx import marshal
+from app.routes.reservations import reservation_model
+from app.routes.venues import venue_model
+from app.serializers import BACKENDS, CompiledSchema
+
+MODELS = {'reservation': reservation_model, 'venue': venue_model}
+
+
+def _reservation_rows(count):
+    start = datetime(2030, 1, 1, 12, 0)
+    return [{
+        'id': i,
+        'venue_id': i % 100,
+        'venue_name': f'Venue {i % 100}',
+        'reservation_time': (start + timedelta(minutes=15 * i)).isoformat(),
+        'party_size': 2 + i % 6,
+        'notes': 'Window seat please' if i % 3 else None,
+        'status': 'pending',
+        'customer_name': f'customer_{i}',
+        'customer_id': i,
+    } for i in range(count)]
+
+
+def _venue_rows(count):
+    return [{
+        'id': i,
+        'owner_id': i,
+        'name': f'Venue {i}',
+        'address': f'{i} Main Street, Sofia',
+        'phone': f'+359{i:09d}',
+        'email': f'venue{i}@example.com',
+        'weekdays_hours': '09:00-22:00',
+        'weekend_hours': '10:00-23:00',
+        'image_url': '/static/images/default-venue.jpg',
+        'menu_image_url': '/static/images/default-menu.jpg',
+        'type': 'restaurant',
+        'latitude': 42.69 + i / 1e5,
+        'longitude': 23.32 + i / 1e5,
+    } for i in range(count)]
+
+
+ROWS = {'reservation': _reservation_rows, 'venue': _venue_rows}
+
+
+def _best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def benchmark_serialization(rows=10000, repeat=5):
+    results = {}
+    for name, model in MODELS.items():
+        items = ROWS[name](rows)
+        schema = CompiledSchema(model)
+        marshal_time, reference = _best_of(lambda: (json.dumps(marshal(items, model)) + '\n').encode(), repeat)
+        entry = {'marshal_ms': round(marshal_time * 1000, 2)}
+        for backend in BACKENDS:
+            try:
+                elapsed, body = _best_of(lambda: schema.dumps(items, backend), repeat)
+            except ImportError:
+                continue
+            entry[f'{backend}_ms'] = round(elapsed * 1000, 2)
+            entry[f'{backend}_identical'] = body == reference
+            entry[f'{backend}_equivalent'] = json.loads(body) == json.loads(reference)
+        results[name] = entry
+    return {'rows': rows, 'models': results}
+
+
+def format_serialization(result):
+    lines = [f"{result['rows']} rows per list"]
+    for name, entry in result['models'].items():
+        parts = [f"marshal {entry['marshal_ms']} ms"]
+        for backend in BACKENDS:
+            if f'{backend}_ms' in entry:
+                parts.append(f"{backend} {entry[f'{backend}_ms']} ms "
+                             f"({'identical' if entry[f'{backend}_identical'] else 'equivalent' if entry[f'{backend}_equivalent'] else 'DIFFERENT'})")
+        lines.append(f"{name:<12}" + ', '.join(parts))
+    return '\n'.join(lines)
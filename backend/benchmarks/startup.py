@@ -0,0 +1,57 @@
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+STARTUP_SNIPPET = (
+    "import time; started = time.perf_counter()\n"
+    "from app import create_app\n"
+    "imported = time.perf_counter()\n"
+    "create_app()\n"
+    "print(imported - started, time.perf_counter() - imported)\n"
+)
+
+
+def _run(args, env=None):
+    return subprocess.run([sys.executable] + args, cwd=BACKEND_DIR, capture_output=True, text=True,
+                          env=dict(os.environ, **(env or {})), check=True)
+
+
+def measure_cold_start(runs=5, env=None):
+    samples = []
+    for _ in range(runs):
+        import_time, create_time = map(float, _run(['-c', STARTUP_SNIPPET], env).stdout.split())
+        samples.append({'import_s': import_time, 'create_app_s': create_time, 'total_s': import_time + create_time})
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in ('import_s', 'create_app_s', 'total_s')
+    }
+
+
+def import_breakdown(env=None, top=15):
+    stderr = _run(['-X', 'importtime', '-c', STARTUP_SNIPPET], env).stderr
+    by_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'package': package, 'self_ms': round(us / 1000, 2)} for package, us in ranked]
+
+
+def profile_startup(runs=5, env=None):
+    return {'cold_start': measure_cold_start(runs, env), 'imports': import_breakdown(env)}
+
+
+def format_startup(profile):
+    cold = profile['cold_start']
+    lines = [f"cold start: import {cold['import_s'] * 1000:.1f} ms, "
+             f"create_app {cold['create_app_s'] * 1000:.1f} ms, total {cold['total_s'] * 1000:.1f} ms",
+             f"{'package':<24}{'self ms':>10}"]
+    lines += [f"{row['package']:<24}{row['self_ms']:>10}" for row in profile['imports']]
+    return '\n'.join(lines)
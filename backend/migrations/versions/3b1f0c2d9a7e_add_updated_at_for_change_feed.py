@@ -0,0 +1,43 @@
+"""Add updated_at for change feed
+
+Revision ID: 3b1f0c2d9a7e
+Revises: 0194cec91a89
+Create Date: 2026-10-19 10:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c2d9a7e'
+down_revision = '0194cec91a89'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('reservations', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('venue_comments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE reservations SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.execute("UPDATE venue_comments SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+    op.alter_column('reservations', 'updated_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+    op.alter_column('venue_comments', 'updated_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+
+    op.create_index('ix_reservations_customer_id_updated_at', 'reservations', ['customer_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_reservations_venue_id_updated_at', 'reservations', ['venue_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_venue_comments_venue_id_updated_at', 'venue_comments', ['venue_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venue_comments_venue_id_updated_at', table_name='venue_comments')
+    op.drop_index('ix_reservations_venue_id_updated_at', table_name='reservations')
+    op.drop_index('ix_reservations_customer_id_updated_at', table_name='reservations')
+    op.drop_column('venue_comments', 'updated_at')
+    op.drop_column('reservations', 'updated_at')
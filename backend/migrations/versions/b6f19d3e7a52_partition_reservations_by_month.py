@@ -0,0 +1,90 @@
+"""Partition reservations by month
+
+Revision ID: b6f19d3e7a52
+Revises: 8a4c6e0f2b13
+Create Date: 2026-10-19 13:31:52.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f19d3e7a52'
+down_revision = '8a4c6e0f2b13'
+branch_labels = None
+depends_on = None
+
+# Declarative partitioning is Postgres only; other databases keep a plain table.
+# The primary key has to include the partition key, so it becomes
+# (id, reservation_time); ids still come from reservations_id_seq and stay unique.
+
+COLUMNS = 'id, customer_id, venue_id, reservation_time, party_size, status, notes, created_at, updated_at, deleted_at'
+
+COLUMN_DEFINITIONS = """
+    id INTEGER NOT NULL DEFAULT nextval('reservations_id_seq'),
+    customer_id INTEGER NOT NULL REFERENCES users (id),
+    venue_id INTEGER NOT NULL REFERENCES venues (id),
+    reservation_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    party_size INTEGER NOT NULL,
+    status reservationstatus,
+    notes TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    deleted_at TIMESTAMP WITHOUT TIME ZONE
+"""
+
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc('month', COALESCE((SELECT min(reservation_time) FROM reservations_unpartitioned), now()))::date;
+BEGIN
+    WHILE month <= (date_trunc('month', now()) + interval '3 months')::date LOOP
+        EXECUTE 'CREATE TABLE ' || quote_ident('reservations_p' || to_char(month, 'YYYYMM'))
+             || ' PARTITION OF reservations FOR VALUES FROM (' || quote_literal(month)
+             || ') TO (' || quote_literal((month + interval '1 month')::date) || ')';
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+
+
+def _create_indexes():
+    op.create_index('ix_reservations_customer_id_updated_at', 'reservations', ['customer_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_reservations_venue_id_updated_at', 'reservations', ['venue_id', 'updated_at', 'id'], unique=False)
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE reservations RENAME TO reservations_unpartitioned")
+    op.execute("ALTER TABLE reservations_unpartitioned RENAME CONSTRAINT reservations_pkey TO reservations_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE reservations_id_seq OWNED BY NONE")
+
+    op.execute(f"CREATE TABLE reservations ({COLUMN_DEFINITIONS}, PRIMARY KEY (id, reservation_time)) "
+               "PARTITION BY RANGE (reservation_time)")
+    op.execute("ALTER SEQUENCE reservations_id_seq OWNED BY reservations.id")
+    op.execute("CREATE TABLE reservations_default PARTITION OF reservations DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+
+    op.execute(f"INSERT INTO reservations ({COLUMNS}) SELECT {COLUMNS} FROM reservations_unpartitioned")
+    op.drop_table('reservations_unpartitioned')
+    _create_indexes()
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE reservations RENAME TO reservations_partitioned")
+    op.execute("ALTER TABLE reservations_partitioned RENAME CONSTRAINT reservations_pkey TO reservations_partitioned_pkey")
+    op.execute("ALTER SEQUENCE reservations_id_seq OWNED BY NONE")
+
+    op.execute(f"CREATE TABLE reservations ({COLUMN_DEFINITIONS}, PRIMARY KEY (id))")
+    op.execute("ALTER SEQUENCE reservations_id_seq OWNED BY reservations.id")
+
+    op.execute(f"INSERT INTO reservations ({COLUMNS}) SELECT {COLUMNS} FROM reservations_partitioned")
+    # Dropping the parent drops every partition with it.
+    op.drop_table('reservations_partitioned')
+    _create_indexes()
@@ -0,0 +1,39 @@
+"""Add reservation tombstones
+
+Revision ID: d4e7a2b9c815
+Revises: c8a4f1e9d263
+Create Date: 2026-10-20 09:12:36.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e7a2b9c815'
+down_revision = 'c8a4f1e9d263'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=10), nullable=False),
+    sa.Column('removed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reservation_tombstones_customer_id_removed_at', 'reservation_tombstones', ['customer_id', 'removed_at', 'reservation_id'], unique=False)
+    op.create_index('ix_reservation_tombstones_owner_id_removed_at', 'reservation_tombstones', ['owner_id', 'removed_at', 'reservation_id'], unique=False)
+    op.create_index(op.f('ix_reservation_tombstones_removed_at'), 'reservation_tombstones', ['removed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reservation_tombstones_removed_at'), table_name='reservation_tombstones')
+    op.drop_index('ix_reservation_tombstones_owner_id_removed_at', table_name='reservation_tombstones')
+    op.drop_index('ix_reservation_tombstones_customer_id_removed_at', table_name='reservation_tombstones')
+    op.drop_table('reservation_tombstones')
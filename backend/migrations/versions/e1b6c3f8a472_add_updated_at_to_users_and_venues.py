@@ -0,0 +1,26 @@
+"""Add updated_at to users and venues
+
+Revision ID: e1b6c3f8a472
+Revises: d4e7a2b9c815
+Create Date: 2026-10-20 10:03:51.877120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b6c3f8a472'
+down_revision = 'd4e7a2b9c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('venues', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('venues', 'updated_at')
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,26 @@
+"""Add claimed_at to idempotency keys
+
+Revision ID: f6a2d9c4e183
+Revises: e1b6c3f8a472
+Create Date: 2026-10-20 10:41:27.530962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a2d9c4e183'
+down_revision = 'e1b6c3f8a472'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE idempotency_keys SET claimed_at = COALESCE(created_at, expires_at)")
+    op.alter_column('idempotency_keys', 'claimed_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    op.drop_column('idempotency_keys', 'claimed_at')
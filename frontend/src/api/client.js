@@ -23,13 +23,58 @@ apiClient.interceptors.request.use(
   }
 );
 
+// Access tokens are short-lived; on a 401 trade the refresh token for a new
+// pair once and retry. Concurrent failures share one refresh call, since a
+// refresh token can only be exchanged once.
+let refreshing = null;
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = (refreshToken
+      ? axios.post(`${API_URL}/auth/refresh`, null, {
+          headers: { Authorization: `Bearer ${refreshToken}` }
+        })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refresh_token', response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+export const logout = () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (refreshToken) {
+    axios
+      .post(`${API_URL}/auth/logout`, null, {
+        headers: { Authorization: `Bearer ${refreshToken}` }
+      })
+      .catch(() => {});
+  }
+  localStorage.clear();
+};
+
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      localStorage.clear();
-      window.location.href = '/login';
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried) {
+      original._retried = true;
+      try {
+        await refreshTokens();
+        return apiClient(original);
+      } catch (refreshError) {
+        localStorage.clear();
+        window.location.href = '/login';
+      }
     }
     return Promise.reject(error);
   }
-);
\ No newline at end of file
+);
@@ -50,6 +50,7 @@ export default function Register({ setToken, setUserType, setUsername }) {
       });
       if (response.data.access_token) {
         localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refresh_token', response.data.refresh_token);
         localStorage.setItem('user_type', userType);
         localStorage.setItem('user_id', response.data.user_id);
         localStorage.setItem('username', username);
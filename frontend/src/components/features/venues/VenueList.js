@@ -218,6 +218,8 @@ export default function VenueList({ setToken, setUserType, setUsername }) {
                       <CardMedia
                         component="img"
                         image={venue.image_url || getPlaceholderImage(index)}
+                        srcSet={venue.image_srcset || undefined}
+                        sizes={isMobile ? '100vw' : '40vw'}
                         alt={venue.name}
                         sx={{
                           width: '100%',
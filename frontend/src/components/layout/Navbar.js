@@ -4,7 +4,7 @@ import { AppBar, Toolbar, Typography, Box } from '@mui/material';
 import { motion } from 'framer-motion';
 import { Logout, Delete } from '@mui/icons-material';
 import { Link, useNavigate } from 'react-router-dom';
-import { apiClient } from '../../api/client';
+import { apiClient, logout } from '../../api/client';
 import ConfirmDeleteDialog from '../common/ConfirmDeleteDialog';
 
 const MotionButton = motion('button');
@@ -78,7 +78,7 @@ export default function Navbar({ setToken, setUserType, setUsername }) {
   const [open, setOpen] = React.useState(false);
 
   const handleLogout = () => {
-    localStorage.clear();
+    logout();
     setToken && setToken(null);
     setUserType && setUserType(null);
     setUsername && setUsername(null);